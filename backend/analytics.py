@@ -0,0 +1,288 @@
+"""
+Sotuvlar analitikasi: kun/hafta/oy bo'yicha mahsulot savdosi rollup'lari.
+
+Buyurtma yakunlanganda (wallet checkout, hamyon orqali xarid, Click "Complete")
+`record_sales` shu tranzaksiya ichida `sales_rollups` jadvaliga har bir davr
+uchun bittadan qator qo'shadi yoki mavjudini oshiradi. Barcha qatorlar bitta
+multi-VALUES upsert bilan yoziladi (MySQL: ON DUPLICATE KEY UPDATE,
+SQLite: ON CONFLICT DO UPDATE). /api/admin/analytics `orders` jadvalini
+skanerlamaydi — faqat rollup'larni o'qiydi.
+
+Mavjud tarix uchun backfill:
+    python analytics.py --backfill
+
+Backfill buyurtma qatorlarini (order_items) id bo'yicha chunk'lab o'qiydi va har bir chunk'ni
+NumPy bilan guruhlaydi (unique + bincount), so'ng rollup'larni bitta
+tranzaksiyada qayta yozadi. Backfill oxirgi o'qishdan keyin yakunlangan
+savdolarni qamramaydi — uni past trafikda (masalan, deploy oldidan) ishlating.
+"""
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, exists, insert, literal, select
+from sqlalchemy.orm import Session
+
+import cache
+import models
+from database import SessionLocal
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+PERIODS = (DAY, WEEK, MONTH)
+
+# Har bir davr uchun default nechta oxirgi bucket qaytariladi
+DEFAULT_BUCKETS = {DAY: 30, WEEK: 12, MONTH: 12}
+
+# Analitikaga faqat to'langan buyurtmalar kiradi
+PURCHASED_STATUSES = ("completed", "paid")
+BACKFILL_CHUNK_SIZE = 10000
+
+# Mahsulotni aniqlab bo'lmagan savdolar (masalan, eski birlashtirilgan Click buyurtmalari)
+UNKNOWN_PRODUCT_ID = 0
+
+
+def bucket_start(day: date, period: str) -> date:
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+    if period == MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def _shift_back(bucket: date, period: str, count: int) -> date:
+    """bucket'dan count ta davr oldingi bucket."""
+    if period == DAY:
+        return bucket - timedelta(days=count)
+    if period == WEEK:
+        return bucket - timedelta(weeks=count)
+    months = bucket.year * 12 + bucket.month - 1 - count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def record_sales(db: Session, sales, when: datetime) -> None:
+    """
+    Yakunlangan savdolarni rollup'larga qo'shadi (commit chaqiruvchida).
+    sales: [(product_id, category, units, revenue_usd), ...] — product_id None bo'lsa aniqlanmagan.
+    when: buyurtmaning created_at'i — backfill ham shu ustun bo'yicha bucket'laydi, shuning
+    uchun kechikib to'langan (Click) buyurtma ikkala yo'lda ham bir xil kunga tushadi.
+    created_at'siz eski buyurtmalar (backfill ularni o'tkazib yuboradi) bugungi kunga yoziladi.
+    """
+    day = (when or datetime.utcnow()).date()
+    totals = {}
+    for product_id, category, units, revenue_usd in sales:
+        key = product_id or UNKNOWN_PRODUCT_ID
+        current = totals.setdefault(key, [category or "", 0, 0.0])
+        current[1] += units
+        current[2] += revenue_usd
+    if not totals:
+        return
+    cache.upsert_add(db, models.SalesRollup.__table__, [
+        {
+            "period": period,
+            "bucket": bucket_start(day, period),
+            "product_id": product_id,
+            "category": category,
+            "units": units,
+            "revenue_usd": round(revenue_usd, 4),
+        }
+        for period in PERIODS
+        for product_id, (category, units, revenue_usd) in totals.items()
+    ], keys=["period", "bucket", "product_id"], counters=["revenue_usd", "units"], replace=("category",))
+
+
+def product_by_title(db: Session, title: str):
+    """(id, category) — product_id saqlanmagan buyurtmalar uchun. Topilmasa (None, None)."""
+    row = db.execute(
+        select(models.Product.id, models.Product.category)
+        .where(models.Product.title == title)
+        .order_by(models.Product.id)
+        .limit(1)
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+# ── Hisobot ─────────────────────────────────────────────────────────────────
+
+def _point(bucket, revenue_usd, units) -> dict:
+    return {"bucket": bucket.isoformat(), "revenue_usd": round(revenue_usd, 2), "units": units}
+
+
+def _group(rows, key_of) -> dict:
+    """key -> {"revenue_usd", "units", "buckets": {bucket: [revenue, units]}}"""
+    groups = {}
+    for row in rows:
+        group = groups.setdefault(key_of(row), {"revenue_usd": 0.0, "units": 0, "buckets": {}})
+        group["revenue_usd"] += row.revenue_usd
+        group["units"] += row.units
+        point = group["buckets"].setdefault(row.bucket, [0.0, 0])
+        point[0] += row.revenue_usd
+        point[1] += row.units
+    return groups
+
+
+def _series(group: dict) -> list:
+    return [_point(bucket, revenue, units) for bucket, (revenue, units) in sorted(group["buckets"].items())]
+
+
+def report(db: Session, period: str, buckets: int, products: dict, limit: int = 10) -> dict:
+    """
+    Oxirgi `buckets` ta davr bo'yicha savdo: jami, mahsulot va kategoriya kesimida, top sotuvchilar.
+    products: {product_id (str): {"title", "category", ...}} — katalog snapshot'idan nomlar uchun.
+    """
+    today = bucket_start(datetime.utcnow().date(), period)
+    since = _shift_back(today, period, buckets - 1)
+    rows = db.execute(
+        select(models.SalesRollup)
+        .where(models.SalesRollup.period == period, models.SalesRollup.bucket >= since)
+    ).scalars().all()
+
+    total = _group(rows, lambda row: None).get(None, {"revenue_usd": 0.0, "units": 0, "buckets": {}})
+    by_product = _group(rows, lambda row: row.product_id)
+    categories = {}
+    for row in rows:
+        categories.setdefault(row.product_id, row.category)
+    by_category = _group(rows, lambda row: row.category)
+
+    product_list = sorted(
+        (
+            {
+                "product_id": product_id,
+                "title": products.get(str(product_id), {}).get("title"),
+                "category": categories[product_id],
+                "revenue_usd": round(group["revenue_usd"], 2),
+                "units": group["units"],
+                "series": _series(group),
+            }
+            for product_id, group in by_product.items()
+        ),
+        key=lambda item: (-item["revenue_usd"], item["product_id"]),
+    )
+    category_list = sorted(
+        (
+            {
+                "category": category,
+                "revenue_usd": round(group["revenue_usd"], 2),
+                "units": group["units"],
+                "series": _series(group),
+            }
+            for category, group in by_category.items()
+        ),
+        key=lambda item: (-item["revenue_usd"], item["category"]),
+    )
+    top_sellers = [
+        {key: item[key] for key in ("product_id", "title", "category", "revenue_usd", "units")}
+        for item in product_list
+        if item["product_id"] != UNKNOWN_PRODUCT_ID
+    ][:limit]
+
+    return {
+        "period": period,
+        "from": since.isoformat(),
+        "to": today.isoformat(),
+        "revenue_usd": round(total["revenue_usd"], 2),
+        "units": total["units"],
+        "series": _series(total),
+        "products": product_list,
+        "categories": category_list,
+        "top_sellers": top_sellers,
+    }
+
+
+# ── Backfill ────────────────────────────────────────────────────────────────
+
+def _aggregate_chunk(np, rows, totals: dict) -> None:
+    """Bitta chunk: (period, bucket, product_id) bo'yicha revenue/units yig'indisi totals'ga qo'shiladi."""
+    _, created_at, product_ids, quantities, amounts = zip(*rows)
+    days = np.array(created_at, dtype="datetime64[D]")
+    product_ids = np.array(product_ids, dtype=np.int64)
+    quantities = np.array(quantities, dtype=np.int64)
+    amounts = np.array([amount or 0.0 for amount in amounts], dtype=np.float64)
+
+    # 1970-01-01 payshanba: (kun + 3) % 7 — dushanbadan boshlab hafta kuni
+    day_numbers = days.astype(np.int64)
+    starts = {
+        DAY: day_numbers,
+        WEEK: day_numbers - (day_numbers + 3) % 7,
+        MONTH: days.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64),
+    }
+    for period, bucket_days in starts.items():
+        keys, inverse = np.unique(np.stack([bucket_days, product_ids], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        revenue = np.bincount(inverse, weights=amounts, minlength=len(keys))
+        units = np.bincount(inverse, weights=quantities, minlength=len(keys)).astype(np.int64)
+        for (bucket_day, product_id), revenue_usd, count in zip(keys.tolist(), revenue.tolist(), units.tolist()):
+            current = totals.setdefault((period, bucket_day, product_id), [0.0, 0])
+            current[0] += revenue_usd
+            current[1] += count
+
+
+def _read_chunks(db: Session, query, id_column):
+    """query qatorlari (birinchi ustun — id), id bo'yicha BACKFILL_CHUNK_SIZE tadan."""
+    after_id = 0
+    while True:
+        rows = db.execute(query.where(id_column > after_id).order_by(id_column).limit(BACKFILL_CHUNK_SIZE)).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def _backfill_queries():
+    """(query, id ustuni): buyurtma qatorlari va qatorsiz eski buyurtmalar (aniqlanmagan mahsulot)."""
+    order, item = models.Order, models.OrderItem
+    paid = (order.status.in_(PURCHASED_STATUSES), order.created_at.isnot(None))
+    items = (
+        select(item.id, order.created_at, item.product_id, item.quantity, item.amount_usd)
+        .join(order, order.id == item.order_id)
+        .where(*paid)
+    )
+    legacy = (
+        select(order.id, order.created_at, literal(UNKNOWN_PRODUCT_ID), literal(1), order.amount_usd)
+        .where(*paid, ~exists().where(item.order_id == order.id))
+    )
+    return [(items, item.id), (legacy, order.id)]
+
+
+def backfill() -> int:
+    """Rollup'larni mavjud buyurtmalardan qayta quradi. Yozilgan qatorlar sonini qaytaradi."""
+    import numpy as np
+
+    db = SessionLocal()
+    try:
+        categories = dict(db.execute(select(models.Product.id, models.Product.category)).all())
+
+        totals = {}
+        for query, id_column in _backfill_queries():
+            for rows in _read_chunks(db, query, id_column):
+                _aggregate_chunk(np, rows, totals)
+
+        epoch = date(1970, 1, 1)
+        records = [
+            {
+                "period": period,
+                "bucket": epoch + timedelta(days=bucket_day),
+                "product_id": product_id,
+                "category": categories.get(product_id) or "",
+                "revenue_usd": round(revenue_usd, 4),
+                "units": units,
+            }
+            for (period, bucket_day, product_id), (revenue_usd, units) in totals.items()
+        ]
+        db.execute(delete(models.SalesRollup))
+        for i in range(0, len(records), BACKFILL_CHUNK_SIZE):
+            db.execute(insert(models.SalesRollup), records[i:i + BACKFILL_CHUNK_SIZE])
+        db.commit()
+        return len(records)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    if "--backfill" in sys.argv:
+        print(f"Yozilgan rollup qatorlari: {backfill()}")
+    else:
+        print(__doc__)
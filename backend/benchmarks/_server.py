@@ -0,0 +1,68 @@
+"""Benchmark'lar uchun umumiy yordamchilar: vaqtinchalik baza va uvicorn'ni ishga tushirish."""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_env(db_url: str, **extra) -> dict:
+    env = os.environ.copy()
+    env["DATABASE_URL"] = db_url
+    env["ORDER_SWEEPER_ENABLED"] = "0"
+    env.update({k: str(v) for k, v in extra.items()})
+    return env
+
+
+@contextlib.contextmanager
+def temp_database():
+    """Migratsiyalari qo'llangan vaqtinchalik SQLite baza URL'ini beradi."""
+    with tempfile.TemporaryDirectory(prefix="layzzbe_bench_") as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        subprocess.run([sys.executable, "migrations.py"], cwd=BACKEND_DIR, env=server_env(db_url),
+                       check=True, stdout=subprocess.DEVNULL)
+        yield db_url
+
+
+def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/", timeout=1) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Server javob bermadi")
+
+
+@contextlib.contextmanager
+def run_server(db_url: str, workers: int = 1, **env):
+    """uvicorn'ni alohida process'da ishga tushiradi va base URL'ni beradi."""
+    port = free_port()
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", "--no-access-log"]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=server_env(db_url, WEB_CONCURRENCY=workers, **env))
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url)
+        yield base_url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
@@ -0,0 +1,124 @@
+"""
+SQLite profillarini solishtirish: stock sozlamalar va database.py dagi "tuned" profil
+(WAL, synchronous=NORMAL, mmap, cache, busy_timeout + bitta yozuvchi navbati).
+
+Ishlatish (backend/ papkasidan):
+    python benchmarks/bench_sqlite.py
+    python benchmarks/bench_sqlite.py --seconds 10 --writers 8 --readers 16
+
+Yozuvchilar checkout'ga o'xshash tranzaksiya bajaradi (balansni o'qish,
+kamaytirish, orders + transactions ga yozish); o'quvchilar katalog va
+buyurtmalar tarixini o'qiydi.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmp = tempfile.mkdtemp(prefix="bench_sqlite_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'import.db')}")
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+
+import database  # noqa: E402
+import models  # noqa: E402
+
+USERS = 200
+PRODUCTS = 500
+
+
+def make_engine(path: str, tuned: bool):
+    engine = create_engine(f"sqlite:///{path}", pool_size=64, max_overflow=0)
+    if tuned:
+        event.listen(engine, "connect", database.apply_sqlite_pragmas)
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"id": i, "email": f"u{i}@bench", "hashed_password": "x", "balance": 1e12}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(models.Product.__table__.insert(), [
+            {"id": i, "title": f"Product {i}", "price": "$10", "category": "Bench", "techStack": "A,B", "features": "x"}
+            for i in range(1, PRODUCTS + 1)
+        ])
+    return engine
+
+
+def run(engine, writer_lock, seconds: float, writers: int, readers: int) -> dict:
+    stop = time.perf_counter() + seconds
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def add(key):
+        with lock:
+            counts[key] += 1
+
+    def writer():
+        while time.perf_counter() < stop:
+            user_id = random.randint(1, USERS)
+            try:
+                with writer_lock:
+                    with engine.begin() as conn:
+                        balance = conn.execute(text("SELECT balance FROM users WHERE id = :id"), {"id": user_id}).scalar()
+                        conn.execute(text("UPDATE users SET balance = :b WHERE id = :id"), {"b": balance - 128000, "id": user_id})
+                        conn.execute(text(
+                            "INSERT INTO orders (user_id, product_title, amount_usd, status) VALUES (:u, 'Bench', 10, 'completed')"
+                        ), {"u": user_id})
+                        conn.execute(text(
+                            "INSERT INTO transactions (user_id, type, amount, currency) VALUES (:u, 'PURCHASE', 128000, 'UZS')"
+                        ), {"u": user_id})
+                add("writes")
+            except Exception:
+                add("errors")
+
+    def reader():
+        while time.perf_counter() < stop:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT * FROM products")).fetchall()
+                    conn.execute(
+                        text("SELECT * FROM orders WHERE user_id = :u ORDER BY created_at DESC"),
+                        {"u": random.randint(1, USERS)},
+                    ).fetchall()
+                add("reads")
+            except Exception:
+                add("errors")
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {k: v / seconds if k != "errors" else v for k, v in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    profiles = {
+        "default": (make_engine(os.path.join(_tmp, "default.db"), tuned=False), database.SQLiteWriterQueue(enabled=False)),
+        "tuned": (make_engine(os.path.join(_tmp, "tuned.db"), tuned=True), database.SQLiteWriterQueue(enabled=True)),
+    }
+    print(f"{args.writers} yozuvchi, {args.readers} o'quvchi, {args.seconds:.0f}s")
+    print(f"{'profil':<10}{'writes/s':>12}{'reads/s':>12}{'errors':>10}")
+    for name, (engine, writer_lock) in profiles.items():
+        result = run(engine, writer_lock, args.seconds, args.writers, args.readers)
+        print(f"{name:<10}{result['writes']:>12.1f}{result['reads']:>12.1f}{result['errors']:>10}")
+        engine.dispose()
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cold start benchmark: `import main` vaqti va uvicorn'ning birinchi javobigacha vaqt.
+
+Ishlatish (backend/ papkasidan):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 10 --import-budget-ms 1200 --boot-budget-ms 2500
+
+DATABASE_URL berilmasa vaqtinchalik SQLite baza yaratiladi. Budjetdan oshsa
+exit code 1 bilan tugaydi (CI yoki deploy oldidan tekshirish uchun).
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(db_url: str) -> dict:
+    env = os.environ.copy()
+    env["DATABASE_URL"] = db_url
+    env["ORDER_SWEEPER_ENABLED"] = "0"
+    return env
+
+
+def measure_import(env: dict) -> float:
+    """Yangi interpreter'da `import main` necha ms olishini o'lchaydi."""
+    code = "import time; t = time.perf_counter(); import main; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_boot(env: dict, timeout: float = 30.0) -> float:
+    """uvicorn ishga tushirilgandan birinchi muvaffaqiyatli javobgacha bo'lgan vaqt (ms)."""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Server javob bermadi")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--boot-budget-ms", type=float, default=float(os.getenv("BOOT_BUDGET_MS", "3000")))
+    args = parser.parse_args()
+
+    db_url = os.getenv("DATABASE_URL")
+    tmp = None
+    if not db_url:
+        tmp = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+        subprocess.run([sys.executable, "migrations.py"], cwd=BACKEND_DIR, env=_env(db_url),
+                       check=True, stdout=subprocess.DEVNULL)
+    env = _env(db_url)
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    boots = [measure_boot(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(imports)
+    boot_ms = statistics.median(boots)
+    print(f"import main : median {import_ms:7.1f} ms  (min {min(imports):.1f}, max {max(imports):.1f})  budget {args.import_budget_ms:.0f} ms")
+    print(f"boot → 200  : median {boot_ms:7.1f} ms  (min {min(boots):.1f}, max {max(boots):.1f})  budget {args.boot_budget_ms:.0f} ms")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+    failed = import_ms > args.import_budget_ms or boot_ms > args.boot_budget_ms
+    if failed:
+        print("❌ Startup budjeti oshib ketdi")
+        sys.exit(1)
+    print("✅ Startup budjet ichida")
+
+
+if __name__ == "__main__":
+    main()
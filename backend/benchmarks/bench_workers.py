@@ -0,0 +1,89 @@
+"""
+Worker soniga qarab throughput qanday o'sishini o'lchaydi (multi-worker rejim).
+
+Ishlatish (backend/ papkasidan):
+    python benchmarks/bench_workers.py
+    python benchmarks/bench_workers.py --workers 1 2 4 --clients 16 --seconds 10 --path /api/products
+
+Har bir worker soni uchun `uvicorn --workers N` alohida ishga tushiriladi va
+bir nechta klient process keep-alive ulanishlar orqali so'rov yuboradi.
+Klientlar ham CPU ishlatadi, shuning uchun natijani serverdan tashqari
+mashinada o'lchash aniqroq bo'ladi.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _server import run_server, server_env, temp_database, BACKEND_DIR  # noqa: E402
+
+
+def seed(db_url: str, products: int) -> None:
+    code = (
+        "import models; from database import SessionLocal; db = SessionLocal(); "
+        f"db.add_all([models.Product(title=f'Product {{i}}', description='Benchmark', price='$19', "
+        f"image='', category=f'Cat {{i % 7}}', techStack='React,FastAPI', features='a,b') for i in range({products})]); "
+        "db.commit()"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=server_env(db_url), check=True)
+
+
+def _client(base_url: str, path: str, seconds: float, counter) -> None:
+    url = urlparse(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    done = 0
+    stop = time.perf_counter() + seconds
+    while time.perf_counter() < stop:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            done += 1
+    conn.close()
+    with counter.get_lock():
+        counter.value += done
+
+
+def measure(base_url: str, path: str, clients: int, seconds: float) -> float:
+    counter = multiprocessing.Value("i", 0)
+    procs = [multiprocessing.Process(target=_client, args=(base_url, path, seconds, counter)) for _ in range(clients)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return counter.value / seconds
+
+
+def main():
+    cpu = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpu} & set(range(1, cpu + 1))) or [1]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--clients", type=int, default=max(4, cpu * 2))
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--path", default="/api/products")
+    args = parser.parse_args()
+
+    print(f"CPU: {cpu}, klientlar: {args.clients}, {args.seconds:.0f}s, GET {args.path}")
+    print(f"{'workers':>8}{'req/s':>12}{'scaling':>10}")
+    with temp_database() as db_url:
+        seed(db_url, args.products)
+        base = None
+        for workers in args.workers:
+            with run_server(db_url, workers=workers) as base_url:
+                measure(base_url, args.path, 1, 0.5)  # isitish
+                rps = measure(base_url, args.path, args.clients, args.seconds)
+            base = base or rps
+            print(f"{workers:>8}{rps:>12.1f}{rps / base:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
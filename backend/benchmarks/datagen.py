@@ -0,0 +1,180 @@
+"""
+Yuklama testlari uchun sintetik ma'lumot generatori.
+
+Ishlatish (backend/ papkasidan, DATABASE_URL migratsiya qilingan bazaga qarashi kerak):
+    python benchmarks/datagen.py --users 500 --products 300 --orders 20000 --transactions 20000
+
+Bir xil --seed bilan har safar bir xil ma'lumot hosil bo'ladi. Natijada
+loadtest.py uchun "manifest" (JSON) chiqariladi: benchmark foydalanuvchilari,
+mahsulot id'lari va Click webhook uchun pending buyurtmalar.
+
+Barcha benchmark foydalanuvchilarining paroli bir xil (bcrypt bir marta
+hisoblanadi), balansi esa checkout tugab qolmasligi uchun juda katta.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+import auth  # noqa: E402
+import models  # noqa: E402
+from database import SessionLocal  # noqa: E402
+
+PASSWORD = "bench-password"
+CLICK_SECRET_KEY = "bench-secret"
+USD_RATE = 12800
+CHUNK_SIZE = 5000
+
+CATEGORIES = ["Web Dasturlash", "Mobil Dasturlash", "Boshqaruv Paneli", "Backend", "UI/UX", "DevOps", "AI"]
+TECH_TAGS = ["React", "Vue 3", "Next.js", "FastAPI", "Django", "Node.js", "Flutter", "Tailwind",
+             "PostgreSQL", "MySQL", "Redis", "Docker", "TypeScript", "Figma", "Expo"]
+
+
+def _chunks(rows):
+    for i in range(0, len(rows), CHUNK_SIZE):
+        yield rows[i:i + CHUNK_SIZE]
+
+
+def _bulk_insert(db, model, rows) -> None:
+    for chunk in _chunks(rows):
+        db.execute(insert(model), chunk)
+    db.commit()
+
+
+def generate(users: int, products: int, orders: int, transactions: int, webhook_orders: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        first_user = (db.execute(select(func.max(models.User.id))).scalar() or 0) + 1
+        first_product = (db.execute(select(func.max(models.Product.id))).scalar() or 0) + 1
+
+        hashed = auth.get_password_hash(PASSWORD)
+        emails = [f"bench{first_user + i}@example.com" for i in range(users)]
+        _bulk_insert(db, models.User, [
+            {
+                "id": first_user + i,
+                "email": email,
+                "hashed_password": hashed,
+                "is_admin": False,
+                "role": "user",
+                "full_name": f"Bench User {first_user + i}",
+                "balance": 1e12,
+                "created_at": now - timedelta(days=rng.randint(0, 365)),
+            }
+            for i, email in enumerate(emails)
+        ])
+
+        prices = {}
+        product_rows = []
+        for i in range(products):
+            pid = first_product + i
+            prices[pid] = rng.randint(5, 99)
+            product_rows.append({
+                "id": pid,
+                "title": f"Bench mahsulot {pid}",
+                "description": "Yuklama testi uchun sintetik mahsulot",
+                "price": f"${prices[pid]}",
+                "image": "",
+                "category": rng.choice(CATEGORIES),
+                "techStack": ",".join(rng.sample(TECH_TAGS, 3)),
+                "features": "a,b,c",
+            })
+        _bulk_insert(db, models.Product, product_rows)
+
+        user_ids = range(first_user, first_user + users)
+        product_ids = list(prices)
+        order_rows = []
+        for i in range(orders):
+            pid = rng.choice(product_ids)
+            order_rows.append({
+                "user_id": rng.choice(user_ids),
+                "product_title": f"Bench mahsulot {pid}",
+                "product_image": "",
+                "product_category": rng.choice(CATEGORIES),
+                "amount_usd": float(prices[pid]),
+                "status": rng.choice(("completed", "completed", "completed", "paid", "expired")),
+                "created_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+            })
+        _bulk_insert(db, models.Order, order_rows)
+
+        _bulk_insert(db, models.Transaction, [
+            {
+                "user_id": rng.choice(user_ids),
+                "type": rng.choice(("TOPUP", "PURCHASE")),
+                "amount": float(rng.randint(10, 2000) * 1000),
+                "currency": "UZS",
+                "description": "Bench tranzaksiya",
+                "created_at": now - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+            }
+            for _ in range(transactions)
+        ])
+
+        # Click webhook (prepare) uchun yangi pending buyurtmalar
+        pending_first = (db.execute(select(func.max(models.Order.id))).scalar() or 0) + 1
+        pending_rows = []
+        for i in range(webhook_orders):
+            pid = rng.choice(product_ids)
+            pending_rows.append({
+                "id": pending_first + i,
+                "user_id": rng.choice(user_ids),
+                "product_title": f"Bench mahsulot {pid}",
+                "product_image": "",
+                "amount_usd": float(prices[pid]),
+                "status": "pending",
+                "created_at": now,
+            })
+        _bulk_insert(db, models.Order, pending_rows)
+
+        existing = db.query(models.SystemSetting).filter(models.SystemSetting.key == "click_secret_key").first()
+        if existing:
+            existing.value = CLICK_SECRET_KEY
+        else:
+            db.add(models.SystemSetting(key="click_secret_key", value=CLICK_SECRET_KEY))
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "password": PASSWORD,
+        "click_secret_key": CLICK_SECRET_KEY,
+        "users": emails,
+        "product_ids": product_ids,
+        "pending_orders": [[row["id"], round(row["amount_usd"] * USD_RATE)] for row in pending_rows],
+        "counts": {
+            "users": users,
+            "products": products,
+            "orders": orders + webhook_orders,
+            "transactions": transactions,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--transactions", type=int, default=10000)
+    parser.add_argument("--webhook-orders", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--manifest", help="manifest JSON fayli (ko'rsatilmasa stdout)")
+    args = parser.parse_args()
+
+    manifest = generate(args.users, args.products, args.orders, args.transactions, args.webhook_orders, args.seed)
+    if args.manifest:
+        with open(args.manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    else:
+        json.dump(manifest, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
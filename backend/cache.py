@@ -0,0 +1,315 @@
+"""
+Process ichidagi keshlar va ularning worker'lar orasidagi muvofiqligi.
+
+Har bir kesh nomi uchun `cache_versions` jadvalida hisoblagich bor. Ma'lumot
+o'zgarganda yozuvchi handler shu tranzaksiya ichida `bump(db, name)` chaqiradi;
+boshqa worker'lar keyingi tekshiruvda versiya o'zgarganini ko'rib keshni
+tashlab yuboradi. Versiya har so'rovda emas, CACHE_VERSION_CHECK_SECONDS da
+bir marta o'qiladi — ya'ni boshqa worker'lar eng ko'pi shuncha eskirgan ma'lumot
+ko'rishi mumkin. Yozgan worker o'z keshini commit'dan keyin darhol tozalaydi.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+import models
+from database import SessionLocal
+
+CACHE_VERSION_CHECK_SECONDS = float(os.getenv("CACHE_VERSION_CHECK_SECONDS", "1"))
+
+# Kesh nomlari
+CATALOG = "catalog"
+SETTINGS = "settings"
+USERS = "users"
+RECOMMENDATIONS = "recommendations"
+POPULARITY = "popularity"
+DASHBOARD = "dashboard"      # foydalanuvchi bo'yicha: "dashboard:{user_id}"
+
+_MISSING = object()
+_registry = {}
+
+
+def read_version(db: Session, name: str) -> int:
+    version = db.execute(
+        select(models.CacheVersion.version).where(models.CacheVersion.name == name)
+    ).scalar()
+    return version or 0
+
+
+def insert_ignore(table):
+    """INSERT, dublikat kalit bo'lsa jim o'tkazib yuboriladi (MySQL: INSERT IGNORE, SQLite: INSERT OR IGNORE)."""
+    return table.insert().prefix_with("OR IGNORE", dialect="sqlite").prefix_with("IGNORE", dialect="mysql")
+
+
+def _upsert(db: Session, table, keys: list, counters, replace, rows: list = None):
+    """INSERT ... ON DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT DO UPDATE (SQLite)."""
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(table)
+        if rows is not None:
+            stmt = stmt.values(rows)
+        new = stmt.inserted
+        values = {column: table.c[column] + new[column] for column in counters}
+        values.update({column: new[column] for column in replace})
+        return stmt.on_duplicate_key_update(**values)
+    stmt = sqlite_insert(table)
+    if rows is not None:
+        stmt = stmt.values(rows)
+    new = stmt.excluded
+    values = {column: table.c[column] + new[column] for column in counters}
+    values.update({column: new[column] for column in replace})
+    return stmt.on_conflict_do_update(index_elements=keys, set_=values)
+
+
+def upsert_add(db: Session, table, rows: list, keys: list, counters: list, replace: tuple = ()) -> None:
+    """
+    Bitta multi-VALUES statement: yangi kalitlar qo'shiladi, mavjudlarida `counters`
+    ustunlari oshiriladi va `replace` ustunlari yangilanadi
+    (MySQL: ON DUPLICATE KEY UPDATE, SQLite: ON CONFLICT DO UPDATE).
+    """
+    db.execute(_upsert(db, table, keys, counters, replace, rows))
+
+
+def upsert_many(db: Session, table, rows: list, keys: list, replace: tuple) -> None:
+    """
+    Ko'p qatorli upsert executemany bilan: statement bir marta kompilyatsiya qilinadi
+    (multi-VALUES har xil uzunlikda qayta kompilyatsiya bo'ladi). Katta importlar uchun.
+    """
+    db.execute(_upsert(db, table, keys, (), replace), rows)
+
+
+def bump(db: Session, name: str) -> None:
+    """Kesh versiyasini oshiradi (joriy tranzaksiya ichida). Commit'dan keyin lokal kesh ham tozalanadi."""
+    bump_many(db, [name])
+
+
+def bump_many(db: Session, names) -> None:
+    """
+    Bir nechta versiyani bitta UPDATE ... WHERE name IN (...) bilan oshiradi.
+    Qatori hali yo'q nom bo'lsa — bitta INSERT IGNORE va yana bitta UPDATE.
+    """
+    names = sorted(set(names))
+    if not names:
+        return
+
+    def increment(targets):
+        return db.execute(
+            update(models.CacheVersion)
+            .where(models.CacheVersion.name.in_(targets))
+            .values(version=models.CacheVersion.version + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if increment(names) < len(names):
+        # Birinchi marta — yetishmagan qatorlar yaratiladi (mavjudlari va boshqa worker
+        # yaratayotganlari jim o'tkaziladi) va yana oshiriladi. Mavjud qatorlar ikki marta
+        # oshadi — versiya faqat "o'zgardi" belgisi, bu zararsiz.
+        create_versions(db, names)
+        increment(names)
+    db.info.setdefault("cache_bumps", set()).update(names)
+
+
+def create_versions(db: Session, names) -> None:
+    """Versiya qatorlarini oldindan yaratadi — keyingi bump bitta UPDATE bo'ladi."""
+    db.execute(insert_ignore(models.CacheVersion.__table__), [{"name": name, "version": 0} for name in names])
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_after_commit(session):
+    for name in session.info.pop("cache_bumps", ()):
+        cache = _registry.get(name)
+        if cache is not None:
+            cache.invalidate()
+            continue
+        prefix, _, key = name.partition(":")
+        cache = _registry.get(prefix)
+        if isinstance(cache, UserScopedCache):
+            cache.invalidate(int(key))
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_bumps_after_rollback(session):
+    session.info.pop("cache_bumps", None)
+
+
+class VersionedCache:
+    """
+    Versiyaga bog'langan kesh. `loader(db, key)` qiymatni bazadan yuklaydi.
+    Bitta nom ostida bir nechta kalit saqlanishi mumkin (masalan, email bo'yicha
+    principal'lar); versiya o'zgarsa hammasi birga tozalanadi.
+    """
+
+    def __init__(self, name: str, loader, max_entries: int = 10000):
+        self.name = name
+        self.loader = loader
+        self.max_entries = max_entries
+        self._entries = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _registry[name] = self
+
+    def current_version(self, db: Session):
+        """Versiyani kerak bo'lsa bazadan o'qiydi. Kesh eskirgan bo'lsa tozalaydi."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < CACHE_VERSION_CHECK_SECONDS:
+            return self._version
+        version = read_version(db, self.name)
+        with self._lock:
+            if version != self._version:
+                self._entries = {}
+                self._version = version
+            self._checked_at = now
+        return version
+
+    def get(self, db: Session, key=None):
+        return self.get_versioned(db, key)[0]
+
+    def get_versioned(self, db: Session, key=None):
+        """(qiymat, versiya) — qiymat aynan shu versiyaga tegishli (ETag uchun)."""
+        version = self.current_version(db)
+        value = self._entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value, version
+        self.misses += 1
+        value = self.loader(db, key)
+        if value is None:
+            return None, version
+        with self._lock:
+            # Yuklash paytida versiya o'zgarmagan bo'lsagina saqlaymiz
+            if self._version == version:
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {}
+                self._entries[key] = value
+        return value, version
+
+    @property
+    def version(self):
+        return self._version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._version = None
+            self._checked_at = 0.0
+
+
+class UserScopedCache:
+    """
+    Har bir foydalanuvchi uchun alohida versiyali kesh (read-model). Versiya nomi
+    "{prefix}:{user_id}" — bitta foydalanuvchining yozuvi faqat uning yozuvini
+    eskirtiradi, boshqalarnikiga tegmaydi. `loader(db, user_id)` qiymatni yuklaydi.
+    """
+
+    def __init__(self, prefix: str, loader, max_entries: int = 10000):
+        self.name = prefix
+        self.loader = loader
+        self.max_entries = max_entries
+        self._entries = {}      # user_id -> (versiya, qiymat, tekshirilgan vaqt)
+        self._generation = 0    # har invalidate'da oshadi
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        _registry[prefix] = self
+
+    def version_name(self, user_id: int) -> str:
+        return f"{self.name}:{user_id}"
+
+    def get(self, db: Session, user_id: int):
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and now - entry[2] < CACHE_VERSION_CHECK_SECONDS:
+            self.hits += 1
+            return entry[1]
+        version = read_version(db, self.version_name(user_id))
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            with self._lock:
+                self._entries[user_id] = (version, entry[1], now)
+            return entry[1]
+        self.misses += 1
+        generation = self._generation
+        value = self.loader(db, user_id)
+        with self._lock:
+            # Yuklash paytida shu worker'da yozuv bo'lgan bo'lsa saqlamaymiz
+            if self._generation == generation:
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {}
+                self._entries[user_id] = (version, value, now)
+        return value
+
+    def bump(self, db: Session, user_id: int) -> None:
+        """Foydalanuvchi yozuvini eskirtiradi (joriy tranzaksiya ichida)."""
+        bump(db, self.version_name(user_id))
+
+    def bump_many(self, db: Session, user_ids) -> None:
+        bump_many(db, [self.version_name(user_id) for user_id in user_ids])
+
+    def create(self, db: Session, user_id: int) -> None:
+        """Yangi foydalanuvchi uchun versiya qatori (ro'yxatdan o'tishda)."""
+        create_versions(db, [self.version_name(user_id)])
+
+    @property
+    def version(self):
+        return None
+
+    def invalidate(self, user_id: int = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries = {}
+            else:
+                self._entries.pop(user_id, None)
+
+
+# ── Umumiy keshlar ───────────────────────────────────────────────────────────
+
+def _load_settings(db: Session, _key=None) -> dict:
+    return {row.key: row.value for row in db.query(models.SystemSetting).all()}
+
+
+settings_cache = VersionedCache(SETTINGS, _load_settings)
+
+
+def get_setting(db: Session, key: str) -> str:
+    """SystemSetting qiymati (bo'sh joylarsiz) yoki "" — keshdan o'qiladi."""
+    value = settings_cache.get(db).get(key)
+    return value.strip() if value else ""
+
+
+# Balans keshlanmaydi: u tez-tez o'zgaradi va pul bilan bog'liq — har doim bazadan o'qiladi
+_PRINCIPAL_COLUMNS = [c.key for c in models.User.__table__.columns if c.key != "balance"]
+
+
+def _load_principal(db: Session, email: str):
+    user = db.query(models.User).filter(models.User.email == email).first()
+    if user is None:
+        return None
+    return {column: getattr(user, column) for column in _PRINCIPAL_COLUMNS}
+
+
+principal_cache = VersionedCache(USERS, _load_principal)
+
+
+def get_principal(db: Session, email: str):
+    """Token egasini keshdan oladi va sessiyaga (so'rovsiz) biriktiradi. Topilmasa None."""
+    principal = principal_cache.get(db, email)
+    if principal is None:
+        return None
+    user = models.User(**principal)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def stats() -> dict:
+    return {
+        name: {"version": c.version, "entries": len(c._entries), "hits": c.hits, "misses": c.misses}
+        for name, c in _registry.items()
+    }
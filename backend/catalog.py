@@ -0,0 +1,255 @@
+"""
+Katalog snapshot'i: ro'yxat, id bo'yicha mahsulotlar va "o'xshash mahsulotlar".
+
+O'xshashlik teglar bo'yicha hisoblanadi: har bir mahsulotning kategoriyasi va
+techStack elementlari teg; ball — umumiy teglar og'irliklari yig'indisi
+(kategoriya CATEGORY_WEIGHT marta og'irroq). Nomzodlar chegaralangan:
+  - "kam" teg (RELATED_MAX_POSTING tagacha mahsulot) — uning barcha mahsulotlari;
+  - "keng" teg (masalan, kategoriya) — teg ro'yxatida id bo'yicha har tomondan
+    RELATED_WINDOW ta qo'shni. Shunda bitta mahsulot uchun ish katalog
+    hajmiga emas, teglar soniga bog'liq.
+
+Katalog versiyasi o'zgarganda (cache.bump) "related" faqat teglari o'zgargan
+(qo'shilgan/o'chirilgan) mahsulotlar va ularni nomzod sifatida ko'radigan
+mahsulotlar uchun qayta hisoblanadi: kam teg a'zolari va keng tegdagi
+RELATED_WINDOW ichidagi qo'shnilar. Nomi, narxi yoki rasmi o'zgarsa hech narsa
+qayta hisoblanmaydi — related ro'yxatida faqat id'lar, qisqa ko'rinish javob
+paytida yangi snapshot'dan olinadi.
+
+Katta katalogda (RELATED_SYNC_BUILD_LIMIT dan ko'p) related fon thread'ida
+quriladi: yangi snapshot darhol qaytadi (ro'yxat va mahsulotlar yangi), related
+tayyor bo'lguncha esa oxirgi tayyor snapshot'niki (o'chirilganlarsiz) beriladi.
+"""
+import bisect
+import itertools
+import logging
+import os
+import threading
+
+from sqlalchemy.orm import Session
+
+import models
+
+RELATED_PRODUCTS_LIMIT = int(os.getenv("RELATED_PRODUCTS_LIMIT", "4"))
+RELATED_MAX_POSTING = int(os.getenv("RELATED_MAX_POSTING", "100"))
+RELATED_WINDOW = int(os.getenv("RELATED_WINDOW", str(RELATED_PRODUCTS_LIMIT)))
+RELATED_SYNC_BUILD_LIMIT = int(os.getenv("RELATED_SYNC_BUILD_LIMIT", "5000"))
+CATEGORY_WEIGHT = 2
+
+# Ro'yxatdagi qisqa ko'rinish (related) uchun maydonlar
+_SUMMARY_FIELDS = ("id", "title", "price", "image", "category")
+
+logger = logging.getLogger("layzzbe.catalog")
+
+_ready = None           # related'i tayyor oxirgi snapshot (incremental asos va vaqtinchalik javob)
+_pending = None         # fon thread'i quradigan snapshot (eng yangisi)
+_builder = None
+_build_lock = threading.Lock()
+_sequence = itertools.count(1)
+
+
+def format_product(product: models.Product) -> dict:
+    # React frontend techStack va features'ni massiv sifatida kutadi (bazada vergul bilan saqlanadi)
+    return {
+        "id": str(product.id),  # Frontend id'ni string sifatida solishtiradi
+        "title": product.title,
+        "description": product.description,
+        "price": product.price,
+        "image": product.image,
+        "category": product.category,
+        "techStack": product.techStack.split(",") if product.techStack else [],
+        "features": product.features.split(",") if product.features else [],
+    }
+
+
+def product_tags(product: dict) -> dict:
+    """teg -> og'irlik"""
+    tags = {}
+    for tech in product["techStack"]:
+        tech = tech.strip().lower()
+        if tech:
+            tags["tech:" + tech] = 1
+    if product["category"]:
+        tags["cat:" + product["category"].strip().lower()] = CATEGORY_WEIGHT
+    return tags
+
+
+class CatalogSnapshot:
+    def __init__(self, products: list):
+        self.products = products
+        self.by_id = {p["id"]: p for p in products}
+        self.tags = {p["id"]: product_tags(p) for p in products}
+        # teg -> id'lar (int, o'sish tartibida)
+        self.postings = {}
+        for pid in sorted(self.by_id, key=int):
+            for tag in self.tags[pid]:
+                self.postings.setdefault(tag, []).append(int(pid))
+        self._details = {}
+        self._orders = {}
+        self.related = None         # build_related() dan keyin: pid -> [pid, ...]
+        self.sequence = next(_sequence)
+        self.recomputed = 0
+
+    # ── related ──
+
+    def _candidates(self, pid: str) -> set:
+        key = int(pid)
+        found = set()
+        for tag in self.tags[pid]:
+            posting = self.postings[tag]
+            if len(posting) <= RELATED_MAX_POSTING:
+                found.update(posting)
+            else:
+                i = bisect.bisect_left(posting, key)
+                found.update(posting[max(0, i - RELATED_WINDOW):i + RELATED_WINDOW + 1])
+        found.discard(key)
+        return found
+
+    def _score_related(self, pid: str) -> list:
+        tags = self.tags[pid]
+        ranked = []
+        for other in self._candidates(pid):
+            other_tags = self.tags[str(other)]
+            score = sum(weight for tag, weight in tags.items() if tag in other_tags)
+            ranked.append((-score, other))
+        ranked.sort()
+        return [str(other) for _, other in ranked[:RELATED_PRODUCTS_LIMIT]]
+
+    def _neighbours(self, pid: str, tag: str) -> list:
+        """pid ni nomzod sifatida ko'radigan shu teg a'zolari (pid tegda bo'lmasa — bo'sh)."""
+        posting = self.postings.get(tag, ())
+        key = int(pid)
+        i = bisect.bisect_left(posting, key)
+        if i == len(posting) or posting[i] != key:
+            return []
+        return posting[max(0, i - RELATED_WINDOW):i + RELATED_WINDOW + 1]
+
+    def _affected(self, base) -> set:
+        """Related ro'yxati qayta hisoblanishi kerak bo'lgan mahsulotlar (base — oldingi tayyor snapshot)."""
+        changed = {
+            pid for pid in self.by_id.keys() | base.by_id.keys()
+            if self.tags.get(pid) != base.tags.get(pid)
+        }
+        affected = set(changed)
+        whole = set()       # kam teglar (yoki kam/keng chegarasidan o'tganlar) — har biri bir marta
+        for pid in changed:
+            for tag in self.tags.get(pid, {}).keys() | base.tags.get(pid, {}).keys():
+                if tag in whole:
+                    continue
+                new, old = self.postings.get(tag, ()), base.postings.get(tag, ())
+                if len(new) <= RELATED_MAX_POSTING or len(old) <= RELATED_MAX_POSTING:
+                    # Kam tegning barcha a'zolari pid ni nomzod sifatida ko'radi
+                    whole.add(tag)
+                else:
+                    affected.update(str(other) for other in self._neighbours(pid, tag))
+                    affected.update(str(other) for other in base._neighbours(pid, tag))
+        for tag in whole:
+            affected.update(str(other) for other in self.postings.get(tag, ()))
+        return affected & self.by_id.keys()
+
+    def build_related(self, base=None) -> None:
+        """related'ni hisoblaydi: base bo'lsa faqat ta'sirlangan mahsulotlar uchun."""
+        if base is None or base.related is None:
+            affected = self.by_id.keys()
+            related = {}
+        else:
+            affected = self._affected(base)
+            related = {pid: base.related[pid] for pid in self.by_id if pid not in affected}
+            if len(affected) > len(self.by_id) // 2:
+                # Katalogning ko'p qismi o'zgargan (masalan, katta import) — to'liq qurish arzonroq
+                affected, related = self.by_id.keys(), {}
+        for pid in affected:
+            related[pid] = self._score_related(pid)
+        self.recomputed = len(affected)
+        self.related = related
+
+    @property
+    def related_ready(self) -> bool:
+        return self.related is not None
+
+    def related_ids(self, pid: str) -> list:
+        if self.related is not None:
+            return self.related.get(pid, [])
+        # Fonda qurilmoqda — oxirgi tayyor snapshot'niki (o'chirilgan mahsulotlarsiz)
+        base = _ready
+        if base is None or base is self:
+            return []
+        return [other for other in base.related.get(pid, ()) if other in self.by_id]
+
+    def ordered(self, key, ranking: list) -> list:
+        """Mahsulotlar ranking (id'lar) tartibida, qolganlari oxirida id bo'yicha. key bo'yicha keshlanadi."""
+        products = self._orders.get(key)
+        if products is None:
+            ranked = [self.by_id[pid] for pid in ranking if pid in self.by_id]
+            seen = {p["id"] for p in ranked}
+            products = ranked + [p for p in self.products if p["id"] not in seen]
+            self._orders = {key: products}      # faqat oxirgi versiya kerak
+        return products
+
+    def summary(self, pid: str) -> dict:
+        """Ro'yxatlar (related, tavsiyalar) uchun qisqa ko'rinish."""
+        product = self.by_id[pid]
+        return {field: product[field] for field in _SUMMARY_FIELDS}
+
+    def detail(self, pid: str):
+        """Mahsulot + related ro'yxati (id bo'yicha keshlangan). Topilmasa None."""
+        detail = self._details.get(pid)
+        if detail is None:
+            product = self.by_id.get(pid)
+            if product is None:
+                return None
+            detail = {
+                **product,
+                "related": [self.summary(other) for other in self.related_ids(pid)],
+            }
+            if self.related_ready:
+                self._details[pid] = detail
+        return detail
+
+
+def _publish(snapshot: CatalogSnapshot) -> None:
+    global _ready
+    with _build_lock:
+        # Parallel qurilganlardan eskisi yangisini almashtirmaydi
+        if _ready is None or snapshot.sequence > _ready.sequence:
+            _ready = snapshot
+
+
+def _build(snapshot: CatalogSnapshot) -> None:
+    snapshot.build_related(_ready)
+    _publish(snapshot)
+
+
+def _build_pending() -> None:
+    global _pending, _builder
+    while True:
+        with _build_lock:
+            snapshot, _pending = _pending, None
+            if snapshot is None:
+                _builder = None
+                return
+        try:
+            _build(snapshot)
+        except Exception:
+            logger.exception("Related ro'yxatlarini qurib bo'lmadi")
+
+
+def _schedule(snapshot: CatalogSnapshot) -> None:
+    """Fonda quradi; builder band bo'lsa oraliq snapshot'lar o'tkazib yuboriladi (faqat eng yangisi)."""
+    global _pending, _builder
+    with _build_lock:
+        _pending = snapshot
+        if _builder is None:
+            _builder = threading.Thread(target=_build_pending, name="catalog-related", daemon=True)
+            _builder.start()
+
+
+def load_snapshot(db: Session, _key=None) -> CatalogSnapshot:
+    """VersionedCache loader: bazadan katalogni o'qiydi; related oldingi tayyor snapshot asosida quriladi."""
+    products = [format_product(p) for p in db.query(models.Product).order_by(models.Product.id).all()]
+    snapshot = CatalogSnapshot(products)
+    if len(products) <= RELATED_SYNC_BUILD_LIMIT:
+        _build(snapshot)
+    else:
+        _schedule(snapshot)
+    return snapshot
@@ -0,0 +1,255 @@
+"""
+Katalogni ommaviy import/eksport qilish (CSV yoki JSONL).
+
+Import (POST /api/admin/products/import) yuklangan faylni oqim sifatida qatorma-
+qator o'qiydi — fayl xotiraga to'liq yuklanmaydi. Har bir qator
+`schemas.ProductCreate` bilan tekshiriladi (va ustun uzunliklari bilan); xato
+qatorlar o'tkazib yuboriladi va javobda qator raqami bilan qaytariladi.
+To'g'ri qatorlar IMPORT_BATCH_SIZE tadan bitta tranzaksiyada yoziladi:
+  - `id` berilgan qatorlar upsert qilinadi (bor bo'lsa yangilanadi, yo'q bo'lsa
+    shu id bilan qo'shiladi) — eksport faylini qayta import qilish mumkin;
+  - `id` siz qatorlar yangi mahsulot sifatida bitta executemany bilan qo'shiladi.
+Batch xato bersa faqat o'sha batch bekor qilinadi, qolganlari davom etadi.
+
+Eksport (GET /api/admin/products/export) mahsulotlarni id bo'yicha chunk'lab
+o'qiydi va javobni oqim bilan yuboradi.
+
+CSV ustunlari: id, title, description, price, image, category, techStack,
+features, download_file. techStack va features katakda vergul bilan ajratiladi
+(bazadagidek). download_file ustuni faylda bo'lmasa mavjud mahsulotlarning
+qiymati o'zgarmaydi.
+"""
+import csv
+import io
+import json
+import os
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+
+import cache
+import models
+import schemas
+from database import ReadSessionLocal, SessionLocal, serialized_writes
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+EXPORT_CHUNK_SIZE = 5000
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+MEDIA_TYPES = {CSV: "text/csv; charset=utf-8", JSONL: "application/x-ndjson"}
+
+FIELDS = ("title", "description", "price", "image", "category", "techStack", "features", "download_file")
+COLUMNS = ("id",) + FIELDS
+_LIST_FIELDS = ("techStack", "features")
+_OPTIONAL_FIELDS = ("download_file",)
+_REQUIRED_FIELDS = ("title", "price")
+_MAX_LENGTHS = {field: models.Product.__table__.c[field].type.length for field in FIELDS}
+
+
+def detect_format(format: str, filename: str = None):
+    """"csv" / "jsonl" yoki None — avval parametr, keyin fayl kengaytmasi bo'yicha."""
+    if format:
+        format = format.lower()
+        return format if format in FORMATS else None
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return CSV
+    if name.endswith((".jsonl", ".ndjson")):
+        return JSONL
+    return None
+
+
+# ── Import ──────────────────────────────────────────────────────────────────
+
+def _csv_rows(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    for row in reader:
+        row.pop(None, None)     # sarlavhadan ortiqcha kataklar
+        yield reader.line_num, row, None
+
+
+def _jsonl_rows(stream):
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8-sig"), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"JSON xato: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Qator JSON obyekt bo'lishi kerak"
+            continue
+        yield line_number, row, None
+
+
+def _split_list(value):
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return value if value is not None else []
+
+
+def _validate(row: dict) -> dict:
+    """Bazaga yoziladigan qiymatlar (id None bo'lishi mumkin). Xato bo'lsa ValueError."""
+    data = {field: row.get(field) for field in FIELDS if row.get(field) is not None}
+    # CSV'da bo'sh katak "" bo'lib keladi — majburiy maydonlar uchun bu "yo'q" degani
+    for field in _REQUIRED_FIELDS:
+        if isinstance(data.get(field), str) and not data[field].strip():
+            del data[field]
+    for field in _LIST_FIELDS:
+        data[field] = _split_list(row.get(field))
+    try:
+        product = schemas.ProductCreate.model_validate(data)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    values = product.model_dump()
+    for field in _LIST_FIELDS:
+        values[field] = ",".join(values[field])
+    for field in _OPTIONAL_FIELDS:
+        values[field] = values[field] or None
+
+    product_id = row.get("id")
+    if product_id in (None, ""):
+        product_id = None
+    else:
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"id: butun son bo'lishi kerak ({product_id!r})")
+        if product_id <= 0:
+            raise ValueError("id: musbat bo'lishi kerak")
+
+    for field, limit in _MAX_LENGTHS.items():
+        if limit and values[field] and len(values[field]) > limit:
+            raise ValueError(f"{field}: {limit} belgidan uzun")
+    # Faylda yo'q ixtiyoriy ustunlar upsert'da yangilanmaydi
+    keep = tuple(field for field in _OPTIONAL_FIELDS if field not in row)
+    return {"id": product_id, **values, "_keep": keep}
+
+
+def _write_batch(batch: list):
+    """Bitta tranzaksiya. (qo'shilganlar, yangilanganlar)."""
+    by_id = {}
+    new = []
+    for values in batch:
+        if values["id"] is None:
+            new.append({field: values[field] for field in FIELDS})
+        else:
+            by_id[values["id"]] = values      # takroriy id — oxirgisi qoladi
+    # Yangilanadigan ustunlar to'plami bo'yicha guruhlar (executemany bir xil kalitlarni talab qiladi)
+    groups = {}
+    for values in by_id.values():
+        groups.setdefault(values["_keep"], []).append(
+            {column: values[column] for column in COLUMNS if column not in values["_keep"]}
+        )
+    db = SessionLocal()
+    try:
+        with serialized_writes:  # SQLite: bitta yozuvchi navbati
+            existing = set()
+            if by_id:
+                existing = set(db.execute(
+                    select(models.Product.id).where(models.Product.id.in_(by_id))
+                ).scalars().all())
+                for keep, rows in groups.items():
+                    replace = tuple(field for field in FIELDS if field not in keep)
+                    cache.upsert_many(db, models.Product.__table__, rows, keys=["id"], replace=replace)
+            if new:
+                db.execute(insert(models.Product), new)
+            cache.bump(db, cache.CATALOG)
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    inserted = len(new) + len(by_id) - len(existing)
+    return inserted, len(batch) - inserted
+
+
+def import_stream(stream, format: str) -> dict:
+    """Faylni oqim bilan o'qib, batch'lab yozadi. Natija: sonlar va qator xatolari."""
+    result = {"rows": 0, "inserted": 0, "updated": 0, "batches": 0, "error_count": 0, "errors": []}
+
+    def fail(line: int, message: str):
+        result["error_count"] += 1
+        if len(result["errors"]) < IMPORT_MAX_ERRORS:
+            result["errors"].append({"line": line, "error": message})
+
+    def flush(batch: list, lines: list):
+        try:
+            inserted, updated = _write_batch(batch)
+        except Exception as e:
+            for line in lines:
+                fail(line, f"Batch yozilmadi: {e}")
+            return
+        result["inserted"] += inserted
+        result["updated"] += updated
+        result["batches"] += 1
+
+    rows = _csv_rows(stream) if format == CSV else _jsonl_rows(stream)
+    batch, lines = [], []
+    try:
+        for line, row, error in rows:
+            result["rows"] += 1
+            if error is None:
+                try:
+                    batch.append(_validate(row))
+                    lines.append(line)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                fail(line, error)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush(batch, lines)
+                batch, lines = [], []
+    except (UnicodeDecodeError, csv.Error) as e:
+        fail(result["rows"] + 1, f"Faylni o'qib bo'lmadi: {e}")
+    if batch:
+        flush(batch, lines)
+    return result
+
+
+# ── Eksport ─────────────────────────────────────────────────────────────────
+
+def _csv_chunk(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _jsonl_chunk(rows) -> str:
+    lines = []
+    for row in rows:
+        item = dict(zip(COLUMNS, row))
+        for field in _LIST_FIELDS:
+            item[field] = _split_list(item[field] or "")
+        lines.append(json.dumps(item, ensure_ascii=False) + "\n")
+    return "".join(lines)
+
+
+def export_stream(format: str):
+    """Generator: mahsulotlar id bo'yicha EXPORT_CHUNK_SIZE tadan, tayyor matn bo'laklari."""
+    columns = [models.Product.__table__.c[column] for column in COLUMNS]
+    db = ReadSessionLocal()
+    try:
+        if format == CSV:
+            yield _csv_chunk([], header=True)
+        after_id = 0
+        while True:
+            rows = db.execute(
+                select(*columns).where(models.Product.id > after_id).order_by(models.Product.id).limit(EXPORT_CHUNK_SIZE)
+            ).all()
+            if not rows:
+                return
+            yield _csv_chunk(rows) if format == CSV else _jsonl_chunk(rows)
+            after_id = rows[-1][0]
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+"""
+Shaxsiy kabinet (Dashboard) uchun yig'ma read-model.
+
+GET /api/dashboard profil, buyurtmalar (qatorlari bilan), tranzaksiyalar,
+savatcha va wishlist'ni bitta javobda qaytaradi — sahifa avval beshta alohida
+so'rov yuborardi. Read-model foydalanuvchi bo'yicha `dashboard_cache` da
+saqlanadi; hamyon, buyurtma, savatcha, wishlist va profil yozuvlari o'z
+tranzaksiyasi ichida `bump(db, user_id)` chaqiradi.
+
+Read-model'da mahsulotlar faqat id bilan saqlanadi: nomi, narxi va rasmi javob
+paytida katalog snapshot'idan olinadi, shuning uchun mahsulot tahrirlanganda
+har bir foydalanuvchi keshini tozalash shart emas. Balans keshlanmaydi
+(cache.principal_cache bilan bir xil qoida) — u har doim bazadan o'qiladi.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+import cache
+import models
+
+
+def _load(db: Session, user_id: int) -> dict:
+    user = db.get(models.User, user_id)
+    if user is None:
+        return None
+    orders = db.execute(
+        select(models.Order)
+        .options(selectinload(models.Order.items))
+        .where(models.Order.user_id == user_id)
+        .order_by(models.Order.created_at.desc())
+    ).scalars().all()
+    transactions = db.execute(
+        select(models.Transaction)
+        .where(models.Transaction.user_id == user_id)
+        .order_by(models.Transaction.created_at.desc())
+    ).scalars().all()
+    cart = db.execute(
+        select(models.CartItem.product_id, models.CartItem.quantity)
+        .where(models.CartItem.user_id == user_id)
+        .order_by(models.CartItem.id)
+    ).all()
+    wishlist = db.execute(
+        select(models.WishlistItem.product_id)
+        .where(models.WishlistItem.user_id == user_id)
+        .order_by(models.WishlistItem.id)
+    ).scalars().all()
+    return {
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "is_admin": user.is_admin,
+            "role": user.role or 'user',
+            "full_name": user.full_name,
+            "phone": user.phone,
+            "created_at": user.created_at,
+            "orders_count": len(orders),
+            "total_spent_usd": round(sum(o.amount_usd or 0 for o in orders), 2),
+        },
+        "orders": [
+            {
+                "id": o.id,
+                "product_title": o.product_title,
+                "product_image": o.product_image,
+                "product_category": o.product_category or '',
+                "amount_usd": o.amount_usd,
+                "status": o.status or 'completed',
+                "created_at": o.created_at,
+                "items": [
+                    {
+                        "product_id": item.product_id,
+                        "product_title": item.product_title,
+                        "product_image": item.product_image,
+                        "quantity": item.quantity,
+                        "amount_usd": item.amount_usd,
+                    }
+                    for item in o.items
+                ],
+            }
+            for o in orders
+        ],
+        "transactions": [
+            {
+                "id": t.id,
+                "type": t.type,
+                "amount": t.amount,
+                "currency": t.currency,
+                "description": t.description,
+                "created_at": t.created_at,
+            }
+            for t in transactions
+        ],
+        "cart": [(product_id, quantity) for product_id, quantity in cart],
+        "wishlist": list(wishlist),
+    }
+
+
+dashboard_cache = cache.UserScopedCache(cache.DASHBOARD, _load)
+
+
+def bump(db: Session, user_id: int) -> None:
+    """Foydalanuvchi dashboard'ini eskirtiradi (commit chaqiruvchida)."""
+    dashboard_cache.bump(db, user_id)
+
+
+def bump_many(db: Session, user_ids) -> None:
+    """Bir nechta foydalanuvchi (masalan, sweeper batch'i) — bitta UPDATE."""
+    dashboard_cache.bump_many(db, user_ids)
+
+
+def build(model: dict, snapshot, balance: float) -> dict:
+    """Read-model + katalog snapshot'i + balans -> /api/dashboard javobi."""
+    cart = [
+        {**snapshot.summary(str(product_id)), "id": product_id, "quantity": quantity}
+        for product_id, quantity in model["cart"]
+        if str(product_id) in snapshot.by_id
+    ]
+    wishlist = [
+        {**snapshot.summary(str(product_id)), "id": product_id}
+        for product_id in model["wishlist"]
+        if str(product_id) in snapshot.by_id
+    ]
+    return {
+        "user": {**model["user"], "balance": balance or 0.0},
+        "orders": model["orders"],
+        "transactions": model["transactions"],
+        "cart": cart,
+        "wishlist": wishlist,
+    }
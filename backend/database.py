@@ -1,8 +1,19 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from contextlib import ContextDecorator
 from dotenv import load_dotenv
 import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: faqat process ichidagi navbat
+    fcntl = None
 
 # .env fayldan muhit o'zgaruvchilarini yuklash
 load_dotenv()
@@ -13,11 +24,293 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise RuntimeError("DATABASE_URL muhit o'zgaruvchisi topilmadi! .env faylini tekshiring.")
 
-# MySQL uchun engine yaratish
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# ── Connection pool sozlamalari ───────────────────────────────────────────────
+# Sync endpointlar anyio threadpool'ida ishlaydi: bitta worker bir vaqtda
+# THREADPOOL_SIZE tagacha ulanish so'rashi mumkin. Pool shunga qarab o'lchanadi.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))      # worker (process) soni
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))     # anyio default: 40
+# Barcha worker'lar uchun umumiy ulanish limiti (MySQL max_connections'dan kam). 0 = cheklanmagan
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+
+
+def _auto_pool_size():
+    """Worker va thread soniga qarab (pool_size, max_overflow) ni hisoblaydi."""
+    per_worker = THREADPOOL_SIZE
+    if DB_MAX_CONNECTIONS > 0:
+        per_worker = max(1, min(per_worker, DB_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY)))
+    # Doimiy ochiq ulanishlar — choragi; qolgani faqat yuklama paytida (overflow)
+    pool_size = max(1, min(per_worker, max(5, per_worker // 4)))
+    return pool_size, per_worker - pool_size
+
+
+_auto_size, _auto_overflow = _auto_pool_size()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(_auto_size)))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(_auto_overflow)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# MySQL wait_timeout'dan oldin ulanishni yangilash ("MySQL server has gone away" oldini olish)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+
+# Pool ko'rsatkichlari (admin metrics endpoint orqali ko'rinadi)
+_metrics_lock = threading.Lock()
+pool_metrics = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "wait_total_ms": 0.0,
+    "wait_max_ms": 0.0,
+}
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool + ulanish kutish vaqti va timeout hisoblagichlari."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with _metrics_lock:
+                pool_metrics["timeouts"] += 1
+            raise
+        finally:
+            waited = (time.perf_counter() - started) * 1000
+            with _metrics_lock:
+                pool_metrics["checkouts"] += 1
+                pool_metrics["wait_total_ms"] += waited
+                if waited > pool_metrics["wait_max_ms"]:
+                    pool_metrics["wait_max_ms"] = waited
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:"))
+
+
+# ── SQLite (bitta server) profili ─────────────────────────────────────────────
+# Kichik deploylar SQLite'da ishlaydi. "tuned" profil: WAL (o'quvchilar yozuvchini
+# kutmaydi), synchronous=NORMAL, mmap va katta page cache, busy_timeout.
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned")   # "tuned" | "default"
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None) -> None:
+    """Har bir yangi SQLite ulanishida PRAGMA sozlamalarini o'rnatadi (connect event)."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+class SQLiteWriterQueue(ContextDecorator):
+    """
+    SQLite'da wallet/checkout yozuvlarini bitta navbatga qo'yadi (bir vaqtda bitta yozuvchi).
+
+    SQLite baribir bitta yozuvchiga ruxsat beradi; navbatsiz parallel tranzaksiyalar
+    "database is locked" bilan tushadi yoki balansni o'qib-yozishda bir-birini bosadi.
+    MySQL'da hech narsa qilmaydi. Dekorator yoki `with` sifatida ishlatiladi.
+
+    Navbat ikki bosqichli: process ichida threading.Lock, worker'lar (uvicorn
+    --workers) orasida esa baza fayli yonidagi lock faylda fcntl.flock. Lock fayl
+    har process'da birinchi ishlatilganda ochiladi (fork'dan keyin umumiy
+    deskriptor qolmasligi uchun).
+    """
+
+    def __init__(self, enabled: bool, lock_path: str = None):
+        self.enabled = enabled
+        self.lock_path = lock_path if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    def _file_lock(self) -> int:
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def __enter__(self):
+        if self.enabled:
+            self._lock.acquire()
+            if self.lock_path:
+                try:
+                    fcntl.flock(self._file_lock(), fcntl.LOCK_EX)
+                except BaseException:
+                    self._lock.release()
+                    raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            if self.lock_path:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._lock.release()
+        return False
+
+
+def _sqlite_lock_path(url: str):
+    """Fayl SQLite'i uchun worker'lar o'rtasidagi lock fayl (in-memory uchun None)."""
+    if not url.startswith("sqlite") or _is_memory_sqlite(url):
+        return None
+    return os.path.abspath(make_url(url).database) + ".writer.lock"
+
+
+serialized_writes = SQLiteWriterQueue(enabled=IS_SQLITE, lock_path=_sqlite_lock_path(SQLALCHEMY_DATABASE_URL))
+
+
+def _engine_options(url: str) -> dict:
+    if _is_memory_sqlite(url):
+        # In-memory SQLite — SQLAlchemy o'zining SingletonThreadPool'ini ishlatadi
+        return {}
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# MySQL (yoki SQLite) uchun engine yaratish
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+
+if IS_SQLITE and SQLITE_PROFILE == "tuned" and not _is_memory_sqlite(SQLALCHEMY_DATABASE_URL):
+    event.listen(engine, "connect", apply_sqlite_pragmas)
 
 # Sessiya (Session) yaratish
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# ── Read-replica (ixtiyoriy) ──────────────────────────────────────────────────
+# DATABASE_READ_URL berilsa katalog, tarix va admin hisobotlari replica'dan o'qiladi.
+# Foydalanuvchi o'zi yozgandan keyin READ_YOUR_WRITES_SECONDS davomida uning
+# o'qishlari primary'ga yo'naltiriladi (replica kechikishi ko'rinmasligi uchun).
+# Pin yozuv tranzaksiyasi ichida read_pins jadvaliga ham yoziladi — keyingi so'rov
+# boshqa worker'ga (yoki boshqa instance'ga) tushsa ham primary'dan o'qiladi.
+# Muddat unix vaqtda: instance'lar soatlari sinxron (NTP) bo'lishi kerak.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+read_engine = None
+if SQLALCHEMY_READ_DATABASE_URL:
+    read_engine = create_engine(SQLALCHEMY_READ_DATABASE_URL, **_engine_options(SQLALCHEMY_READ_DATABASE_URL))
+    if (SQLALCHEMY_READ_DATABASE_URL.startswith("sqlite") and SQLITE_PROFILE == "tuned"
+            and not _is_memory_sqlite(SQLALCHEMY_READ_DATABASE_URL)):
+        event.listen(read_engine, "connect", apply_sqlite_pragmas)
+
+_pin_lock = threading.Lock()
+_pinned_until = {}   # user_id -> time.time() muddati (shu worker yozuvlari — bazaga so'rovsiz)
+
+
+def pin_to_primary(user_id) -> None:
+    """Foydalanuvchi o'qishlarini shu worker'da qisqa muddat primary'ga bog'laydi (read-your-writes)."""
+    if read_engine is None or user_id is None:
+        return
+    now = time.time()
+    with _pin_lock:
+        _pinned_until[user_id] = now + READ_YOUR_WRITES_SECONDS
+        if len(_pinned_until) > 10000:
+            for key in [k for k, until in _pinned_until.items() if until <= now]:
+                del _pinned_until[key]
+
+
+def _shared_pin(user_id) -> float:
+    """read_pins dagi muddat (primary'dan) — boshqa worker'larda qilingan yozuvlar uchun."""
+    import models  # models Base'ni shu moduldan oladi
+    with engine.connect() as conn:
+        until = conn.execute(
+            select(models.ReadPin.pinned_until).where(models.ReadPin.user_id == user_id)
+        ).scalar()
+    return until or 0.0
+
+
+def is_pinned(user_id) -> bool:
+    if user_id is None:
+        return False
+    now = time.time()
+    until = _pinned_until.get(user_id)
+    if until is not None and until > now:
+        return True
+    return _shared_pin(user_id) > now
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _share_pin_before_commit(session):
+    # get_current_user sessiyaga user_id yozib qo'yadi; commit = shu foydalanuvchi yozdi.
+    # Pin shu tranzaksiyada yoziladi: yozuv ko'ringan paytdan boshlab pin ham ko'rinadi
+    user_id = session.info.get("user_id")
+    if read_engine is None or user_id is None:
+        return
+    import cache
+    import models
+    cache.upsert_add(
+        session, models.ReadPin.__table__,
+        [{"user_id": user_id, "pinned_until": time.time() + READ_YOUR_WRITES_SECONDS}],
+        keys=["user_id"], counters=[], replace=("pinned_until",),
+    )
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _pin_after_commit(session):
+    # Shu worker keyingi so'rovlarda read_pins'ni o'qimasdan primary'ni tanlaydi
+    pin_to_primary(session.info.get("user_id"))
+
+
+class RoutingSession(Session):
+    """
+    Faqat o'qish uchun sessiya: replica'ga boradi, lekin yozish (flush) va
+    yaqinda yozgan foydalanuvchining so'rovlari primary'ga yo'naltiriladi.
+    Foydalanuvchi so'rov vaqtida aniqlanadi (request.state.user_id), shuning
+    uchun bind birinchi so'rov bajarilayotganda tanlanadi va sessiya oxirigacha saqlanadi.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_engine is None or self._flushing:
+            return engine
+        bind = self.info.get("bind")
+        if bind is not None:
+            return bind
+        request = self.info.get("request")
+        user_id = getattr(request.state, "user_id", None) if request is not None else None
+        if user_id is None:
+            return read_engine
+        bind = engine if is_pinned(user_id) else read_engine
+        self.info["bind"] = bind
+        return bind
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
 # Asosiy model (Base) klasi
 Base = declarative_base()
+
+
+def pool_stats(bind=engine) -> dict:
+    """Pool holati va kutish ko'rsatkichlari (kutish hisoblagichlari barcha engine'lar uchun umumiy)."""
+    pool = bind.pool
+    with _metrics_lock:
+        snapshot = dict(pool_metrics)
+    checkouts = snapshot["checkouts"]
+    snapshot["wait_avg_ms"] = round(snapshot["wait_total_ms"] / checkouts, 3) if checkouts else 0.0
+    snapshot["wait_total_ms"] = round(snapshot["wait_total_ms"], 3)
+    snapshot["wait_max_ms"] = round(snapshot["wait_max_ms"], 3)
+    if isinstance(pool, QueuePool):
+        snapshot.update({
+            "pool_size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "timeout_seconds": DB_POOL_TIMEOUT,
+            "recycle_seconds": DB_POOL_RECYCLE,
+            "pre_ping": DB_POOL_PRE_PING,
+        })
+    snapshot["pool_class"] = type(pool).__name__
+    return snapshot
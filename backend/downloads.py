@@ -0,0 +1,87 @@
+"""
+Sotib olingan raqamli mahsulotlarni (arxivlarni) yetkazish: imzolangan, muddati
+cheklangan yuklab olish havolalari.
+
+1. POST /api/downloads/{product_id}/link — foydalanuvchi mahsulotni sotib
+   olganini (to'langan buyurtmadagi order_items qatori) tekshiradi va
+   DOWNLOAD_URL_TTL_SECONDS muddatli havola qaytaradi.
+2. GET /api/downloads/file?token=... — token HMAC-SHA256 imzosi va muddati
+   bo'yicha tekshiriladi; bazaga murojaat yo'q (fayl yo'li tokenning o'zida).
+
+Fayl starlette FileResponse bilan uzatiladi: Range/If-Range (uzilgan yuklashni
+davom ettirish), ETag va Last-Modified; fayl xotiraga yuklanmaydi va endpoint
+async — katta yuklashlar threadpool'ni band qilmaydi. ASGI server
+`http.response.pathsend` ni qo'llasa fayl server tomonidan yuboriladi.
+DOWNLOADS_ACCEL_PREFIX berilsa javob nginx'ga X-Accel-Redirect bilan
+topshiriladi (nginx faylni sendfile bilan, Python'siz uzatadi).
+
+Havola muddati yuklash boshlanishida tekshiriladi: boshlangan yuklash muddat
+o'tsa ham tugaydi, keyinroq davom ettirish uchun yangi havola olinadi.
+
+Imzo uchun alohida DOWNLOAD_SIGNING_KEY majburiy (kamida 32 belgi). JWT kaliti
+kodda ochiq turadi — undan foydalanilsa istalgan fayl yo'li uchun token
+soxtalashtirish mumkin edi. Kalit berilmasa yuklab olish o'chiriladi:
+endpoint'lar 503 qaytaradi, xarid javobida havolalar bo'lmaydi.
+"""
+import os
+
+from sqlalchemy.orm import Session
+
+import analytics
+import auth
+import models
+import signing
+
+MIN_SIGNING_KEY_LENGTH = 32
+
+DOWNLOADS_DIR = os.path.abspath(os.getenv("DOWNLOADS_DIR", "downloads"))
+DOWNLOAD_URL_TTL_SECONDS = int(os.getenv("DOWNLOAD_URL_TTL_SECONDS", "3600"))
+DOWNLOADS_ACCEL_PREFIX = os.getenv("DOWNLOADS_ACCEL_PREFIX", "").rstrip("/")
+# Barcha worker'larda bir xil bo'lishi kerak; JWT kalitidan olinmaydi
+_SIGNING_KEY = os.getenv("DOWNLOAD_SIGNING_KEY", "").encode()
+ENABLED = len(_SIGNING_KEY) >= MIN_SIGNING_KEY_LENGTH and _SIGNING_KEY != auth.SECRET_KEY.encode()
+
+FILE_PATH = "/api/downloads/file"
+
+
+def make_token(user_id: int, product_id: int, file: str, ttl: int = DOWNLOAD_URL_TTL_SECONDS):
+    """(token, tugash vaqti unix soniyalarda)."""
+    if not ENABLED:
+        raise RuntimeError("DOWNLOAD_SIGNING_KEY sozlanmagan — yuklab olish o'chirilgan")
+    return signing.dumps(_SIGNING_KEY, {"u": user_id, "p": product_id, "f": file}, ttl)
+
+
+def verify_token(token: str):
+    """Token ichidagi ma'lumot ({"u", "p", "f", "e"}) yoki None (imzo noto'g'ri / muddati o'tgan)."""
+    if not ENABLED:
+        return None
+    return signing.loads(_SIGNING_KEY, token)
+
+
+def resolve(file: str):
+    """DOWNLOADS_DIR ichidagi mutlaq yo'l yoki None (katalogdan tashqariga chiqish yoki fayl yo'q)."""
+    path = os.path.realpath(os.path.join(DOWNLOADS_DIR, file))
+    if os.path.commonpath([path, os.path.realpath(DOWNLOADS_DIR)]) != os.path.realpath(DOWNLOADS_DIR):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def has_purchased(db: Session, user_id: int, product_id: int) -> bool:
+    """To'langan buyurtmada shu mahsulot bormi — (user_id, product_id) indeksi bo'yicha."""
+    return db.query(models.OrderItem.id).join(
+        models.Order, models.Order.id == models.OrderItem.order_id
+    ).filter(
+        models.OrderItem.user_id == user_id,
+        models.OrderItem.product_id == product_id,
+        models.Order.status.in_(analytics.PURCHASED_STATUSES),
+    ).first() is not None
+
+
+def link(user_id: int, product_id: int, file: str) -> dict:
+    token, expires = make_token(user_id, product_id, file)
+    return {
+        "product_id": product_id,
+        "filename": os.path.basename(file),
+        "url": f"{FILE_PATH}?token={token}",
+        "expires_at": expires,
+    }
@@ -0,0 +1,317 @@
+"""
+Server-Sent Events: admin buyurtmalari va foydalanuvchi balansi uchun jonli hodisalar.
+
+Handler'lar (wallet checkout, topup, Click webhook ...) hodisani `publish(db, ...)`
+bilan o'z tranzaksiyasi ichida `events` jadvaliga yozadi — hodisa faqat commit
+bo'lsa ko'rinadi. Har bir worker'da bitta relay vazifasi (faqat obunachi bor
+paytda) jadvalni EVENTS_POLL_SECONDS da bir marta o'qiydi va hodisalarni o'z
+obunachilarining navbatlariga tarqatadi. Shunday qilib minglab polling
+so'rovlari o'rniga har worker'dan soniyasiga bitta so'rov va bir nechta uzoq
+ulanishlar qoladi; hodisa qaysi worker'da yozilganidan qat'i nazar barcha
+worker'lardagi obunachilarga yetadi.
+
+Kanallar: "admin" (barcha buyurtmalar) va "user:{id}" (balans, o'z buyurtmalari).
+Ulanish uzilsa brauzer EventSource Last-Event-ID bilan qayta ulanadi va
+o'tkazib yuborilgan hodisalar (EVENTS_REPLAY_LIMIT tagacha) qayta yuboriladi.
+Navbati to'lgan (sekin) obunachi uziladi — u ham shu yo'l bilan tiklanadi.
+
+EventSource sarlavha yubora olmaydi, shuning uchun ulanish URL'iga JWT emas,
+qisqa muddatli (EVENTS_TICKET_TTL_SECONDS) va bitta oqimga (scope: "admin" yoki
+"me") bog'langan ticket qo'yiladi — POST /api/events/ticket bilan olinadi va
+alohida EVENTS_TICKET_KEY bilan imzolanadi. Access log'larga tushgan ticket
+tez eskiradi va API'ga kirish uchun yaroqsiz.
+
+MySQL'da autoincrement id'lar commit tartibida kelmasligi mumkin, shuning
+uchun relay oxirgi _GAP_WINDOW ta id'ni qayta o'qiydi va yuborilganlarini
+o'tkazib yuboradi.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import secrets
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+import models
+import signing
+from database import SessionLocal
+
+EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "1") != "0"
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "500"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_REPLAY_LIMIT = int(os.getenv("EVENTS_REPLAY_LIMIT", "100"))
+EVENTS_RETENTION_SECONDS = int(os.getenv("EVENTS_RETENTION_SECONDS", "600"))
+EVENTS_TICKET_TTL_SECONDS = int(os.getenv("EVENTS_TICKET_TTL_SECONDS", "60"))
+# Barcha worker'larda bir xil bo'lishi kerak. Berilmasa har process o'z tasodifiy
+# kalitini oladi — bitta worker'da ishlaydi, bir nechtasida ticket boshqa worker'da rad etiladi
+EVENTS_TICKET_KEY_CONFIGURED = bool(os.getenv("EVENTS_TICKET_KEY"))
+_TICKET_KEY = os.getenv("EVENTS_TICKET_KEY", "").encode() or secrets.token_bytes(32)
+
+_GAP_WINDOW = 200
+_CLEANUP_INTERVAL_SECONDS = 60
+
+ADMIN = "admin"
+ME = "me"
+SCOPES = (ADMIN, ME)
+
+logger = logging.getLogger("layzzbe.events")
+
+stats = {
+    "published": 0,
+    "delivered": 0,
+    "dropped_subscribers": 0,
+    "rejected_subscribers": 0,
+    "relay_polls": 0,
+    "last_error": None,
+}
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def publish(db: Session, channel: str, type: str, data: dict) -> None:
+    """
+    Hodisani joriy tranzaksiyaga qo'shadi (commit chaqiruvchida). Tranzaksiyadagi
+    barcha hodisalar commit oldidan bitta executemany INSERT bilan yoziladi.
+    """
+    if not EVENTS_ENABLED:
+        return
+    db.info.setdefault("pending_events", []).append({
+        "channel": channel,
+        "type": type,
+        "payload": json.dumps(data, ensure_ascii=False, default=str),
+        "created_at": datetime.utcnow(),
+    })
+    stats["published"] += 1
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _write_pending_events(session):
+    pending = session.info.pop("pending_events", None)
+    if pending:
+        session.execute(insert(models.Event), pending)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_pending_events(session):
+    session.info.pop("pending_events", None)
+
+
+def make_ticket(email: str, scope: str) -> dict:
+    """Bitta oqim (scope) uchun qisqa muddatli ticket."""
+    ticket, expires = signing.dumps(_TICKET_KEY, {"sub": email, "s": scope}, EVENTS_TICKET_TTL_SECONDS)
+    return {"ticket": ticket, "expires_at": expires}
+
+
+def verify_ticket(ticket: str, scope: str):
+    """Ticket egasining email'i yoki None (imzo/muddat noto'g'ri yoki boshqa oqim uchun)."""
+    data = signing.loads(_TICKET_KEY, ticket)
+    if data is None or data.get("s") != scope:
+        return None
+    return data.get("sub")
+
+
+def order_payload(order: models.Order, buyer_email: str = None) -> dict:
+    """/api/admin/orders qatori bilan bir xil ko'rinish."""
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "buyer_email": buyer_email,
+        "product_title": order.product_title,
+        "product_image": order.product_image,
+        "amount_usd": order.amount_usd,
+        "status": order.status,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+    }
+
+
+# ── Obunachilar va relay ─────────────────────────────────────────────────────
+
+class Subscriber:
+    def __init__(self, channels: set):
+        self.channels = channels
+        self.queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self.replayed = set()
+        self.closed = False
+
+    def offer(self, event) -> None:
+        if self.closed or event[0] in self.replayed:
+            return
+        try:
+            self.queue.put_nowait(event)
+            stats["delivered"] += 1
+        except asyncio.QueueFull:
+            # Sekin mijoz: uzamiz, EventSource Last-Event-ID bilan qayta ulanadi
+            self.closed = True
+            stats["dropped_subscribers"] += 1
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+def _fetch(floor: int, channels=None, limit: int = 1000) -> list:
+    """(id, channel, type, payload) — id > floor, id bo'yicha."""
+    query = select(models.Event.id, models.Event.channel, models.Event.type, models.Event.payload).where(
+        models.Event.id > floor
+    )
+    if channels is not None:
+        query = query.where(models.Event.channel.in_(channels))
+    db = SessionLocal()
+    try:
+        return [tuple(row) for row in db.execute(query.order_by(models.Event.id).limit(limit))]
+    finally:
+        db.close()
+
+
+def _max_id() -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(select(func.max(models.Event.id))).scalar() or 0
+    finally:
+        db.close()
+
+
+def _cleanup() -> None:
+    cutoff = datetime.utcnow() - timedelta(seconds=EVENTS_RETENTION_SECONDS)
+    db = SessionLocal()
+    try:
+        db.execute(delete(models.Event).where(models.Event.created_at < cutoff))
+        db.commit()
+    finally:
+        db.close()
+
+
+class EventBus:
+    """Worker ichidagi obunachilar. Faqat event loop'dan ishlatiladi — lock kerak emas."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self._task = None
+        self._last_id = 0
+        self._delivered = deque(maxlen=_GAP_WINDOW * 2)
+        self._delivered_ids = set()
+        self._next_cleanup = 0.0
+
+    async def subscribe(self, channels: set, last_event_id: int = None):
+        """Subscriber yoki (limit to'lgan bo'lsa) None."""
+        if len(self.subscribers) >= EVENTS_MAX_SUBSCRIBERS:
+            stats["rejected_subscribers"] += 1
+            return None
+        subscriber = Subscriber(channels)
+        if last_event_id is not None:
+            backlog = await asyncio.to_thread(_fetch, last_event_id, list(channels), EVENTS_REPLAY_LIMIT)
+            for event in backlog:
+                subscriber.offer(event)
+                subscriber.replayed.add(event[0])
+        self.subscribers.add(subscriber)
+        if self._task is None:
+            # Relay worker'ning umumiy vazifasi: birinchi obunachining so'rov kontekstini
+            # (metrics.current_request, tracing span'i, request_id) meros olmasligi uchun
+            # bo'sh contextvars.Context ichida yaratiladi
+            self._task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._relay())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+
+    def _remember(self, event_id: int) -> None:
+        if len(self._delivered) == self._delivered.maxlen:
+            self._delivered_ids.discard(self._delivered[0])
+        self._delivered.append(event_id)
+        self._delivered_ids.add(event_id)
+
+    def dispatch(self, events: list) -> None:
+        for event in events:
+            event_id, channel = event[0], event[1]
+            if event_id in self._delivered_ids:
+                continue
+            self._remember(event_id)
+            self._last_id = max(self._last_id, event_id)
+            for subscriber in list(self.subscribers):
+                if channel in subscriber.channels:
+                    subscriber.offer(event)
+
+    async def _relay(self):
+        primed = False
+        try:
+            while self.subscribers:
+                try:
+                    if not primed:
+                        # Mavjud hodisalar "yuborilgan" deb belgilanadi — faqat yangilari tarqatiladi
+                        self._last_id = await asyncio.to_thread(_max_id)
+                        for event in await asyncio.to_thread(_fetch, max(0, self._last_id - _GAP_WINDOW)):
+                            self._remember(event[0])
+                        primed = True
+                    events = await asyncio.to_thread(_fetch, max(0, self._last_id - _GAP_WINDOW))
+                    stats["relay_polls"] += 1
+                    self.dispatch(events)
+                    now = time.monotonic()
+                    if now >= self._next_cleanup:
+                        self._next_cleanup = now + _CLEANUP_INTERVAL_SECONDS
+                        await asyncio.to_thread(_cleanup)
+                    stats["last_error"] = None
+                except Exception as e:
+                    stats["last_error"] = str(e)
+                    logger.warning("Events relay xatosi: %s", e)
+                await asyncio.sleep(EVENTS_POLL_SECONDS)
+        finally:
+            self._task = None
+
+    async def stop(self):
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+            if not subscriber.queue.full():
+                subscriber.queue.put_nowait(None)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+bus = EventBus()
+
+
+def _format(event) -> str:
+    event_id, _, type, payload = event
+    return f"id: {event_id}\nevent: {type}\ndata: {payload}\n\n"
+
+
+async def stream(request, subscriber: Subscriber):
+    """SSE tanasi: hodisalar, har EVENTS_HEARTBEAT_SECONDS da ping. Uzilganda obuna bekor qilinadi."""
+    try:
+        yield f"retry: {int(EVENTS_POLL_SECONDS * 3000)}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                break
+            yield _format(event)
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "enabled": EVENTS_ENABLED,
+        "subscribers": len(bus.subscribers),
+        "relay_running": bus._task is not None,
+        "poll_seconds": EVENTS_POLL_SECONDS,
+        "ticket_key_configured": EVENTS_TICKET_KEY_CONFIGURED,
+    }
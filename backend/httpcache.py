@@ -0,0 +1,70 @@
+"""
+Ommaviy GET'lar uchun HTTP conditional caching (ETag + Cache-Control + 304).
+
+ETag kesh versiyasidan (cache_versions) hosil qilinadi: mahsulot yoki sozlama
+o'zgarganda handler `cache.bump(...)` qiladi va ETag barcha worker'larda
+o'zgaradi. Shuning uchun ETag "kuchli" (strong) — bir versiyaga bitta javob.
+Deploy'dan keyin javob formati o'zgargan bo'lishi mumkin, shuning uchun ETag'ga
+commit (RENDER_GIT_COMMIT) ham qo'shiladi.
+
+JSON tanasi ham versiya bo'yicha bir marta serialize qilinadi va qayta
+ishlatiladi.
+"""
+import json
+import os
+import threading
+
+from fastapi import Request, Response
+
+HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS", "30"))
+HTTP_CACHE_SWR_SECONDS = int(os.getenv("HTTP_CACHE_SWR_SECONDS", "300"))
+_BUILD = os.getenv("RENDER_GIT_COMMIT", "")[:8]
+
+_MAX_BODIES = 512
+_bodies = {}            # etag -> serialize qilingan JSON
+_lock = threading.Lock()
+
+
+def make_etag(name: str, version, variant: str = "") -> str:
+    parts = [name, str(version or 0)]
+    if variant:
+        parts.append(variant)
+    if _BUILD:
+        parts.append(_BUILD)
+    return '"' + "-".join(parts) + '"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match zaif taqqoslash bilan tekshiriladi (CDN W/ qo'shishi mumkin)
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def cache_headers(etag: str, max_age: int = HTTP_CACHE_MAX_AGE_SECONDS) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={HTTP_CACHE_SWR_SECONDS}",
+    }
+
+
+def not_modified_response(etag: str, max_age: int = HTTP_CACHE_MAX_AGE_SECONDS) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, max_age))
+
+
+def json_response(request: Request, etag: str, payload, max_age: int = HTTP_CACHE_MAX_AGE_SECONDS) -> Response:
+    """ETag mos kelsa 304, aks holda (versiya bo'yicha keshlangan) JSON javob."""
+    if not_modified(request, etag):
+        return not_modified_response(etag, max_age)
+    body = _bodies.get(etag)
+    if body is None:
+        body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        with _lock:
+            if len(_bodies) >= _MAX_BODIES:
+                _bodies.pop(next(iter(_bodies)))
+            _bodies[etag] = body
+    return Response(body, media_type="application/json", headers=cache_headers(etag, max_age))
@@ -0,0 +1,193 @@
+"""
+Load shedding: route sinflari bo'yicha bir vaqtdagi so'rovlar limiti.
+
+Sync endpointlar bitta anyio threadpool (THREADPOOL_SIZE) va DB pool'ini
+bo'lishadi. Flash-sale paytida login yoki admin eksportlar hamma thread'larni
+egallab, checkout'ni kutishga majbur qilmasligi uchun har bir sinf o'z
+budjetiga (bir vaqtda nechta so'rov) va cheklangan kutish navbatiga ega.
+Navbat to'lgan yoki kutish SHED_QUEUE_TIMEOUT_SECONDS dan oshgan so'rov darhol
+503 + Retry-After oladi.
+
+Click webhook uchun SHED_WEBHOOK_RESERVED ta thread ajratilgan: qolgan
+sinflar budjetlari yig'indisi THREADPOOL_SIZE - SHED_WEBHOOK_RESERVED dan
+oshmaydi, shuning uchun to'lov callback'lari doim o'tadi.
+
+Middleware faqat event loop'da ishlaydi — hisoblagichlar lock'siz.
+"""
+import asyncio
+import json
+import os
+from collections import deque
+
+from database import THREADPOOL_SIZE
+
+SHED_ENABLED = os.getenv("SHED_ENABLED", "1") != "0"
+SHED_WEBHOOK_RESERVED = int(os.getenv("SHED_WEBHOOK_RESERVED", "4"))
+SHED_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SHED_QUEUE_TIMEOUT_SECONDS", "2"))
+SHED_RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "1"))
+
+WEBHOOK = "webhook"
+CHECKOUT = "checkout"
+AUTH = "auth"
+ADMIN = "admin"
+CATALOG = "catalog"
+DEFAULT = "default"
+
+# (prefix, sinf) — birinchi mos kelgani olinadi
+ROUTE_CLASSES = [
+    ("/api/payments/click/", WEBHOOK),
+    ("/api/orders/process-wallet-payment", CHECKOUT),
+    ("/api/orders/generate-payment-link", CHECKOUT),
+    ("/api/balance/", CHECKOUT),
+    ("/api/auth/login", AUTH),
+    ("/api/auth/register", AUTH),
+    ("/api/admin/", ADMIN),
+    ("/api/users", ADMIN),
+    ("/metrics", ADMIN),
+    ("/api/products", CATALOG),
+    ("/api/settings/public", CATALOG),
+]
+
+# Limit qo'yilmaydigan yo'llar: health check, uzoq ulanishli SSE oqimlari
+# (SSE budjet slotini soatlab band qilardi; ularning soni EVENTS_MAX_SUBSCRIBERS bilan cheklangan)
+# va fayl yuklashlar (async, thread band qilmaydi, lekin sekin mijozda uzoq davom etadi)
+EXEMPT_PATHS = {"/"}
+EXEMPT_PREFIXES = ("/api/events/", "/api/downloads/file")
+
+# Webhook'dan qolgan thread'lar sinflar orasida shu ulushlarda bo'linadi
+_SHARES = {CATALOG: 0.3, CHECKOUT: 0.3, DEFAULT: 0.2, AUTH: 0.1, ADMIN: 0.1}
+
+
+def _default_limits() -> dict:
+    available = max(len(_SHARES), THREADPOOL_SIZE - SHED_WEBHOOK_RESERVED)
+    limits = {name: max(1, int(available * share)) for name, share in _SHARES.items()}
+    limits[WEBHOOK] = max(1, SHED_WEBHOOK_RESERVED)
+    return limits
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+class RouteBudget:
+    """Bitta sinf uchun semafor + cheklangan FIFO navbat."""
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.queued_total = 0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), SHED_QUEUE_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Slot aynan shu paytda berildi — qaytarib yuboramiz
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        # Slot navbatdagi birinchi kutuvchiga to'g'ridan-to'g'ri beriladi (active o'zgarmaydi)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queued_total": self.queued_total,
+        }
+
+
+def _build_budgets() -> dict:
+    budgets = {}
+    for name, limit in _default_limits().items():
+        limit = _env_int(f"SHED_{name.upper()}_CONCURRENCY", limit)
+        queue_size = _env_int(f"SHED_{name.upper()}_QUEUE", limit * 2)
+        budgets[name] = RouteBudget(name, limit, queue_size)
+    return budgets
+
+
+budgets = _build_budgets()
+
+
+def classify(path: str) -> str:
+    for prefix, name in ROUTE_CLASSES:
+        if path.startswith(prefix):
+            return name
+    return DEFAULT
+
+
+_REJECT_BODY = json.dumps({"detail": "Server hozir band, birozdan keyin qayta urinib ko'ring"}).encode()
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if not SHED_ENABLED or scope["type"] != "http" or path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        budget = budgets[classify(path)]
+        if not await budget.acquire():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_REJECT_BODY)).encode()),
+                    (b"retry-after", str(SHED_RETRY_AFTER_SECONDS).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _REJECT_BODY})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
+
+
+def get_stats() -> dict:
+    return {name: budget.stats() for name, budget in budgets.items()}
@@ -0,0 +1,176 @@
+"""
+Bloklamaydigan strukturali (JSON) log.
+
+So'rov thread'i yozuvni faqat navbatga qo'yadi (QueueHandler); stdout'ga
+yozishni alohida thread (QueueListener) bajaradi. Shuning uchun stdout sekin
+bo'lsa ham wallet va webhook yo'llariga kechikish qo'shilmaydi. Navbat to'lsa
+yozuv tashlab yuboriladi va hisoblanadi — so'rov hech qachon kutmaydi.
+
+Har bir yozuvga joriy X-Request-ID (tracing.py) qo'shiladi. Bir xil xabar
+LOG_SAMPLE_WINDOW_SECONDS ichida LOG_SAMPLE_BURST martadan ko'p takrorlansa
+qolganlari o'tkazib yuboriladi; keyingi chiqgan yozuvda "suppressed" soni bo'ladi.
+
+Ishlatish: `logger = logging.getLogger("layzzbe.<modul>")`. main.py import
+paytida `setup()` ni chaqiradi.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import tracing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")          # "json" | "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "60"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "10"))
+
+ROOT_LOGGER = "layzzbe"
+
+# logging.LogRecord'ning standart atributlari — qolganlari (extra=...) JSON'ga qo'shiladi
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id", "suppressed"}
+
+stats = {
+    "dropped": 0,
+    "suppressed": 0,
+}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Yozuvga joriy so'rovning request id'sini qo'shadi (so'rov thread'ida ishlaydi)."""
+
+    def filter(self, record):
+        record.request_id = tracing.current_request_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Takrorlanuvchi (shovqinli) xabarlarni cheklaydi: oynada LOG_SAMPLE_BURST tadan ko'p emas."""
+
+    def __init__(self, window: float = LOG_SAMPLE_WINDOW_SECONDS, burst: int = LOG_SAMPLE_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._counters = {}     # (logger, msg shabloni) -> [oyna boshi, soni, o'tkazib yuborilgan]
+
+    def filter(self, record):
+        if self.burst <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or now - counter[0] >= self.window:
+                if len(self._counters) > 10000:
+                    self._counters = {}
+                suppressed = counter[2] if counter is not None else 0
+                self._counters[key] = [now, 1, 0]
+            elif counter[1] < self.burst:
+                counter[1] += 1
+                suppressed = 0
+            else:
+                counter[2] += 1
+                stats["suppressed"] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Navbat to'lsa kutmaydi — yozuvni tashlab yuboradi."""
+
+    def prepare(self, record):
+        # Xabar va traceback shu yerda (so'rov thread'ida) matnga aylantiriladi:
+        # args/exc_info boshqa thread'ga o'tkazilmaydi
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            stats["dropped"] += 1
+
+
+def setup() -> None:
+    """"layzzbe" logger'larini navbat + fon writer thread orqali ishlaydigan qiladi. Idempotent."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Navbatdagi yozuvlarni chiqarib writer thread'ni to'xtatadi."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+
+
+def get_stats() -> dict:
+    return dict(stats)
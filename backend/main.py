@@ -1,18 +1,47 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Form as FastAPIForm
+from fastapi import FastAPI, Depends, File, HTTPException, Request, UploadFile, status, Form as FastAPIForm
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy import func, insert, text, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 from typing import Annotated, List
+from urllib.parse import quote
+from datetime import datetime
+import asyncio
+import logging
+import os
 import models
 import schemas
 import auth
-from database import SessionLocal, engine
+import sweeper
+import cache
+import metrics
+import sql_profiler
+import profiler
+import tracing
+import logging_config
+import loadshed
+import ratelimit
+import httpcache
+import catalog
+import recommendations
+import analytics
+import popularity
+import events
+import dashboard
+import catalog_io
+import downloads
+from database import SessionLocal, ReadSessionLocal, THREADPOOL_SIZE, pool_stats, read_engine, serialized_writes
 from jose import JWTError, jwt
-import requests as http_requests  # Telegram uchun
-import hashlib
+from notifications import send_telegram_notification
+from sql_profiler import query_budget
 
-# Yaratilgan modellarni (jadvallarni) bazaga bog'laymiz
-models.Base.metadata.create_all(bind=engine)
+# Strukturali JSON log: navbat + fon writer thread (so'rov thread'i stdout'ni kutmaydi)
+logging_config.setup()
+logger = logging.getLogger("layzzbe.api")
+
+# Jadvallar startup paytida yaratilmaydi — sxema `python migrations.py` orqali
+# (deploy oldidan bir marta) yangilanadi.
 
 # Har bir so'rovda yangi darcha ochib, yopib beruvchi bog'lanish (Dependency)
 def get_db():
@@ -23,43 +52,22 @@ def get_db():
         db.close()
 
 
-def send_telegram_notification(db: Session, message: str) -> None:
-    """
-    Telegram admin ga xabar yuborish.
-    Credentials SystemSetting jadvalidan o'qiladi — .env ishlatilmaydi.
-    Agar sozlamalar yo'q yoki xato bo'lsa — jimgina o'tib ketadi.
-    """
+# Faqat o'qiydigan endpointlar uchun (katalog, tarix, admin hisobotlari):
+# DATABASE_READ_URL bo'lsa replica'ga, aks holda primary'ga boradi.
+def get_read_db(request: Request):
+    db = ReadSessionLocal()
+    db.info["request"] = request
     try:
-        token_row = db.query(models.SystemSetting).filter(
-            models.SystemSetting.key == "telegram_bot_token"
-        ).first()
-        chat_row = db.query(models.SystemSetting).filter(
-            models.SystemSetting.key == "telegram_admin_id"
-        ).first()
-
-        token = token_row.value.strip() if token_row and token_row.value else ""
-        chat_id = chat_row.value.strip() if chat_row and chat_row.value else ""
-
-        if not token or not chat_id:
-            print("[Telegram] Bot token yoki admin ID sozlanmagan — xabar yuborilmadi.")
-            return
-
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        resp = http_requests.post(
-            url,
-            json={"chat_id": chat_id, "text": message, "parse_mode": "HTML"},
-            timeout=5,
-        )
-        if not resp.ok:
-            print(f"[Telegram] Xabar yuborishda xato: {resp.status_code} — {resp.text}")
-    except Exception as e:
-        print(f"[Telegram] Istisno: {e}")
+        yield db
+    finally:
+        db.close()
+
 
 # JWT obyekti qabul qilish nuqtasi, /api/auth/login orqali token olinishini bildiradi
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 # Tokenni tekshirib, tizimdagi foydalanuvchini aniqlovchi funksiya (Dependency)
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
+async def get_current_user(request: Request, token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token yaroqsiz yoki avtorizatsiyadan o'tmagansiz",
@@ -74,13 +82,25 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: Se
     except JWTError:
         raise credentials_exception
         
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+    # Principal keshi: worker'lar orasida cache_versions orqali muvofiqlashtiriladi (cache.py)
+    user = cache.get_principal(db, token_data.email)
     if user is None:
         raise credentials_exception
+    # Read-replica yo'naltirish uchun: kim so'rov yubordi va kim yozdi (database.py)
+    request.state.user_id = user.id
+    db.info["user_id"] = user.id
+    # Admin X-Profile sarlavhasini yuborgan bo'lsa — shu so'rov profiler ostida (profiler.py)
+    if user.is_admin:
+        profiler.start_if_requested(request)
     return user
 
 # FastAPI dasturini yaratamiz
 app = FastAPI(title="Layzzbe Market API")
+# X-Profile: endpoint'lar o'raladi — profiler so'rov thread'ini aniq biladi (profiler.py)
+app.router.route_class = profiler.ProfiledRoute
+
+# Route sinflari bo'yicha concurrency budjetlari (CORS ichida — 503 javobida ham CORS sarlavhalari bo'ladi)
+app.add_middleware(loadshed.LoadSheddingMiddleware)
 
 # CORS sozlamalari (React frontend bilan ishlash uchun)
 app.add_middleware(
@@ -98,59 +118,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dastur ishga tushganda bazani tekshiramiz (startup event)
-@app.on_event("startup")
-def startup_event():
+# SQL profiler: N+1 nomzodlari, sekin SQL, query budget (metrics ichida ishlaydi)
+app.add_middleware(sql_profiler.SQLProfilerMiddleware)
+
+# Har bir route uchun latency, status kodlari va DB vaqti (/metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Admin so'rovi bo'yicha bitta so'rovni sampling profiler ostida bajarish (X-Profile)
+app.add_middleware(profiler.ProfilerMiddleware)
+
+# X-Request-ID va namunaviy (sampled) trace'lar: so'rov, SQL va tashqi HTTP span'lari
+app.add_middleware(tracing.TracingMiddleware)
+
+# Port ochilgandan keyin bajariladigan "isitish" (warmup) — startup'ni sekinlashtirmaydi
+WARMUP_DELAY_SECONDS = float(os.getenv("WARMUP_DELAY_SECONDS", "0.5"))
+_warmup_task = None
+
+
+def warmup():
+    """DB ulanishini ochadi va katalog so'rovini bir marta bajaradi (birinchi so'rov sekin bo'lmasligi uchun)."""
     db = SessionLocal()
-    # Bazada biron mahsulot bormi?
-    product_count = db.query(models.Product).count()
-    if product_count == 0:
-        # Bo'sh bo'lsa, avvalgi soxta ma'lumotlarni haqiqiy SQLite bazasiga joylashtiramiz
-        mock_products = [
-            models.Product(
-                id=1,
-                title="Next.js SaaS Loyiha",
-                description="To'liq tayyor, avtorizatsiya va to'lov tizimiga ega mukammal SaaS platformasi. Loyihani boshlash uchun eng zo'r yechim.",
-                price="$49",
-                image="https://images.unsplash.com/photo-1555066931-4365d14bab8c?q=80&w=1000&auto=format&fit=crop",
-                category="Web Dasturlash",
-                techStack="Next.js,React,Tailwind,Stripe",
-                features="Foydalanuvchilarni autentifikatsiya qilish (Auth.js),Stripe orqali to'lovlar qabul qilish,Ma'lumotlar bazasi integratsiyasi (Prisma & PostgreSQL),To'liq moslashuvchan (Responsive) dizayn,SEO optimizatsiya qilingan"
-            ),
-            models.Product(
-                id=2,
-                title="Fintech Mobil UI Shablon",
-                description="Zamonaviy moliya va bank ilovalari uchun maxsus yaratilgan yuqori sifatli mobil interfeys dizayni va React Native kodlari.",
-                price="$29",
-                image="https://images.unsplash.com/photo-1563986768609-322da13575f3?q=80&w=1000&auto=format&fit=crop",
-                category="Mobil Dasturlash",
-                techStack="Figma,React Native,UI/UX,Expo",
-                features="50 dan ortiq tayyor ekranlar,Qorong'u va yorug' rejim (Dark/Light mode),To'liq Figma komponentlar kutubxonasi,React Native & Expo da oson ishga tushirish,Silliq animatsiyalar"
-            ),
-            models.Product(
-                id=3,
-                title="AI Dashboard Shablon",
-                description="Sun'iy intellekt tahlillari va ma'lumotlar boshqaruvi uchun keng qamrovli, chiroyli va qulay boshqaruv paneli.",
-                price="$39",
-                image="https://images.unsplash.com/photo-1551288049-bebda4e38f71?q=80&w=1000&auto=format&fit=crop",
-                category="Boshqaruv Paneli",
-                techStack="Vue 3,Nuxt,TypeScript,Tailwind",
-                features="Interaktiv grafiklar va chartlar (Chart.js),AI modellarini boshqarish paneli,Kengaytirilgan filtrlash va qidiruv tizimi,Zamonaviy tekis (flat) va neonglass dizayn,Davlat menejmenti (Pinia)"
-            ),
-            models.Product(
-                id=4,
-                title="E-Commerce Backend API",
-                description="Katta yuklamalarga chidamli, tezkor va xavfsiz elektron tijorat tizimlari uchun tayyor RESTful API yadrosi.",
-                price="$59",
-                image="https://images.unsplash.com/photo-1627398225052-24c8c7d81a4b?q=80&w=1000&auto=format&fit=crop",
-                category="Backend",
-                techStack="Node.js,Express,MongoDB,Redis",
-                features="Kesh xotiradan foydalanish (Redis va xotirani optimallashtirish),JWT tabarrik (token) va xavfsizlik (Helmet, Rate Limit),Buyurtmalar tarixi va to'lov holatini kuzatish,Mahsulotlar ko'chirmasi va qidiruv funktsiyalari (Elasticsearch hook),Docker tayyor"
-            )
-        ]
-        db.add_all(mock_products)
-        db.commit()
-    db.close()
+    try:
+        db.execute(text("SELECT 1"))
+        # Katalog va sozlamalar keshini oldindan to'ldiramiz
+        catalog_cache.get(db)
+        cache.settings_cache.get(db)
+    except Exception as e:
+        logger.warning("Warmup xatosi: %s", e)
+    finally:
+        db.close()
+    if read_engine is not None:
+        try:
+            with read_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning("Warmup: replica xatosi: %s", e)
+
+
+async def _warmup_in_background():
+    await asyncio.sleep(WARMUP_DELAY_SECONDS)
+    await asyncio.to_thread(warmup)
+
+
+# Fon vazifalari: warmup va eskirgan pending buyurtmalarni tozalovchi (sweeper).
+# Namunaviy mahsulotlar endi startup'da emas — `python seed.py` orqali qo'shiladi.
+@app.on_event("startup")
+async def start_background_jobs():
+    global _warmup_task
+    # Sync endpointlar uchun threadpool — DB pool ham shu songa qarab o'lchangan (database.py)
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    _warmup_task = asyncio.get_running_loop().create_task(_warmup_in_background())
+    sweeper.start()
+    recommendations.start()
+    popularity.start()
+    tracing.start()
+    if not events.EVENTS_TICKET_KEY_CONFIGURED:
+        logger.warning("EVENTS_TICKET_KEY berilmagan — SSE ticket'lari faqat shu worker'da yaroqli")
+    if not downloads.ENABLED:
+        logger.warning(
+            "DOWNLOAD_SIGNING_KEY berilmagan (yoki %d belgidan qisqa) — /api/downloads/* o'chirilgan",
+            downloads.MIN_SIGNING_KEY_LENGTH,
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await sweeper.stop()
+    await recommendations.stop()
+    await popularity.stop()
+    await events.bus.stop()
+    await asyncio.to_thread(tracing.stop)
 
 # Eng asosiy sahifa (tekshirish uchun)
 @app.get("/")
@@ -159,7 +197,7 @@ def read_root():
 
 # Admin uchun haqiqiy statistika
 @app.get("/api/admin/stats")
-def get_admin_stats(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_admin_stats(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     """Admin uchun real statistika: foydalanuvchilar, mahsulotlar, buyurtmalar."""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
@@ -178,36 +216,287 @@ def get_admin_stats(db: Session = Depends(get_db), current_user: models.User = D
     }
 
 
+# Sotuvlar analitikasi: kun/hafta/oy bo'yicha mahsulot va kategoriya kesimida (rollup'lardan)
+@app.get("/api/admin/analytics")
+def get_admin_analytics(
+    period: str = analytics.DAY,
+    buckets: int = 0,
+    limit: int = 10,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    """Daromad va sotilgan donalar: jami, mahsulot va kategoriya bo'yicha, top sotuvchilar (Faqat Admin)."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    if period not in analytics.PERIODS:
+        raise HTTPException(status_code=400, detail="Davr noto'g'ri: day, week yoki month bo'lishi kerak")
+    buckets = min(max(1, buckets or analytics.DEFAULT_BUCKETS[period]), 366)
+    products = catalog_cache.get(db).by_id
+    return analytics.report(db, period, buckets, products, limit=max(1, min(limit, 100)))
+
+
+# Pending buyurtmalar tozalovchisi (sweeper) ko'rsatkichlari
+@app.get("/api/admin/sweeper")
+def get_sweeper_stats(current_user: models.User = Depends(get_current_user)):
+    """Sweeper ishlash ko'rsatkichlari (Faqat Admin)."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return sweeper.get_stats()
+
+
+# "Buni ham sotib olishgan" tavsiyalar job'i ko'rsatkichlari
+@app.get("/api/admin/recommendations")
+def get_recommendations_stats(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return recommendations.get_stats()
+
+
+# DB connection pool ko'rsatkichlari
+@app.get("/api/admin/metrics/pool")
+def get_pool_metrics(current_user: models.User = Depends(get_current_user)):
+    """Pool hajmi, band ulanishlar, overflow, kutish vaqti va timeout'lar (Faqat Admin)."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    stats = pool_stats()
+    if read_engine is not None:
+        stats["replica"] = pool_stats(read_engine)
+    return stats
+
+
+# Load shedding: sinflar budjeti, band/navbatdagi va rad etilgan so'rovlar (Faqat Admin)
+@app.get("/api/admin/loadshed")
+def get_loadshed_stats(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return {"enabled": loadshed.SHED_ENABLED, "classes": loadshed.get_stats()}
+
+
+# Rate limiter qoidalari va hisoblagichlari (Faqat Admin)
+@app.get("/api/admin/ratelimit")
+def get_ratelimit_stats(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return ratelimit.get_stats()
+
+
+# ── Server-Sent Events (events.py) ───────────────────────────────────────────
+
+def _stream_principal(token: str, ticket: str, scope: str):
+    """
+    SSE uchun ?ticket= (brauzer) yoki Authorization: Bearer JWT (boshqa klientlar).
+    Sessiya darhol yopiladi — uzoq ulanish DB ulanishini band qilmaydi.
+    """
+    if ticket:
+        email = events.verify_ticket(ticket, scope)
+    else:
+        try:
+            email = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("sub")
+        except JWTError:
+            return None
+    if not email:
+        return None
+    db = SessionLocal()
+    try:
+        return cache.principal_cache.get(db, email)
+    finally:
+        db.close()
+
+
+async def _event_stream(request: Request, ticket: str, admin: bool):
+    # JWT URL'da qabul qilinmaydi (access log'larga tushadi) — faqat sarlavhada
+    token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    scope = events.ADMIN if admin else events.ME
+    principal = await asyncio.to_thread(_stream_principal, token, ticket, scope) if ticket or token else None
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Token yaroqsiz yoki avtorizatsiyadan o'tmagansiz")
+    if admin and not principal["is_admin"]:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    channels = {events.ADMIN} if admin else {events.user_channel(principal["id"])}
+    # Brauzer o'zi qayta ulanganda sarlavha; yangi ticket bilan qayta ochilganda — parametr
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    subscriber = await events.bus.subscribe(
+        channels, int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    )
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Server hozir band, birozdan keyin qayta urinib ko'ring")
+    return StreamingResponse(
+        events.stream(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# EventSource uchun qisqa muddatli ticket (scope: "admin" yoki "me")
+@app.post("/api/events/ticket")
+def create_event_ticket(scope: str = events.ME, current_user: models.User = Depends(get_current_user)):
+    if scope not in events.SCOPES:
+        raise HTTPException(status_code=400, detail="scope: admin yoki me bo'lishi kerak")
+    if scope == events.ADMIN and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return events.make_ticket(current_user.email, scope)
+
+
+# Admin: yangi, to'langan va bekor qilingan buyurtmalar (jonli)
+@app.get("/api/events/admin")
+async def admin_events(request: Request, ticket: str = ""):
+    return await _event_stream(request, ticket, admin=True)
+
+
+# Foydalanuvchi: balans (topup/xarid) va o'z buyurtmalari holati (jonli)
+@app.get("/api/events/me")
+async def my_events(request: Request, ticket: str = ""):
+    return await _event_stream(request, ticket, admin=False)
+
+
+@app.get("/api/admin/events")
+def get_events_stats(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return events.get_stats()
+
+
+# Katalog snapshot'i (ro'yxat, id bo'yicha, related) — catalog.py
+catalog_cache = cache.VersionedCache(cache.CATALOG, catalog.load_snapshot)
+
+
+# On-demand profillar: eng sekinlari va oxirgilari (Faqat Admin)
+@app.get("/api/admin/profiles")
+def get_profiles(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    return profiler.list_profiles()
+
+
+# Profilni flamegraph (folded stacks) fayli sifatida yuklab olish
+@app.get("/api/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def download_profile(profile_id: str, current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profil topilmadi")
+    return PlainTextResponse(
+        profile["folded"],
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
+
+
+# Prometheus ko'rsatkichlari (Faqat Admin)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics(current_user: models.User = Depends(get_current_user)):
+    """Prometheus text formatidagi ko'rsatkichlar: route latency, status, DB ulushi, pool, sweeper, kesh."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Faqat adminlar uchun")
+    pool = pool_stats()
+    sweeper_stats = sweeper.get_stats()
+    cache_stats = cache.stats()
+    sql_stats = sql_profiler.get_stats()
+    trace_stats = tracing.get_stats()
+    log_stats = logging_config.get_stats()
+    shed_stats = loadshed.get_stats()
+    extra = {
+        "db_pool_size": ("Pool'dagi doimiy ulanishlar", "gauge", pool.get("pool_size", 0)),
+        "db_pool_checked_out": ("Band ulanishlar", "gauge", pool.get("checked_out", 0)),
+        "db_pool_overflow": ("Overflow ulanishlar", "gauge", pool.get("overflow", 0)),
+        "db_pool_checkouts_total": ("Pool'dan ulanish olishlar", "counter", pool["checkouts"]),
+        "db_pool_checkout_timeouts_total": ("Pool timeout'lar", "counter", pool["timeouts"]),
+        "db_pool_checkout_wait_seconds_total": ("Ulanish kutishga ketgan vaqt", "counter", pool["wait_total_ms"] / 1000),
+        "order_sweeper_runs_total": ("Sweeper ishga tushishlari", "counter", sweeper_stats["runs"]),
+        "order_sweeper_expired_total": ("Expire qilingan pending buyurtmalar", "counter", sweeper_stats["expired_total"]),
+        "sse_subscribers": ("Ulangan SSE obunachilari", "gauge", len(events.bus.subscribers)),
+        "sse_events_delivered_total": ("Obunachilarga yuborilgan hodisalar", "counter", events.stats["delivered"]),
+        "product_views_total": ("Qayd etilgan mahsulot ko'rishlari", "counter", popularity.stats["views_total"]),
+        "product_views_pending": ("Hali bazaga yozilmagan ko'rishlar", "gauge", popularity.views.pending()),
+        "recommendations_runs_total": ("Tavsiyalar job'i ishga tushishlari", "counter", recommendations.stats["runs"]),
+        "recommendations_pairs": ("Co-occurrence matritsasidagi juftliklar", "gauge", recommendations.stats["pairs"]),
+        "cache_hits_total": ("Kesh hit'lari", "counter", {(("cache", n),): c["hits"] for n, c in cache_stats.items()}),
+        "cache_misses_total": ("Kesh miss'lari", "counter", {(("cache", n),): c["misses"] for n, c in cache_stats.items()}),
+        "sql_slow_queries_total": ("SLOW_QUERY_MS dan sekin SQL'lar", "counter", sql_stats["slow_queries"]),
+        "sql_n_plus_one_total": ("N+1 nomzodlari", "counter", sql_stats["n_plus_one"]),
+        "sql_query_budget_exceeded_total": ("Query budget oshgan so'rovlar", "counter", sql_stats["budget_exceeded"]),
+        "trace_spans_exported_total": ("Eksport qilingan span'lar", "counter", trace_stats["spans_exported"]),
+        "trace_spans_dropped_total": ("Tashlab yuborilgan span'lar", "counter", trace_stats["spans_dropped"]),
+        "log_records_dropped_total": ("Navbat to'lgani uchun tashlangan log yozuvlari", "counter", log_stats["dropped"]),
+        "log_records_suppressed_total": ("Sampling bilan o'tkazib yuborilgan log yozuvlari", "counter", log_stats["suppressed"]),
+        "loadshed_active": ("Sinf bo'yicha bajarilayotgan so'rovlar", "gauge", {(("class", n),): b["active"] for n, b in shed_stats.items()}),
+        "loadshed_queued": ("Sinf bo'yicha navbatda kutayotgan so'rovlar", "gauge", {(("class", n),): b["queued"] for n, b in shed_stats.items()}),
+        "loadshed_limit": ("Sinf concurrency budjeti", "gauge", {(("class", n),): b["limit"] for n, b in shed_stats.items()}),
+        "loadshed_rejected_total": ("503 bilan rad etilgan so'rovlar", "counter", {(("class", n),): b["rejected"] for n, b in shed_stats.items()}),
+    }
+    return PlainTextResponse(metrics.render_prometheus(extra), media_type="text/plain; version=0.0.4")
+
+
 # Haqiqiy bazadagi mahsulotlarni React'ga beramiz!
 @app.get("/api/products")
-def get_products(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
-    
-    # Biz React frontend uchun qaytarayotganda 
-    # techStack va features'dagi vergul-ajratilgan qatorni(String) massivlarga(List o'girishimiz kerak)
-    # Shunday bo'lmasa frontend array emas deb xato beradi!
-    formatted_products = []
-    for product in products:
-        # Har bir maxsulotni frontend kutgan qolipga yig'amiz
-        formatted_products.append({
-            "id": str(product.id), # Frontend UUID kutadi (id: "1" o'rniga), biz stringga ag'darib ishonch xosil qilamiz
-            "title": product.title,
-            "description": product.description,
-            "price": product.price,
-            "image": product.image,
-            "category": product.category,
-            "techStack": product.techStack.split(",") if product.techStack else [],
-            "features": product.features.split(",") if product.features else []
-        })
+@query_budget(4)
+def get_products(request: Request, sort: str = "", db: Session = Depends(get_read_db)):
+    # sort=popular — ko'rishlar soni bo'yicha (popularity.py); ETag ikkala versiyadan
+    popular = sort == "popular"
+    variant = f"popular{popularity.ranking_cache.current_version(db)}" if popular else ""
+    # ETag katalog versiyasidan: o'zgarmagan bo'lsa 304 (katalog yuklanmaydi ham)
+    etag = httpcache.make_etag(cache.CATALOG, catalog_cache.current_version(db), variant)
+    if httpcache.not_modified(request, etag):
+        return httpcache.not_modified_response(etag)
+    snapshot, version = catalog_cache.get_versioned(db)
+    products = snapshot.products
+    if popular:
+        ranking, ranking_version = popularity.ranking_cache.get_versioned(db)
+        variant = f"popular{ranking_version}"
+        products = snapshot.ordered(variant, ranking)
+    return httpcache.json_response(request, httpcache.make_etag(cache.CATALOG, version, variant), products)
+
+
+# Bitta mahsulot + o'xshash mahsulotlar (kategoriya va techStack teglari bo'yicha)
+@app.get("/api/products/{product_id}")
+@query_budget(3)
+def get_product(product_id: int, request: Request, db: Session = Depends(get_read_db)):
+    snapshot, version = catalog_cache.get_versioned(db)
+    detail = snapshot.detail(str(product_id))
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Mahsulot topilmadi")
+    # related fonda qurilayotgan bo'lsa — alohida ETag (tayyor bo'lgach javob o'zgaradi)
+    variant = f"p{product_id}" if snapshot.related_ready else f"p{product_id}-partial"
+    etag = httpcache.make_etag(cache.CATALOG, version, variant)
+    return httpcache.json_response(request, etag, detail)
+
+
+# Mahsulot ko'rildi: bazaga yozilmaydi — xotiradagi hisoblagich, fonda product_stats'ga qo'shiladi.
+# Autentifikatsiyasiz, shuning uchun IP bo'yicha limit va faqat katalogdagi id'lar sanaladi
+@app.post("/api/products/{product_id}/view", status_code=204,
+          dependencies=[Depends(ratelimit.limit_by_ip("product_view_ip"))])
+@query_budget(2)
+def record_product_view(product_id: int, db: Session = Depends(get_read_db)):
+    if str(product_id) not in catalog_cache.get(db).by_id:
+        raise HTTPException(status_code=404, detail="Mahsulot topilmadi")
+    popularity.record_view(product_id)
+
 
-    return formatted_products
+# "Buni ham sotib olishgan" — offline job hisoblagan tavsiyalar (recommendations.py)
+@app.get("/api/products/{product_id}/recommendations")
+@query_budget(3)
+def get_product_recommendations(product_id: int, db: Session = Depends(get_read_db)):
+    snapshot = catalog_cache.get(db)
+    if str(product_id) not in snapshot.by_id:
+        raise HTTPException(status_code=404, detail="Mahsulot topilmadi")
+    return [
+        {**snapshot.summary(pid), "score": score}
+        for pid, score in recommendations.recommendations_cache.get(db, product_id)
+        if pid in snapshot.by_id   # o'chirilgan mahsulotlar tashlab ketiladi
+    ]
 
 # ── CART endpoints ──────────────────────────────────────────────────────────
 
 @app.get("/api/cart")
+@query_budget(4)
 def get_cart(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Foydalanuvchi savatchasini qaytaradi (product ma'lumotlari bilan)."""
-    items = db.query(models.CartItem).filter(models.CartItem.user_id == current_user.id).all()
+    items = (
+        db.query(models.CartItem)
+        .options(joinedload(models.CartItem.product))
+        .filter(models.CartItem.user_id == current_user.id)
+        .all()
+    )
     result = []
     for item in items:
         p = item.product
@@ -248,6 +537,7 @@ def add_to_cart(
     else:
         db.add(models.CartItem(user_id=current_user.id, product_id=product_id, quantity=quantity))
 
+    dashboard.bump(db, current_user.id)
     db.commit()
     return {"ok": True}
 
@@ -270,6 +560,7 @@ def update_cart_quantity(
         db.delete(item)
     else:
         item.quantity = qty
+    dashboard.bump(db, current_user.id)
     db.commit()
     return {"ok": True}
 
@@ -286,15 +577,22 @@ def remove_from_cart(
     ).first()
     if item:
         db.delete(item)
+        dashboard.bump(db, current_user.id)
         db.commit()
     return {"ok": True}
 
 # ── WISHLIST endpoints ───────────────────────────────────────────────────────
 
 @app.get("/api/wishlist")
+@query_budget(4)
 def get_wishlist(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Foydalanuvchi wishlist ini qaytaradi."""
-    items = db.query(models.WishlistItem).filter(models.WishlistItem.user_id == current_user.id).all()
+    items = (
+        db.query(models.WishlistItem)
+        .options(joinedload(models.WishlistItem.product))
+        .filter(models.WishlistItem.user_id == current_user.id)
+        .all()
+    )
     result = []
     for item in items:
         p = item.product
@@ -322,6 +620,7 @@ def toggle_wishlist(
 
     if existing:
         db.delete(existing)
+        dashboard.bump(db, current_user.id)
         db.commit()
         return {"liked": False}
 
@@ -330,6 +629,7 @@ def toggle_wishlist(
         raise HTTPException(status_code=404, detail="Mahsulot topilmadi")
 
     db.add(models.WishlistItem(user_id=current_user.id, product_id=product_id))
+    dashboard.bump(db, current_user.id)
     db.commit()
     return {"liked": True}
 
@@ -346,12 +646,14 @@ def remove_from_wishlist(
     ).first()
     if item:
         db.delete(item)
+        dashboard.bump(db, current_user.id)
         db.commit()
     return {"ok": True}
 
 # --- AUTH RO'YXATDAN O'TISH VA KIRISH ---
 
-@app.post("/api/auth/register", response_model=schemas.UserResponse)
+@app.post("/api/auth/register", response_model=schemas.UserResponse,
+          dependencies=[Depends(ratelimit.limit_by_ip("register_ip"))])
 def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # Email bazada bormi?
     db_user = db.query(models.User).filter(models.User.email == user.email).first()
@@ -367,15 +669,22 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
+    db.flush()
+    # Dashboard versiya qatori oldindan — birinchi xarid/savatcha yozuvi bitta UPDATE bilan
+    dashboard.dashboard_cache.create(db, new_user.id)
     db.commit()
     db.refresh(new_user)
     return new_user
 
-@app.post("/api/auth/login", response_model=schemas.Token)
+@app.post("/api/auth/login", response_model=schemas.Token,
+          dependencies=[Depends(ratelimit.limit_by_ip("login_ip"))])
 def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: Session = Depends(get_db)
 ):
+    # Bitta akkauntga parol terish (credential stuffing) — bcrypt'dan oldin to'xtatiladi
+    ratelimit.check("login_email", form_data.username.strip().lower())
+
     # Foydalanuvchini email orqali qidiramiz
     user = db.query(models.User).filter(models.User.email == form_data.username).first()
     
@@ -418,7 +727,6 @@ def get_user_me(current_user: models.User = Depends(get_current_user), db: Sessi
 @app.get("/api/debug/balance")
 def debug_balance(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     """MySQL dan to'g'ridan-to'g'ri balance qiymatini qaytaradi (tekshirish uchun)."""
-    from sqlalchemy import text
     result = db.execute(text(f"SELECT id, email, balance FROM users WHERE id = {current_user.id}")).fetchone()
     return {"id": result[0], "email": result[1], "balance_in_mysql": result[2]}
 
@@ -429,6 +737,8 @@ def update_user_me(data: schemas.UserUpdateMe, current_user: models.User = Depen
         current_user.full_name = data.full_name
     if data.phone is not None:
         current_user.phone = data.phone
+    cache.bump(db, cache.USERS)
+    dashboard.bump(db, current_user.id)
     db.commit()
     db.refresh(current_user)
     orders = db.query(models.Order).filter(models.Order.user_id == current_user.id).all()
@@ -446,6 +756,7 @@ def change_password(data: schemas.ChangePassword, current_user: models.User = De
     if not auth.verify_password(data.current_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Joriy parol noto'g'ri")
     current_user.hashed_password = auth.get_password_hash(data.new_password)
+    cache.bump(db, cache.USERS)
     db.commit()
     return {"message": "Parol muvaffaqiyatli o'zgartirildi"}
 
@@ -458,6 +769,7 @@ def admin_reset_password(user_id: int, data: schemas.AdminResetPassword, current
     if not target:
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     target.hashed_password = auth.get_password_hash(data.new_password)
+    cache.bump(db, cache.USERS)
     db.commit()
     return {"message": f"{target.email} foydalanuvchisi paroli muvaffaqiyatli tiklandi"}
 
@@ -475,33 +787,44 @@ def update_user_role_new(user_id: int, data: schemas.RoleUpdate, current_user: m
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
     target.role = data.role
     target.is_admin = (data.role == 'admin')
+    cache.bump(db, cache.USERS)
+    dashboard.bump(db, target.id)
     db.commit()
     db.refresh(target)
     return {"message": f"Rol '{data.role}' ga o'zgartirildi", "id": target.id, "role": target.role, "is_admin": target.is_admin}
 
 
 @app.get("/api/users", response_model=List[schemas.UserResponse])
-def get_users(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+@query_budget(4)
+def get_users(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     """Barcha tizim foydalanuvchilarini qaytaradi (Faqat Admin) - buyurtmalar soni bilan."""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sizda bu amalni bajarish uchun ruxsat yo'q (Faqat Admin)")
-    users = db.query(models.User).all()
+    # Buyurtmalar soni va summasi bitta GROUP BY so'rovida (har user uchun alohida emas)
+    rows = (
+        db.query(
+            models.User,
+            func.count(models.Order.id),
+            func.coalesce(func.sum(models.Order.amount_usd), 0.0),
+        )
+        .outerjoin(models.Order, models.Order.user_id == models.User.id)
+        .group_by(models.User.id)
+        .all()
+    )
     result = []
-    for user in users:
-        orders = db.query(models.Order).filter(models.Order.user_id == user.id).all()
-        total_spent = sum(o.amount_usd for o in orders)
+    for user, orders_count, total_spent in rows:
         result.append({
             "id": user.id,
             "email": user.email,
             "is_admin": user.is_admin,
             "created_at": user.created_at,
-            "orders_count": len(orders),
-            "total_spent_usd": round(total_spent, 2)
+            "orders_count": orders_count,
+            "total_spent_usd": round(total_spent or 0.0, 2)
         })
     return result
 
 @app.get("/api/users/{user_id}/detail", response_model=schemas.UserDetailResponse)
-def get_user_detail(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_user_detail(user_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     """Foydalanuvchining to'liq ma'lumotlari va buyurtmalar tarixi (Faqat Admin)."""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sizda bu amalni bajarish uchun ruxsat yo'q (Faqat Admin)")
@@ -520,6 +843,35 @@ def get_user_detail(user_id: int, db: Session = Depends(get_db), current_user: m
         "total_spent_usd": round(total_spent, 2)
     }
 
+def _add_single_item(db: Session, order: models.Order):
+    """Bitta mahsulotli buyurtmaga (nomi bo'yicha topilsa) order_items qatorini qo'shadi. (product_id, category)."""
+    product_id, category = analytics.product_by_title(db, order.product_title)
+    if product_id is not None:
+        order.items.append(models.OrderItem(
+            product_id=product_id,
+            user_id=order.user_id,
+            product_title=order.product_title,
+            product_image=order.product_image,
+            quantity=1,
+            unit_price_usd=order.amount_usd or 0.0,
+            amount_usd=order.amount_usd or 0.0,
+        ))
+    return product_id, category
+
+
+def _order_items(order: models.Order) -> list:
+    return [
+        {
+            "product_id": item.product_id,
+            "product_title": item.product_title,
+            "product_image": item.product_image,
+            "quantity": item.quantity,
+            "amount_usd": item.amount_usd,
+        }
+        for item in order.items
+    ]
+
+
 @app.post("/api/orders")
 def create_order(order_data: dict, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Yangi buyurtma yaratish (foydalanuvchi tomonidan)."""
@@ -529,17 +881,22 @@ def create_order(order_data: dict, db: Session = Depends(get_db), current_user:
         product_image=order_data.get("product_image", ""),
         product_category=order_data.get("product_category", ""),
         amount_usd=float(order_data.get("amount_usd", 0)),
-        status=order_data.get("status", "completed")
+        status=order_data.get("status", "completed"),
+        created_at=datetime.utcnow(),
     )
     db.add(new_order)
+    product_id, category = _add_single_item(db, new_order)
+    if new_order.status in analytics.PURCHASED_STATUSES:
+        analytics.record_sales(db, [(product_id, category or new_order.product_category, 1, new_order.amount_usd)], new_order.created_at)
+    dashboard.bump(db, current_user.id)
     db.commit()
     db.refresh(new_order)
     return {"message": "Buyurtma muvaffaqiyatli yaratildi", "order_id": new_order.id}
 
 @app.get("/api/orders/my")
-def get_my_orders(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_my_orders(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     """Foydalanuvchining o'z buyurtmalarini qaytaradi."""
-    orders = db.query(models.Order).filter(
+    orders = db.query(models.Order).options(selectinload(models.Order.items)).filter(
         models.Order.user_id == current_user.id
     ).order_by(models.Order.created_at.desc()).all()
     return [
@@ -550,7 +907,8 @@ def get_my_orders(db: Session = Depends(get_db), current_user: models.User = Dep
             "product_category": getattr(o, 'product_category', ''),
             "amount_usd": o.amount_usd,
             "status": getattr(o, 'status', 'completed'),
-            "created_at": o.created_at
+            "created_at": o.created_at,
+            "items": _order_items(o),
         }
         for o in orders
     ]
@@ -559,7 +917,7 @@ def get_my_orders(db: Session = Depends(get_db), current_user: models.User = Dep
 # ── Wallet endpoints ────────────────────────────────────────────────────────
 
 @app.get("/api/transactions/my")
-def get_my_transactions(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def get_my_transactions(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     """Foydalanuvchining to'lov tarixi (oxirgidan avvalgisigacha)."""
     txs = db.query(models.Transaction).filter(
         models.Transaction.user_id == current_user.id
@@ -576,7 +934,19 @@ def get_my_transactions(db: Session = Depends(get_db), current_user: models.User
         for t in txs
     ]
 
+@app.get("/api/dashboard")
+@query_budget(10)
+def get_dashboard(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """Kabinet uchun hammasi bitta javobda: profil, buyurtmalar, tranzaksiyalar, savatcha, wishlist."""
+    model = dashboard.dashboard_cache.get(db, current_user.id)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
+    # Balans keshlanmaydi — har doim bazadan
+    balance = db.query(models.User.balance).filter(models.User.id == current_user.id).scalar()
+    return dashboard.build(model, catalog_cache.get(db), balance)
+
 @app.post("/api/balance/topup")
+@serialized_writes
 def topup_balance(data: schemas.TopUpRequest, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Hamyonga mablag' qo'shish (demo)."""
     if data.amount_uzs <= 0:
@@ -598,49 +968,59 @@ def topup_balance(data: schemas.TopUpRequest, db: Session = Depends(get_db), cur
         description=f"Hamyonga +{int(data.amount_uzs):,} so'm qo'shildi"
     )
     db.add(tx)
+    events.publish(db, events.user_channel(current_user.id), "topup", {"balance": new_balance, "amount_uzs": data.amount_uzs})
+    dashboard.bump(db, current_user.id)
     db.commit()
     return {"message": "Hamyon muvaffaqiyatli to'ldirildi", "balance": new_balance}
 
 @app.post("/api/balance/purchase")
 def purchase_with_balance(data: schemas.PurchaseRequest, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Hamyon orqali xarid qilish va order yaratish."""
-    # Fresh query
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    balance = user.balance or 0
-    if balance < data.amount_uzs:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Hamyonda mablag' yetarli emas. Balans: {int(balance):,} so'm, kerakli: {int(data.amount_uzs):,} so'm"
-        )
-    USD_RATE = 12800
-    amount_usd = round(data.amount_uzs / USD_RATE, 4)
-    new_balance = balance - data.amount_uzs
+    with serialized_writes:  # SQLite: bitta yozuvchi navbati
+        # Fresh query
+        user = db.query(models.User).filter(models.User.id == current_user.id).first()
+        balance = user.balance or 0
+        if balance < data.amount_uzs:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Hamyonda mablag' yetarli emas. Balans: {int(balance):,} so'm, kerakli: {int(data.amount_uzs):,} so'm"
+            )
+        USD_RATE = 12800
+        amount_usd = round(data.amount_uzs / USD_RATE, 4)
+        new_balance = balance - data.amount_uzs
 
-    # Balance ni to'g'ridan-to'g'ri yangilash
-    db.query(models.User).filter(models.User.id == current_user.id).update(
-        {"balance": new_balance}, synchronize_session="fetch"
-    )
-    # Order yaratish
-    new_order = models.Order(
-        user_id=current_user.id,
-        product_title=data.product_title,
-        product_image=data.product_image or "",
-        product_category=data.product_category or "",
-        amount_usd=amount_usd,
-        status="completed"
-    )
-    db.add(new_order)
-    # Tranzaksiya
-    tx = models.Transaction(
-        user_id=current_user.id,
-        type="PURCHASE",
-        amount=data.amount_uzs,
-        currency="UZS",
-        description=f"{data.product_title} — {int(data.amount_uzs):,} so'm"
-    )
-    db.add(tx)
-    db.commit()
-    db.refresh(new_order)
+        # Balance ni to'g'ridan-to'g'ri yangilash
+        db.query(models.User).filter(models.User.id == current_user.id).update(
+            {"balance": new_balance}, synchronize_session="fetch"
+        )
+        # Order yaratish
+        new_order = models.Order(
+            user_id=current_user.id,
+            product_title=data.product_title,
+            product_image=data.product_image or "",
+            product_category=data.product_category or "",
+            amount_usd=amount_usd,
+            status="completed",
+            created_at=datetime.utcnow(),
+        )
+        db.add(new_order)
+        product_id, category = _add_single_item(db, new_order)
+        analytics.record_sales(db, [(product_id, category or data.product_category, 1, amount_usd)], new_order.created_at)
+        # Tranzaksiya
+        tx = models.Transaction(
+            user_id=current_user.id,
+            type="PURCHASE",
+            amount=data.amount_uzs,
+            currency="UZS",
+            description=f"{data.product_title} — {int(data.amount_uzs):,} so'm"
+        )
+        db.add(tx)
+        db.flush()
+        events.publish(db, events.ADMIN, "order.created", events.order_payload(new_order, current_user.email))
+        events.publish(db, events.user_channel(current_user.id), "purchase", {"order_id": new_order.id, "balance": new_balance})
+        dashboard.bump(db, current_user.id)
+        db.commit()
+        db.refresh(new_order)
 
     # Telegram bildirishnoma (yakka xarid)
     try:
@@ -665,6 +1045,7 @@ def purchase_with_balance(data: schemas.PurchaseRequest, db: Session = Depends(g
 # ── Click Uz: payment link generator ─────────────────────────────────────────
 
 @app.post("/api/orders/generate-payment-link")
+@serialized_writes
 def generate_payment_link(
     data: dict,
     db: Session = Depends(get_db),
@@ -697,23 +1078,50 @@ def generate_payment_link(
         status="pending",
     )
     db.add(pending_order)
+    db.flush()
+
+    # Buyurtma qatorlari: mahsulot va narx bazadan (bitta IN so'rovi), bitta executemany bilan
+    quantities = {}
+    for item in cart_items:
+        try:
+            product_id, quantity = int(item.get("product_id")), int(item.get("quantity") or 1)
+        except (TypeError, ValueError):
+            continue
+        quantities[product_id] = quantities.get(product_id, 0) + max(1, quantity)
+    products = db.query(models.Product).filter(models.Product.id.in_(quantities)).all() if quantities else []
+    rows = []
+    for product in products:
+        try:
+            price_usd = float(str(product.price).replace('$', '').strip())
+        except (ValueError, TypeError):
+            price_usd = 0.0
+        quantity = quantities[product.id]
+        rows.append({
+            "order_id": pending_order.id,
+            "product_id": product.id,
+            "user_id": current_user.id,
+            "product_title": product.title,
+            "product_image": product.image or "",
+            "quantity": quantity,
+            "unit_price_usd": price_usd,
+            "amount_usd": round(price_usd * quantity, 4),
+            "created_at": pending_order.created_at,
+        })
+    if rows:
+        db.execute(insert(models.OrderItem), rows)
+    events.publish(db, events.ADMIN, "order.created", events.order_payload(pending_order, current_user.email))
+    dashboard.bump(db, current_user.id)
     db.commit()
     db.refresh(pending_order)
 
     # 2. Click sozlamalarini DB dan o'qish
-    service_row = db.query(models.SystemSetting).filter(
-        models.SystemSetting.key == "click_service_id"
-    ).first()
-    merchant_row = db.query(models.SystemSetting).filter(
-        models.SystemSetting.key == "click_merchant_id"
-    ).first()
-
-    service_id = service_row.value.strip() if service_row and service_row.value else ""
-    merchant_id = merchant_row.value.strip() if merchant_row and merchant_row.value else ""
+    service_id = cache.get_setting(db, "click_service_id")
+    merchant_id = cache.get_setting(db, "click_merchant_id")
 
     if not service_id or not merchant_id:
         # Pending orderni o'chirish — to'lov bo'lmadi
         db.delete(pending_order)
+        dashboard.bump(db, current_user.id)
         db.commit()
         raise HTTPException(
             status_code=400,
@@ -741,7 +1149,7 @@ def generate_payment_link(
 
 @app.get("/api/admin/orders")
 def admin_get_orders(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Barcha buyurtmalar (faqat adminlar uchun). Buyer email bilan birgalikda."""
@@ -751,6 +1159,7 @@ def admin_get_orders(
     rows = (
         db.query(models.Order, models.User.email)
         .join(models.User, models.Order.user_id == models.User.id)
+        .options(selectinload(models.Order.items))
         .order_by(models.Order.id.desc())
         .all()
     )
@@ -764,6 +1173,7 @@ def admin_get_orders(
             "product_image": order.product_image,
             "amount_usd": order.amount_usd,
             "created_at": order.created_at.isoformat() if order.created_at else None,
+            "items": _order_items(order),
         })
     return result
 
@@ -771,6 +1181,9 @@ def admin_get_orders(
 # ── Batch wallet checkout ────────────────────────────────────────────────────
 
 @app.post("/api/orders/process-wallet-payment")
+# 9 ta yozish/o'qish + commit'dan keyin Telegram sozlamalari (versiya tekshiruvi,
+# sovuq keshda yana bitta SELECT) — eng yomon holat 11
+@query_budget(11)
 def process_wallet_payment(
     data: schemas.WalletPaymentRequest,
     db: Session = Depends(get_db),
@@ -783,93 +1196,125 @@ def process_wallet_payment(
 
         USD_RATE = 12800
 
-        # 1. Fetch real prices from DB for each product_id
-        enriched = []
-        for item in data.cart_items:
-            if item.quantity <= 0:
-                raise HTTPException(status_code=400, detail="Miqdor 0 dan katta bo'lishi kerak")
-            product = db.query(models.Product).filter(
-                models.Product.id == item.product_id
+        # checkout.db span'i navbat (lock) kutishini ham o'z ichiga oladi
+        with serialized_writes, tracing.span("checkout.db"):  # SQLite: bitta yozuvchi navbati
+            # 1. Fetch real prices from DB — barcha mahsulotlar bitta IN so'rovida
+            product_ids = {item.product_id for item in data.cart_items}
+            products = {
+                p.id: p for p in db.query(models.Product).filter(models.Product.id.in_(product_ids)).all()
+            }
+            enriched = []
+            for item in data.cart_items:
+                if item.quantity <= 0:
+                    raise HTTPException(status_code=400, detail="Miqdor 0 dan katta bo'lishi kerak")
+                product = products.get(item.product_id)
+                if not product:
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"Mahsulot topilmadi (ID: {item.product_id})"
+                    )
+                # price is stored as String in DB (e.g. "9.99") — parse safely
+                try:
+                    price_usd = float(str(product.price).replace('$', '').strip())
+                except (ValueError, TypeError):
+                    price_usd = 0.0
+
+                enriched.append({
+                    "product_id": product.id,
+                    "title": product.title,
+                    "image": product.image or "",
+                    "category": product.category or "",
+                    "quantity": item.quantity,
+                    "unit_price_usd": price_usd,
+                    "amount_usd": round(price_usd * item.quantity, 4),
+                    "download_file": product.download_file,
+                })
+
+            # 2. Server-side total — never trust frontend
+            total_usd = sum(e["amount_usd"] for e in enriched)
+            total_uzs = round(total_usd * USD_RATE)
+
+            # 3. Fresh balance
+            user = db.query(models.User).filter(
+                models.User.id == current_user.id
             ).first()
-            if not product:
+            balance = float(user.balance or 0.0)
+
+            if balance < total_uzs:
                 raise HTTPException(
-                    status_code=404,
-                    detail=f"Mahsulot topilmadi (ID: {item.product_id})"
+                    status_code=400,
+                    detail=(
+                        f"Hamyonda mablag' yetarli emas. "
+                        f"Balans: {int(balance):,} so'm, "
+                        f"kerakli: {int(total_uzs):,} so'm"
+                    )
                 )
-            # price is stored as String in DB (e.g. "9.99") — parse safely
-            try:
-                price_usd = float(str(product.price).replace('$', '').strip())
-            except (ValueError, TypeError):
-                price_usd = 0.0
-
-            enriched.append({
-                "title": product.title,
-                "image": product.image or "",
-                "amount_usd": round(price_usd * item.quantity, 4),
-            })
-
-        # 2. Server-side total — never trust frontend
-        total_usd = sum(e["amount_usd"] for e in enriched)
-        total_uzs = round(total_usd * USD_RATE)
-
-        # 3. Fresh balance
-        user = db.query(models.User).filter(
-            models.User.id == current_user.id
-        ).first()
-        balance = float(user.balance or 0.0)
 
-        if balance < total_uzs:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    f"Hamyonda mablag' yetarli emas. "
-                    f"Balans: {int(balance):,} so'm, "
-                    f"kerakli: {int(total_uzs):,} so'm"
-                )
-            )
+            new_balance = balance - total_uzs
 
-        new_balance = balance - total_uzs
+            # 4. Deduct balance
+            db.query(models.User).filter(
+                models.User.id == current_user.id
+            ).update({"balance": new_balance}, synchronize_session="fetch")
 
-        # 4. Deduct balance
-        db.query(models.User).filter(
-            models.User.id == current_user.id
-        ).update({"balance": new_balance}, synchronize_session="fetch")
+            titles = [e["title"] for e in enriched]
+            summary = ", ".join(titles[:3])
+            if len(titles) > 3:
+                summary += f" va yana {len(titles) - 3} ta"
 
-        # 5. Create orders — ONLY columns that actually exist in models.Order:
-        #    id, user_id, product_title, product_image, amount_usd, created_at
-        titles = []
-        for e in enriched:
+            # 5. Bitta buyurtma sarlavhasi + barcha qatorlar bitta executemany bilan
             order = models.Order(
                 user_id=current_user.id,
-                product_title=e["title"],
-                product_image=e["image"],
-                amount_usd=e["amount_usd"],
+                product_title=summary[:150],
+                product_image=enriched[0]["image"],
+                product_category=enriched[0]["category"],
+                amount_usd=round(total_usd, 4),
+                status="completed",
             )
             db.add(order)
-            titles.append(e["title"])
-
-        # 6. Single PURCHASE transaction
-        summary = ", ".join(titles[:3])
-        if len(titles) > 3:
-            summary += f" va yana {len(titles) - 3} ta"
-
-        tx = models.Transaction(
-            user_id=current_user.id,
-            type="PURCHASE",
-            amount=float(total_uzs),
-            currency="UZS",
-            description=f"Xarid: {summary} — {int(total_uzs):,} so'm",
-        )
-        db.add(tx)
-
-        # 7. Atomic commit
-        db.commit()
+            db.flush()
+            db.execute(insert(models.OrderItem), [
+                {
+                    "order_id": order.id,
+                    "product_id": e["product_id"],
+                    "user_id": current_user.id,
+                    "product_title": e["title"],
+                    "product_image": e["image"],
+                    "quantity": e["quantity"],
+                    "unit_price_usd": e["unit_price_usd"],
+                    "amount_usd": e["amount_usd"],
+                    "created_at": order.created_at,
+                }
+                for e in enriched
+            ])
+            analytics.record_sales(db, [
+                (e["product_id"], e["category"], e["quantity"], e["amount_usd"]) for e in enriched
+            ], order.created_at)
+
+            # 6. Single PURCHASE transaction
+
+            tx = models.Transaction(
+                user_id=current_user.id,
+                type="PURCHASE",
+                amount=float(total_uzs),
+                currency="UZS",
+                description=f"Xarid: {summary} — {int(total_uzs):,} so'm",
+            )
+            db.add(tx)
+            events.publish(db, events.ADMIN, "order.created", events.order_payload(order, current_user.email))
+            events.publish(db, events.user_channel(current_user.id), "purchase", {"order_id": order.id, "balance": new_balance})
+            dashboard.bump(db, current_user.id)
+            # commit ob'ektlarni eskirtiradi — javob va bildirishnoma uchun qayta SELECT qilmaslik
+            order_id, buyer_email = order.id, current_user.email
+
+            # 7. Atomic commit
+            db.commit()
 
         # 8. Telegram bildirishnoma (bazadan credentials o'qiladi, crash bo'lmaydi)
         try:
             notif = (
                 f"🛒 <b>Yangi xarid!</b>\n"
-                f"👤 Foydalanuvchi: {current_user.email}\n"
+                f"👤 Foydalanuvchi: {buyer_email}\n"
                 f"📦 Mahsulotlar: {summary}\n"
                 f"💰 Jami: {int(total_uzs):,} so'm (${round(total_usd, 2)})\n"
                 f"💳 Qoldiq: {int(new_balance):,} so'm"
@@ -883,15 +1328,58 @@ def process_wallet_payment(
             "new_balance": new_balance,
             "total_uzs": total_uzs,
             "items_purchased": len(enriched),
+            "order_id": order_id,
+            # Darhol yuklab olish havolalari (fayli bor mahsulotlar)
+            "downloads": list({
+                e["product_id"]: downloads.link(current_user.id, e["product_id"], e["download_file"])
+                for e in enriched if e["download_file"] and downloads.ENABLED
+            }.values()),
         }
 
     except HTTPException:
         raise
     except Exception as exc:
         db.rollback()
-        import traceback; traceback.print_exc()
+        logger.exception("Wallet checkout xatosi", extra={"user_id": current_user.id})
         raise HTTPException(status_code=500, detail=f"Server xatosi: {str(exc)}")
 
+# ── Raqamli mahsulotlarni yuklab olish ──────────────────────────────────────
+
+@app.post("/api/downloads/{product_id}/link")
+def create_download_link(product_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    """Sotib olingan mahsulot arxivi uchun imzolangan, muddati cheklangan havola."""
+    if not downloads.ENABLED:
+        raise HTTPException(status_code=503, detail="Yuklab olish sozlanmagan")
+    product = db.query(models.Product.id, models.Product.download_file).filter(models.Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Mahsulot topilmadi")
+    if not product.download_file:
+        raise HTTPException(status_code=404, detail="Bu mahsulot uchun yuklab olinadigan fayl yo'q")
+    if not current_user.is_admin and not downloads.has_purchased(db, current_user.id, product_id):
+        raise HTTPException(status_code=403, detail="Bu mahsulot sotib olinmagan")
+    return downloads.link(current_user.id, product_id, product.download_file)
+
+@app.get(downloads.FILE_PATH)
+async def download_file(token: str = ""):
+    """Token imzosi tekshiriladi (bazasiz) va fayl Range qo'llab-quvvatlovchi oqim bilan uzatiladi."""
+    if not downloads.ENABLED:
+        raise HTTPException(status_code=503, detail="Yuklab olish sozlanmagan")
+    data = downloads.verify_token(token)
+    if data is None:
+        raise HTTPException(status_code=403, detail="Havola yaroqsiz yoki muddati o'tgan")
+    path = await asyncio.to_thread(downloads.resolve, data["f"])
+    if path is None:
+        raise HTTPException(status_code=404, detail="Fayl topilmadi")
+    filename = os.path.basename(path)
+    if downloads.DOWNLOADS_ACCEL_PREFIX:
+        # nginx faylni o'zi (sendfile) uzatadi
+        relative = os.path.relpath(path, downloads.DOWNLOADS_DIR).replace(os.sep, "/")
+        return Response(headers={
+            "X-Accel-Redirect": f"{downloads.DOWNLOADS_ACCEL_PREFIX}/{quote(relative)}",
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+        })
+    return FileResponse(path, filename=filename, headers={"Cache-Control": "private, max-age=0"})
+
 @app.put("/api/users/{user_id}/role", response_model=schemas.UserResponse)
 def update_user_role(user_id: int, role_data: schemas.UserRoleUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     """Foydalanuvchi darajasini yangilash (Foydalanuvchi <-> Admin). O'z-o'zini tahrirlash man etilgan."""
@@ -906,6 +1394,8 @@ def update_user_role(user_id: int, role_data: schemas.UserRoleUpdate, db: Sessio
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
         
     target_user.is_admin = role_data.is_admin
+    cache.bump(db, cache.USERS)
+    dashboard.bump(db, target_user.id)
     db.commit()
     db.refresh(target_user)
     return target_user
@@ -924,6 +1414,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user: model
         raise HTTPException(status_code=404, detail="Foydalanuvchi topilmadi")
         
     db.delete(target_user)
+    cache.bump(db, cache.USERS)
     db.commit()
     return {"message": "Foydalanuvchi platformadan muvaffaqiyatli o'chirildi."}
 
@@ -950,11 +1441,13 @@ def create_product(
         image=product.image,
         category=product.category,
         techStack=tech_stack_str,
-        features=features_str
+        features=features_str,
+        download_file=product.download_file or None
     )
     
     # Bazaga yozish va saqlash
     db.add(db_product)
+    cache.bump(db, cache.CATALOG)
     db.commit()
     db.refresh(db_product)
     
@@ -970,6 +1463,33 @@ def create_product(
         "features": db_product.features.split(",") if db_product.features else []
     }
 
+# Admin tizimi - Katalogni ommaviy import/eksport (CSV yoki JSONL)
+@app.post("/api/admin/products/import")
+def import_products(
+    file: UploadFile = File(...),
+    format: str = "",
+    current_user: models.User = Depends(get_current_user)
+):
+    """Fayl oqim bilan o'qiladi va batch'lab upsert qilinadi. Xato qatorlar javobda qaytariladi."""
+    if not current_user.is_admin:
+         raise HTTPException(status_code=403, detail="Sizda bu amalni bajarish uchun ruxsat yo'q (Faqat Admin)")
+    file_format = catalog_io.detect_format(format, file.filename)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Format noto'g'ri: csv yoki jsonl bo'lishi kerak")
+    return catalog_io.import_stream(file.file, file_format)
+
+@app.get("/api/admin/products/export")
+def export_products(format: str = catalog_io.CSV, current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+         raise HTTPException(status_code=403, detail="Sizda bu amalni bajarish uchun ruxsat yo'q (Faqat Admin)")
+    if format not in catalog_io.FORMATS:
+        raise HTTPException(status_code=400, detail="Format noto'g'ri: csv yoki jsonl bo'lishi kerak")
+    return StreamingResponse(
+        catalog_io.export_stream(format),
+        media_type=catalog_io.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
 # Admin tizimi - Mahsulotni o'chirish (DELETE)
 @app.delete("/api/products/{product_id}")
 def delete_product(
@@ -985,6 +1505,7 @@ def delete_product(
         raise HTTPException(status_code=404, detail="Mahsulot topilmadi")
         
     db.delete(db_product)
+    cache.bump(db, cache.CATALOG)
     db.commit()
     return {"message": "Mahsulot tranzaksiyasi bekor qilindi, muvaffaqiyatli o'chirildi"}
 
@@ -1014,7 +1535,10 @@ def update_product(
     db_product.category = product.category
     db_product.techStack = tech_stack_str
     db_product.features = features_str
+    if product.download_file is not None:   # berilmasa o'zgarmaydi, "" — olib tashlaydi
+        db_product.download_file = product.download_file or None
     
+    cache.bump(db, cache.CATALOG)
     db.commit()
     db.refresh(db_product)
     
@@ -1044,6 +1568,7 @@ def get_admin_settings(
 
 
 @app.post("/api/admin/settings")
+@query_budget(8)
 def save_admin_settings(
     payload: dict,
     db: Session = Depends(get_db),
@@ -1053,18 +1578,28 @@ def save_admin_settings(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Ruxsat yo'q")
 
+    values = {}
     for key, value in payload.items():
         key = str(key).strip()
-        if not key:
-            continue
-        existing = db.query(models.SystemSetting).filter(
-            models.SystemSetting.key == key
-        ).first()
+        if key:
+            values[key] = str(value)
+
+    # Mavjud kalitlar bitta IN so'rovida
+    existing_rows = {
+        row.key: row for row in
+        db.query(models.SystemSetting).filter(models.SystemSetting.key.in_(values)).all()
+    } if values else {}
+    new_rows = []
+    for key, value in values.items():
+        existing = existing_rows.get(key)
         if existing:
-            existing.value = str(value)
+            existing.value = value
         else:
-            db.add(models.SystemSetting(key=key, value=str(value)))
+            new_rows.append({"key": key, "value": value})
+    if new_rows:
+        db.execute(insert(models.SystemSetting), new_rows)
 
+    cache.bump(db, cache.SETTINGS)
     db.commit()
     return {"message": "Sozlamalar muvaffaqiyatli saqlandi!", "count": len(payload)}
 
@@ -1079,16 +1614,32 @@ PUBLIC_KEYS = {
 }
 
 @app.get("/api/settings/public")
-def get_public_settings(db: Session = Depends(get_db)):
-    """Hamma ko'rishi mumkin bo'lgan sozlamalar. Maxfiy kalitlar YO'Q."""
-    rows = db.query(models.SystemSetting).filter(
-        models.SystemSetting.key.in_(PUBLIC_KEYS)
-    ).all()
-    return {row.key: row.value for row in rows}
+@query_budget(2)
+def get_public_settings(request: Request, db: Session = Depends(get_db)):
+    """Hamma ko'rishi mumkin bo'lgan sozlamalar. Maxfiy kalitlar YO'Q. ETag — settings versiyasi."""
+    etag = httpcache.make_etag(cache.SETTINGS, cache.settings_cache.current_version(db))
+    if httpcache.not_modified(request, etag):
+        return httpcache.not_modified_response(etag)
+    settings, version = cache.settings_cache.get_versioned(db)
+    public = {key: value for key, value in settings.items() if key in PUBLIC_KEYS}
+    return httpcache.json_response(request, httpcache.make_etag(cache.SETTINGS, version), public)
 
 
 # ── Click.uz Webhook (Callback) ─────────────────────────────────────────────
-@app.post("/api/payments/click/webhook")
+
+def _transition_order(db: Session, order: models.Order, status: str) -> bool:
+    """
+    pending buyurtmani shartli UPDATE bilan `status` ga o'tkazadi (joriy tranzaksiyada).
+    False — buyurtma allaqachon pending emas (to'langan, bekor qilingan yoki eskirgan).
+    """
+    return db.execute(
+        update(models.Order)
+        .where(models.Order.id == order.id, models.Order.status == "pending")
+        .values(status=status)
+    ).rowcount == 1
+
+@app.post("/api/payments/click/webhook",
+          dependencies=[Depends(ratelimit.limit_by_ip("click_webhook_ip"))])
 def click_webhook(
     click_trans_id: int        = FastAPIForm(...),
     service_id: int            = FastAPIForm(...),
@@ -1109,10 +1660,7 @@ def click_webhook(
     """
 
     # ── 1. Secret key dan o'qish ──────────────────────────────────────────────
-    secret_row = db.query(models.SystemSetting).filter(
-        models.SystemSetting.key == "click_secret_key"
-    ).first()
-    secret_key = secret_row.value.strip() if secret_row and secret_row.value else ""
+    secret_key = cache.get_setting(db, "click_secret_key")
 
     # ── 2. Sign tekshiruvi (MD5) ──────────────────────────────────────────────
     # Click formula: MD5(click_trans_id + service_id + secret_key +
@@ -1126,6 +1674,7 @@ def click_webhook(
         f"{action}"
         f"{sign_time}"
     )
+    import hashlib  # faqat Click webhook uchun kerak
     expected_sign = hashlib.md5(sign_input.encode("utf-8")).hexdigest()
 
     if secret_key and expected_sign != sign_string:
@@ -1197,30 +1746,68 @@ def click_webhook(
 
     # ── 5. action == 1: Complete ──────────────────────────────────────────────
     if action == 1:
-        if error < 0:
-            # Click o'zi xato yubordi — to'lov bekor
-            order.status = "cancelled"
-            db.commit()
+        def _complete_error(code: int, note: str) -> dict:
             return {
                 "click_trans_id": click_trans_id,
                 "merchant_trans_id": merchant_trans_id,
                 "merchant_confirm_id": order.id,
-                "error": 0,
-                "error_note": "Cancelled",
+                "error": code,
+                "error_note": note,
             }
 
-        if order.status == "paid":
-            return {
-                "click_trans_id": click_trans_id,
-                "merchant_trans_id": merchant_trans_id,
-                "merchant_confirm_id": order.id,
-                "error": -4,
-                "error_note": "Already paid",
-            }
+        def _status_error() -> dict:
+            # Holat boshqa so'rov (takroriy Complete, sweeper) tomonidan o'zgartirilgan
+            db.refresh(order)
+            if order.status == "paid":
+                return _complete_error(-4, "Already paid")
+            return _complete_error(-9, "Transaction cancelled")
 
-        # ✅ To'lov muvaffaqiyatli — orderni "paid" qilish
-        order.status = "paid"
-        db.commit()
+        if error < 0:
+            # Click o'zi xato yubordi — to'lov bekor (faqat hali pending bo'lsa)
+            with serialized_writes:  # SQLite: bitta yozuvchi navbati
+                cancelled = _transition_order(db, order, "cancelled")
+                if cancelled:
+                    events.publish(db, events.ADMIN, "order.cancelled", events.order_payload(order))
+                    events.publish(db, events.user_channel(order.user_id), "order.cancelled", {"order_id": order.id})
+                    dashboard.bump(db, order.user_id)
+                    db.commit()
+                else:
+                    db.rollback()
+            if not cancelled:
+                return _status_error()
+            return _complete_error(0, "Cancelled")
+
+        if order.status == "paid":
+            return _complete_error(-4, "Already paid")
+        if order.status != "pending":
+            return _complete_error(-9, "Transaction cancelled")
+
+        # Savdolar lock'dan tashqarida tayyorlanadi: katalog snapshot'ini sovuq qayta qurish
+        # yozuvchilar navbatini (va boshqa process'larni) kutdirmasin
+        if order.items:
+            categories = catalog_cache.get(db).by_id
+            sales = [
+                (item.product_id, categories.get(str(item.product_id), {}).get("category"), item.quantity, item.amount_usd)
+                for item in order.items
+            ]
+        else:
+            # Eski buyurtma (order_items'siz) — mahsulot nomi bo'yicha
+            product_id, category = analytics.product_by_title(db, order.product_title)
+            sales = [(product_id, category or order.product_category, 1, order.amount_usd or 0.0)]
+
+        # ✅ To'lov muvaffaqiyatli — faqat pending → paid (parallel/takroriy Complete bitta marta sanaladi)
+        with serialized_writes, tracing.span("click.complete", order_id=order.id):  # SQLite: bitta yozuvchi navbati
+            paid = _transition_order(db, order, "paid")
+            if paid:
+                analytics.record_sales(db, sales, order.created_at)
+                events.publish(db, events.ADMIN, "order.paid", events.order_payload(order))
+                events.publish(db, events.user_channel(order.user_id), "order.paid", {"order_id": order.id})
+                dashboard.bump(db, order.user_id)
+                db.commit()
+            else:
+                db.rollback()
+        if not paid:
+            return _status_error()
 
         # Telegram bildirishnoma
         try:
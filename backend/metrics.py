@@ -0,0 +1,203 @@
+"""
+So'rovlar ko'rsatkichlari: har bir route uchun latency histogrammasi, status
+kodlari, bir vaqtdagi so'rovlar (in-flight) va DB'da o'tgan vaqt ulushi.
+Natija Prometheus text formatida /metrics orqali beriladi.
+
+Middleware faqat event loop thread'ida ishlaydi, shuning uchun hisoblagichlar
+lock'siz yangilanadi. DB vaqti SQLAlchemy cursor event'laridan so'rovning
+o'z obyektiga (contextvar) yoziladi — u obyektni faqat shu so'rov thread'lari
+o'zgartiradi.
+"""
+import contextvars
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency bucket chegaralari (soniya)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    """Bitta so'rov davomida yig'iladigan ma'lumot (DB vaqti va so'rovlar soni)."""
+    __slots__ = ("scope", "db_time", "db_queries", "shapes")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.shapes = None      # sql_profiler: SQL shakli -> soni
+
+    @property
+    def endpoint(self) -> str:
+        """Route shabloni (masalan, /api/cart/{product_id}) yoki xom path."""
+        if self.scope is None:
+            return "-"
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "-")
+
+
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "total", "db_total", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)   # oxirgisi: +Inf
+        self.count = 0
+        self.total = 0.0
+        self.db_total = 0.0
+        self.statuses = {}
+
+
+_routes = {}          # (method, route) -> _RouteStats
+_in_flight = 0
+
+
+def _record(method: str, route: str, status_code: int, elapsed: float, db_time: float) -> None:
+    key = (method, route)
+    stats = _routes.get(key)
+    if stats is None:
+        stats = _routes[key] = _RouteStats()
+    stats.buckets[bisect_left(BUCKETS, elapsed)] += 1
+    stats.count += 1
+    stats.total += elapsed
+    stats.db_total += db_time
+    stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+
+
+# ── SQLAlchemy: DB vaqtini so'rovga yozish ────────────────────────────────────
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+# Har bir SQL so'rovdan keyin chaqiriladigan qo'shimcha funksiyalar:
+# hook(stats: RequestStats | None, statement: str, started: float, elapsed: float)
+statement_hooks = []
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    elapsed = time.perf_counter() - started
+    stats = current_request.get()
+    if stats is not None:
+        stats.db_time += elapsed
+        stats.db_queries += 1
+    for hook in statement_hooks:
+        hook(stats, statement, started, elapsed)
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _in_flight -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            _record(scope["method"], path, status_code, elapsed, stats.db_time)
+            current_request.reset(token)
+
+
+# ── Prometheus text formati ──────────────────────────────────────────────────
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _metric_lines(name: str, help_text: str, metric_type: str, value) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    if isinstance(value, dict):
+        # {(("label", "qiymat"), ...): son}
+        for labels, v in value.items():
+            lines.append(f"{name}{_labels(**dict(labels))} {v}")
+    else:
+        lines.append(f"{name} {value}")
+    return lines
+
+
+def render_prometheus(extra: dict = None) -> str:
+    """
+    Barcha ko'rsatkichlarni Prometheus text formatida qaytaradi.
+    extra: {"metric_name": (help, "gauge" | "counter", qiymat)} — pool, sweeper, kesh va h.k.
+    """
+    lines = [
+        "# HELP http_request_duration_seconds So'rov davomiyligi (route bo'yicha)",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    routes = list(_routes.items())
+    for (method, route), stats in routes:
+        cumulative = 0
+        for bound, count in zip(BUCKETS, stats.buckets):
+            cumulative += count
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le='+Inf')} {stats.count}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {stats.total:.6f}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {stats.count}")
+
+    lines += [
+        "# HELP http_requests_total So'rovlar soni (route va status kodi bo'yicha)",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route), stats in routes:
+        for code, count in sorted(stats.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=code)} {count}")
+
+    lines += [
+        "# HELP http_request_db_seconds_total So'rovlar ichida DB'da o'tgan vaqt",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+    for (method, route), stats in routes:
+        lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {stats.db_total:.6f}")
+
+    lines += [
+        "# HELP http_request_db_time_share DB vaqtining umumiy so'rov vaqtiga nisbati",
+        "# TYPE http_request_db_time_share gauge",
+    ]
+    for (method, route), stats in routes:
+        share = stats.db_total / stats.total if stats.total else 0.0
+        lines.append(f"http_request_db_time_share{_labels(method=method, route=route)} {share:.4f}")
+
+    lines += [
+        "# HELP http_requests_in_flight Hozir bajarilayotgan so'rovlar",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {_in_flight}",
+    ]
+
+    for name, (help_text, metric_type, value) in (extra or {}).items():
+        lines += _metric_lines(name, help_text, metric_type, value)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+"""
+Versiyalangan migratsiyalar (MySQL va SQLite uchun).
+
+Ishlatish:
+    python migrations.py            # yangi migratsiyalarni qo'llash
+    python migrations.py --status   # qaysi versiyalar qo'llanganini ko'rish
+
+Qo'llangan versiyalar `schema_version` jadvalida saqlanadi, shuning uchun
+har bir migratsiya faqat bir marta bajariladi. Render'da deploy oldidan
+(preDeployCommand) bir marta ishga tushadi — worker'lar startup paytida
+create_all chaqirmaydi.
+
+Yangi migratsiya qo'shish: funksiya yozing va MIGRATIONS ro'yxati oxiriga
+(keyingi versiya raqami bilan) qo'shing. Funksiyalar idempotent bo'lishi
+kerak (eski qo'lda yozilgan skriptlar bilan qisman yangilangan bazalar ham bor).
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, cast, exists, func, inspect, literal, select, text
+from sqlalchemy.exc import IntegrityError
+
+import models
+from database import engine
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime),
+)
+
+# MySQL da bir vaqtda faqat bitta runner ishlashi uchun
+MYSQL_LOCK_NAME = "layzzbe_market_migrations"
+
+
+# ── Yordamchi funksiyalar ────────────────────────────────────────────────────
+
+def _has_table(conn, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def _add_column(conn, table: str, column: str, ddl: str) -> None:
+    """Ustun yo'q bo'lsa qo'shadi."""
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_index(conn, name: str, table: str, columns: list, unique: bool = False) -> None:
+    """Indeks yo'q bo'lsa yaratadi."""
+    indexes = {i["name"] for i in inspect(conn).get_indexes(table)}
+    if name not in indexes:
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        conn.execute(text(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})"))
+
+
+def _create_tables(conn, *names: str) -> None:
+    """models.py dagi jadvallarni (yo'q bo'lsa) yaratadi."""
+    tables = [models.Base.metadata.tables[name] for name in names]
+    models.Base.metadata.create_all(conn, tables=tables, checkfirst=True)
+
+
+# ── Migratsiyalar ────────────────────────────────────────────────────────────
+
+def m001_initial_schema(conn):
+    _create_tables(
+        conn,
+        "products", "users", "orders", "transactions",
+        "cart_items", "wishlist_items", "system_settings",
+    )
+
+
+def m002_users_profile_and_wallet(conn):
+    # Avval migrate_wallet.py va qo'lda qo'shilgan ustunlar
+    _add_column(conn, "users", "role", "VARCHAR(20) DEFAULT 'user'")
+    _add_column(conn, "users", "full_name", "VARCHAR(100)")
+    _add_column(conn, "users", "phone", "VARCHAR(20)")
+    _add_column(conn, "users", "balance", "FLOAT DEFAULT 0.0")
+    _add_column(conn, "users", "created_at", "DATETIME")
+
+
+def m003_orders_category_and_status(conn):
+    # Avval migrate_orders.py va migrate_status.py
+    _add_column(conn, "orders", "product_category", "VARCHAR(100)")
+    _add_column(conn, "orders", "status", "VARCHAR(20) NOT NULL DEFAULT 'completed'")
+
+
+def m004_orders_status_created_at_index(conn):
+    _create_index(conn, "ix_orders_status_created_at", "orders", ["status", "created_at"])
+
+
+def m005_cache_versions(conn):
+    _create_tables(conn, "cache_versions")
+
+
+def m006_rate_limit_buckets(conn):
+    _create_tables(conn, "rate_limit_buckets")
+
+
+def m007_product_recommendations(conn):
+    _create_tables(conn, "product_recommendations", "recommendation_state")
+
+
+def m008_sales_rollups(conn):
+    _create_tables(conn, "sales_rollups")
+
+
+def m009_order_items(conn):
+    _create_tables(conn, "order_items")
+    # Eski buyurtmalar: mahsulot nomi bo'yicha topilganlari uchun bitta qator (miqdor 1).
+    # Birlashtirilgan nomli ("X va yana N ta") Click buyurtmalari qatorsiz qoladi.
+    orders, items, products = (models.Base.metadata.tables[name] for name in ("orders", "order_items", "products"))
+    product_id = (
+        select(func.min(products.c.id))
+        .where(products.c.title == orders.c.product_title)
+        .scalar_subquery()
+    )
+    legacy = (
+        select(
+            orders.c.id, product_id, orders.c.user_id, orders.c.product_title, orders.c.product_image,
+            literal(1), orders.c.amount_usd, orders.c.amount_usd, orders.c.created_at,
+        )
+        .where(product_id.isnot(None), ~exists().where(items.c.order_id == orders.c.id))
+    )
+    conn.execute(items.insert().from_select(
+        ["order_id", "product_id", "user_id", "product_title", "product_image",
+         "quantity", "unit_price_usd", "amount_usd", "created_at"],
+        legacy,
+    ))
+
+
+def m010_product_stats(conn):
+    _create_tables(conn, "product_stats")
+
+
+def m011_events(conn):
+    _create_tables(conn, "events")
+
+
+def m012_products_download_file(conn):
+    _add_column(conn, "products", "download_file", "VARCHAR(255)")
+
+
+def m013_dashboard_cache_versions(conn):
+    # Mavjud foydalanuvchilar uchun "dashboard:{id}" versiya qatorlari (yangilari
+    # ro'yxatdan o'tishda yaratiladi) — birinchi yozuv bitta UPDATE bilan tugaydi
+    users, versions = (models.Base.metadata.tables[name] for name in ("users", "cache_versions"))
+    name = literal("dashboard:", String) + cast(users.c.id, String)
+    conn.execute(versions.insert().from_select(
+        ["name", "version"],
+        select(name, literal(0)).where(~exists().where(versions.c.name == name)),
+    ))
+
+
+def m014_recommendation_state_pending_orders(conn):
+    _add_column(conn, "recommendation_state", "pending_order_ids", "TEXT")
+
+
+def m015_recommendation_state_next_run_at(conn):
+    _add_column(conn, "recommendation_state", "next_run_at", "DATETIME")
+
+
+def m016_read_pins(conn):
+    _create_tables(conn, "read_pins")
+
+
+MIGRATIONS = [
+    (1, "Boshlang'ich jadvallar", m001_initial_schema),
+    (2, "users: role, full_name, phone, balance", m002_users_profile_and_wallet),
+    (3, "orders: product_category, status", m003_orders_category_and_status),
+    (4, "orders: (status, created_at) indeksi", m004_orders_status_created_at_index),
+    (5, "cache_versions jadvali", m005_cache_versions),
+    (6, "rate_limit_buckets jadvali", m006_rate_limit_buckets),
+    (7, "product_recommendations va recommendation_state jadvallari", m007_product_recommendations),
+    (8, "sales_rollups jadvali", m008_sales_rollups),
+    (9, "order_items jadvali va eski buyurtmalardan to'ldirish", m009_order_items),
+    (10, "product_stats jadvali", m010_product_stats),
+    (11, "events jadvali (SSE)", m011_events),
+    (12, "products: download_file", m012_products_download_file),
+    (13, "cache_versions: dashboard qatorlari", m013_dashboard_cache_versions),
+    (14, "recommendation_state: pending_order_ids", m014_recommendation_state_pending_orders),
+    (15, "recommendation_state: next_run_at", m015_recommendation_state_next_run_at),
+    (16, "read_pins jadvali (read-your-writes)", m016_read_pins),
+]
+
+
+# ── Runner ───────────────────────────────────────────────────────────────────
+
+def applied_versions(conn) -> set:
+    return set(conn.execute(select(schema_version.c.version)).scalars().all())
+
+
+def run_migrations(bind=engine) -> list:
+    """Qo'llanmagan migratsiyalarni tartib bilan bajaradi. Qo'llangan versiyalar ro'yxatini qaytaradi."""
+    schema_version.create(bind, checkfirst=True)
+    is_mysql = bind.dialect.name == "mysql"
+    applied = []
+
+    with bind.connect() as lock_conn:
+        if is_mysql:
+            lock_conn.execute(text("SELECT GET_LOCK(:name, 300)"), {"name": MYSQL_LOCK_NAME})
+        try:
+            for version, description, func in MIGRATIONS:
+                with bind.begin() as conn:
+                    if version in applied_versions(conn):
+                        continue
+                    func(conn)
+                    try:
+                        conn.execute(schema_version.insert().values(
+                            version=version,
+                            description=description,
+                            applied_at=datetime.utcnow(),
+                        ))
+                    except IntegrityError:
+                        # Boshqa runner bizdan oldin qo'lladi — migratsiyalar idempotent
+                        continue
+                applied.append(version)
+        finally:
+            if is_mysql:
+                lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MYSQL_LOCK_NAME})
+    return applied
+
+
+def print_status(bind=engine) -> None:
+    schema_version.create(bind, checkfirst=True)
+    with bind.connect() as conn:
+        done = applied_versions(conn)
+    for version, description, _ in MIGRATIONS:
+        mark = "✅" if version in done else "⏳"
+        print(f"{mark} {version:03d}  {description}")
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        print_status()
+    else:
+        versions = run_migrations()
+        if versions:
+            print(f"✅ Qo'llandi: {', '.join(str(v) for v in versions)}")
+        else:
+            print("ℹ️  Baza yangi — migratsiya kerak emas")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, ForeignKey, Index, LargeBinary, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -14,6 +14,8 @@ class Product(Base):
     category = Column(String(100), index=True)
     techStack = Column(String(255))
     features = Column(String(1000))
+    # Sotib olingandan keyin yuklab olinadigan arxiv (DOWNLOADS_DIR ichidagi nisbiy yo'l)
+    download_file = Column(String(255), nullable=True)
 
 class User(Base):
     __tablename__ = "users"
@@ -40,11 +42,43 @@ class Order(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     product_title = Column(String(150))
     product_image = Column(String(255))
+    product_category = Column(String(100), nullable=True)
     amount_usd = Column(Float, default=0.0)
     status = Column(String(20), default="completed", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="orders")
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Eskirgan pending buyurtmalarni tez topish uchun (sweeper.py)
+        Index("ix_orders_status_created_at", "status", "created_at"),
+    )
+
+
+class OrderItem(Base):
+    """Buyurtma qatori: orders — sarlavha (header), har bir mahsulot shu yerda."""
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Mahsulot o'chirilsa ham savdo tarixi qolishi uchun FK yo'q
+    product_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    product_title = Column(String(150))
+    product_image = Column(String(255))
+    quantity = Column(Integer, default=1, nullable=False)
+    unit_price_usd = Column(Float, default=0.0, nullable=False)
+    amount_usd = Column(Float, default=0.0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    order = relationship("Order", back_populates="items")
+
+    __table_args__ = (
+        # Mahsulot bo'yicha savdo (analitika) va foydalanuvchi xaridlari tarixi (tavsiyalar)
+        Index("ix_order_items_product_created_at", "product_id", "created_at"),
+        Index("ix_order_items_user_product", "user_id", "product_id"),
+    )
 
 
 class Transaction(Base):
@@ -91,3 +125,98 @@ class SystemSetting(Base):
     key = Column(String(100), unique=True, nullable=False, index=True)
     value = Column(String(2000), nullable=True)
 
+
+
+class CacheVersion(Base):
+    """Worker'lar orasidagi kesh muvofiqligi: har bir kesh nomi uchun versiya hisoblagichi (cache.py)."""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(100), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class RateLimitBucket(Base):
+    """Rate limiter (RATE_LIMIT_BACKEND=db): worker'lar uchun umumiy token bucket holati (ratelimit.py)."""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(200), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)   # unix vaqt (soniya)
+
+
+class ProductRecommendation(Base):
+    """"Buni ham sotib olishgan" tavsiyalari (recommendations.py): top-k massivlari packed ko'rinishda."""
+    __tablename__ = "product_recommendations"
+
+    product_id = Column(Integer, primary_key=True)
+    product_ids = Column(LargeBinary, nullable=False)   # int32 massiv
+    scores = Column(LargeBinary, nullable=False)        # float32 massiv (cosine o'xshashlik)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RecommendationState(Base):
+    """Tavsiyalar job'ining holati: oxirgi ishlangan order va co-occurrence matritsasi (npz)."""
+    __tablename__ = "recommendation_state"
+
+    id = Column(Integer, primary_key=True)
+    last_order_id = Column(Integer, default=0, nullable=False)
+    matrix = Column(LargeBinary(length=2 ** 24 - 1), nullable=True)   # MySQL: MEDIUMBLOB
+    # last_order_id dan past, lekin hali to'lanmagan ("pending") buyurtmalar — vergul bilan
+    pending_order_ids = Column(Text, nullable=True)
+    # Fon job'ining navbatdagi ishga tushishi — uni shartli UPDATE bilan egallagan bitta worker ishlaydi
+    next_run_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SalesRollup(Base):
+    """Sotuvlar analitikasi (analytics.py): davr (day/week/month) bo'yicha mahsulot savdosi yig'indilari."""
+    __tablename__ = "sales_rollups"
+
+    id = Column(Integer, primary_key=True)
+    period = Column(String(10), nullable=False)          # 'day' | 'week' | 'month'
+    bucket = Column(Date, nullable=False)                # davr boshlanishi (hafta — dushanba)
+    product_id = Column(Integer, nullable=False)         # 0 — mahsulot aniqlanmagan
+    category = Column(String(100), nullable=False, default="")
+    revenue_usd = Column(Float, nullable=False, default=0.0)
+    units = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Upsert kaliti va (period, bucket) oralig'i bo'yicha o'qish
+        UniqueConstraint("period", "bucket", "product_id", name="uq_sales_rollups_period_bucket_product"),
+    )
+
+
+class ProductStats(Base):
+    """Mahsulot ko'rishlari (popularity.py): xotiradagi hisoblagichlar vaqti-vaqti bilan shu yerga qo'shiladi."""
+    __tablename__ = "product_stats"
+
+    product_id = Column(Integer, primary_key=True)
+    views = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # sort=popular: ko'rishlar soni bo'yicha tartiblash
+        Index("ix_product_stats_views", "views"),
+    )
+
+
+class Event(Base):
+    """SSE hodisalari (events.py): handler tranzaksiyasi ichida yoziladi, worker'lar o'z obunachilariga tarqatadi."""
+    __tablename__ = "events"
+
+    id = Column(Integer, primary_key=True)
+    channel = Column(String(100), nullable=False, index=True)    # 'admin' | 'user:{id}'
+    type = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)                       # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ReadPin(Base):
+    """
+    Read-your-writes (database.py): foydalanuvchi yozgandan keyin uning o'qishlari shu vaqtgacha
+    primary'ga boradi. Barcha worker'lar ko'radi — keyingi so'rov boshqa worker'ga tushsa ham.
+    """
+    __tablename__ = "read_pins"
+
+    user_id = Column(Integer, primary_key=True)
+    pinned_until = Column(Float, nullable=False)     # unix vaqt (soniya)
@@ -0,0 +1,46 @@
+import logging
+
+from sqlalchemy.orm import Session
+import cache
+import tracing
+
+logger = logging.getLogger("layzzbe.telegram")
+
+
+def send_telegram_notification(db: Session, message: str) -> None:
+    """
+    Telegram admin ga xabar yuborish.
+    Credentials SystemSetting jadvalidan (settings keshi orqali) o'qiladi — .env ishlatilmaydi.
+    Agar sozlamalar yo'q yoki xato bo'lsa — jimgina o'tib ketadi.
+    """
+    token = ""
+    try:
+        with tracing.span("telegram.settings"):
+            token = cache.get_setting(db, "telegram_bot_token")
+            chat_id = cache.get_setting(db, "telegram_admin_id")
+
+        if not token or not chat_id:
+            logger.info("Bot token yoki admin ID sozlanmagan — xabar yuborilmadi.")
+            return
+
+        # requests og'ir kutubxona — faqat birinchi xabar yuborilganda yuklanadi (tez cold start)
+        import requests as http_requests
+
+        url = f"https://api.telegram.org/bot{token}/sendMessage"
+        # Span'da token ko'rinmasligi uchun URL'siz, faqat host va metod nomi
+        with tracing.span("http.client", **{"peer.service": "telegram", "http.host": "api.telegram.org",
+                                            "http.method": "POST", "telegram.method": "sendMessage"}) as sp:
+            resp = http_requests.post(
+                url,
+                json={"chat_id": chat_id, "text": message, "parse_mode": "HTML"},
+                headers=tracing.outbound_headers(),
+                timeout=5,
+            )
+            if sp is not None:
+                sp.set_attribute("http.status_code", resp.status_code)
+        if not resp.ok:
+            logger.warning("Xabar yuborishda xato: %s — %s", resp.status_code, resp.text[:500])
+    except Exception as e:
+        # Xato matnida so'rov URL'i (bot token bilan) bo'lishi mumkin
+        error = str(e).replace(token, "***") if token else str(e)
+        logger.warning("Istisno: %s: %s", type(e).__name__, error)
@@ -0,0 +1,192 @@
+"""
+Mahsulot ko'rishlari va "ommabop" tartib (write-behind).
+
+POST /api/products/{id}/view bazaga yozmaydi: ko'rish xotiradagi sharded
+hisoblagichga qo'shiladi (har shard o'z lock'i bilan, shuning uchun parallel
+so'rovlar bir-birini kutmaydi). Fon vazifasi har POPULARITY_FLUSH_SECONDS da
+shard'larni bo'shatib, yig'ilgan sonlarni `product_stats` jadvaliga bitta
+multi-VALUES upsert bilan qo'shadi (views = views + N). Har bir worker o'z
+hisobini qo'shadi, shuning uchun natija barcha worker'lar bo'yicha umumiy.
+
+Flush xato bersa sonlar hisoblagichga qaytariladi va keyingi flush'da yana
+yoziladi. Process to'xtaganda (shutdown) oxirgi flush bajariladi; keskin
+o'chishda oxirgi interval ko'rishlari yo'qolishi mumkin — bu qabul qilingan.
+
+`/api/products?sort=popular` tartibi `ranking_cache` dan olinadi
+(ix_product_stats_views indeksi bo'yicha); flush cache.POPULARITY versiyasini
+oshiradi.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import cache
+import models
+from database import SessionLocal
+
+POPULARITY_ENABLED = os.getenv("POPULARITY_ENABLED", "1") != "0"
+POPULARITY_SHARDS = int(os.getenv("POPULARITY_SHARDS", "16"))
+POPULARITY_FLUSH_SECONDS = float(os.getenv("POPULARITY_FLUSH_SECONDS", "5"))
+
+logger = logging.getLogger("layzzbe.popularity")
+
+stats = {
+    "views_total": 0,
+    "flushes": 0,
+    "flushed_views_total": 0,
+    "last_flush_at": None,
+    "last_flush_ms": None,
+    "last_error": None,
+}
+
+_task = None
+
+
+class ShardedCounter:
+    """Kalit -> son. Kalit shard'lar bo'yicha taqsimlanadi, har shard alohida lock bilan."""
+
+    def __init__(self, shards: int):
+        self._shards = [({}, threading.Lock()) for _ in range(max(1, shards))]
+
+    def add(self, key: int, count: int = 1) -> None:
+        counts, lock = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            counts[key] = counts.get(key, 0) + count
+
+    def drain(self) -> dict:
+        """Barcha shard'larni bo'shatadi va yig'indini qaytaradi."""
+        total = {}
+        for counts, lock in self._shards:
+            with lock:
+                items = list(counts.items())
+                counts.clear()
+            for key, count in items:
+                total[key] = total.get(key, 0) + count
+        return total
+
+    def merge(self, counts: dict) -> None:
+        for key, count in counts.items():
+            self.add(key, count)
+
+    def pending(self) -> int:
+        total = 0
+        for counts, lock in self._shards:
+            with lock:
+                total += sum(counts.values())
+        return total
+
+
+views = ShardedCounter(POPULARITY_SHARDS)
+
+
+def record_view(product_id: int) -> None:
+    views.add(product_id)
+    stats["views_total"] += 1
+
+
+def flush() -> int:
+    """Yig'ilgan ko'rishlarni product_stats'ga yozadi. Yozilgan ko'rishlar sonini qaytaradi."""
+    counts = views.drain()
+    if not counts:
+        return 0
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # Mavjud bo'lmagan id'lar (o'chirilgan yoki soxta) yozilmaydi
+        existing = set(db.execute(
+            select(models.Product.id).where(models.Product.id.in_(counts))
+        ).scalars().all())
+        now = datetime.utcnow()
+        rows = [
+            {"product_id": product_id, "views": count, "updated_at": now}
+            for product_id, count in sorted(counts.items())
+            if product_id in existing
+        ]
+        if rows:
+            cache.upsert_add(
+                db, models.ProductStats.__table__, rows,
+                keys=["product_id"], counters=["views"], replace=("updated_at",),
+            )
+            cache.bump(db, cache.POPULARITY)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        views.merge(counts)      # keyingi flush'da qayta urinamiz
+        stats["last_error"] = str(e)
+        raise
+    finally:
+        db.close()
+    flushed = sum(row["views"] for row in rows)
+    stats["flushes"] += 1
+    stats["flushed_views_total"] += flushed
+    stats["last_flush_at"] = now.isoformat()
+    stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    stats["last_error"] = None
+    return flushed
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(POPULARITY_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(flush)
+        except Exception:
+            logger.exception("Ko'rishlarni yozishda xato")
+
+
+def start():
+    """Fon vazifasini ishga tushiradi (startup event ichidan chaqiriladi)."""
+    global _task
+    if not POPULARITY_ENABLED or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_flush_loop())
+
+
+async def stop():
+    """Fon vazifasini to'xtatadi va qolgan ko'rishlarni yozadi (shutdown event)."""
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    try:
+        await asyncio.to_thread(flush)
+    except Exception:
+        logger.exception("Shutdown paytida ko'rishlarni yozishda xato")
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "enabled": POPULARITY_ENABLED,
+        "pending_views": views.pending(),
+        "shards": POPULARITY_SHARDS,
+        "flush_seconds": POPULARITY_FLUSH_SECONDS,
+    }
+
+
+# ── Ommabop tartib ──────────────────────────────────────────────────────────
+
+def _load_ranking(db: Session, _key=None) -> list:
+    """Mahsulot id'lari (str) ko'rishlar soni kamayishi tartibida."""
+    return [
+        str(product_id)
+        for product_id in db.execute(
+            select(models.ProductStats.product_id)
+            .where(models.ProductStats.views > 0)
+            .order_by(models.ProductStats.views.desc(), models.ProductStats.product_id)
+        ).scalars()
+    ]
+
+
+ranking_cache = cache.VersionedCache(cache.POPULARITY, _load_ranking)
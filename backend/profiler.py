@@ -0,0 +1,250 @@
+"""
+Admin'lar uchun bitta so'rovni profiler ostida bajarish (on-demand profiling).
+
+Admin so'rovga `X-Profile: 1` sarlavhasini qo'shadi. get_current_user admin
+ekanini tasdiqlasa, shu so'rov endpoint'i sampling profiler ostida ishlaydi:
+alohida thread har PROFILE_SAMPLE_INTERVAL_MS da sys._current_frames() dan
+endpoint stekini oladi. Endpoint'lar ProfiledRoute orqali o'raladi: o'ram
+profil so'ralgan so'rovda (contextvar) endpoint qaysi thread'da va qaysi
+frame ostida ishlayotganini qayd etadi — bir xil endpoint'ga parallel
+so'rovlar yoki umumiy dekorator (serialized_writes) kodi profilga aralashmaydi. Natija flamegraph uchun "folded stacks" formatida
+(flamegraph.pl, speedscope, inferno) saqlanadi va javobga X-Profile-Id
+qo'shiladi. Profil /api/admin/profiles/{id} orqali yuklab olinadi.
+
+Eng sekin PROFILE_TOP_N ta va oxirgi PROFILE_KEEP_RECENT ta profil xotirada
+saqlanadi. Sarlavha bo'lmasa middleware faqat sarlavhalar ro'yxatini ko'rib
+chiqadi — boshqa hech qanday qo'shimcha ish yo'q.
+"""
+import asyncio
+import contextvars
+import functools
+import heapq
+import inspect
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from fastapi.routing import APIRoute
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "10"))
+PROFILE_KEEP_RECENT = int(os.getenv("PROFILE_KEEP_RECENT", "20"))
+
+# Joriy so'rovning profil sessiyasi (middleware o'rnatadi; threadpool'ga ham ko'chadi)
+_active = contextvars.ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """Bitta so'rovning sampling profili."""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.id = uuid.uuid4().hex[:12]
+        self.samples = {}          # folded stack -> soni
+        self.sample_count = 0
+        self._target = None        # endpoint code obyekti (dekoratorlarsiz)
+        self._thread_id = None     # endpoint bajarilayotgan thread
+        self._anchor = None        # ProfiledRoute o'ramining frame'i — stek shu yerdan boshlanadi
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self, endpoint) -> None:
+        if endpoint is None or self._thread is not None:
+            return
+        self._target = getattr(inspect.unwrap(endpoint), "__code__", None)
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Sampler'ni to'xtatadi va kutadi (event loop'dan asyncio.to_thread orqali chaqiring)."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+
+    def enter(self, anchor) -> None:
+        """Endpoint o'ramidan: shu thread va frame — shu so'rovniki."""
+        self._anchor = anchor
+        self._thread_id = threading.get_ident()
+
+    def leave(self) -> None:
+        self._anchor = None
+        self._thread_id = None
+
+    def _run(self) -> None:
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            thread_id, anchor = self._thread_id, self._anchor
+            if thread_id is None or anchor is None:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            stack = self._endpoint_stack(frame, anchor) if frame is not None else None
+            if stack:
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+                self.sample_count += 1
+
+    def _endpoint_stack(self, frame, anchor):
+        """
+        Endpoint frame'idan barg (leaf) frame'gacha bo'lgan folded stek, yoki None (thread o'ram
+        ichida emas — masalan async endpoint await'da). O'ram bilan endpoint orasidagi
+        dekorator frame'lari (serialized_writes) kesiladi.
+        """
+        names = []
+        root = None
+        while frame is not anchor:
+            if frame is None:
+                return None
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            if code is self._target:
+                root = len(names)
+            frame = frame.f_back
+        return ";".join(reversed(names[:root])) or None
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in
+                       sorted(self.samples.items(), key=lambda item: -item[1]))
+
+
+# ── Saqlangan profillar ──────────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_recent = OrderedDict()     # id -> profile (oxirgilari)
+_slowest = []               # (duration_ms, id, profile) min-heap, PROFILE_TOP_N ta
+
+
+def _store(profile: dict) -> None:
+    with _lock:
+        _recent[profile["id"]] = profile
+        while len(_recent) > PROFILE_KEEP_RECENT:
+            _recent.popitem(last=False)
+        entry = (profile["duration_ms"], profile["id"], profile)
+        if len(_slowest) < PROFILE_TOP_N:
+            heapq.heappush(_slowest, entry)
+        elif entry[0] > _slowest[0][0]:
+            heapq.heapreplace(_slowest, entry)
+
+
+def _summary(profile: dict) -> dict:
+    return {k: v for k, v in profile.items() if k != "folded"}
+
+
+def list_profiles() -> dict:
+    with _lock:
+        slowest = sorted(_slowest, reverse=True)
+        recent = list(_recent.values())
+    return {
+        "slowest": [_summary(p) for _, _, p in slowest],
+        "recent": [_summary(p) for p in reversed(recent)],
+    }
+
+
+def get_profile(profile_id: str):
+    with _lock:
+        profile = _recent.get(profile_id)
+        if profile is None:
+            profile = next((p for _, pid, p in _slowest if pid == profile_id), None)
+    return profile
+
+
+def _instrument(endpoint):
+    """Endpoint o'rami: profil so'ralgan so'rovda endpoint thread'i va frame'ini qayd etadi."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            session = _active.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            session.enter(sys._getframe())
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                session.leave()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            session = _active.get()
+            if session is None:
+                return endpoint(*args, **kwargs)
+            session.enter(sys._getframe())
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                session.leave()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """app.router.route_class: har bir endpoint _instrument bilan o'raladi."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _instrument(endpoint), **kwargs)
+
+
+def start_if_requested(request) -> None:
+    """get_current_user admin'ni tasdiqlagandan keyin chaqiradi: so'ralgan bo'lsa profiler'ni yoqadi."""
+    session = request.scope.get("state", {}).get("profile")
+    if session is not None:
+        session.start(request.scope.get("endpoint"))
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope)
+        scope.setdefault("state", {})["profile"] = session
+        token = _active.set(session)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if session.started:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", session.id.encode()),
+                    ]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _active.reset(token)
+            duration_ms = (time.perf_counter() - started) * 1000
+            if session.started:
+                # join event loop'ni bloklamasin — sampler oxirgi interval'ni tugatguncha kutadi
+                await asyncio.to_thread(session.stop)
+                route = scope.get("route")
+                _store({
+                    "id": session.id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 2),
+                    "samples": session.sample_count,
+                    "interval_ms": PROFILE_SAMPLE_INTERVAL_MS,
+                    "created_at": datetime.utcnow().isoformat(),
+                    "folded": session.folded(),
+                })
@@ -0,0 +1,186 @@
+"""
+Login, ro'yxatdan o'tish va Click webhook uchun rate limiter (token bucket).
+
+Har bir qoida "N ta so'rov / T soniya" ko'rinishida (masalan, RATE_LIMIT_LOGIN_IP=10/60):
+bucket sig'imi N, u T soniyada to'liq to'ladi. Kalitlar IP va email bo'yicha.
+Limitdan oshgan so'rov bcrypt va DB ishidan oldin 429 + Retry-After oladi.
+
+Backend'lar:
+- memory (default) — process ichidagi dict. Har worker o'z hisobini yuritadi,
+  shuning uchun amaldagi limit taxminan N × WEB_CONCURRENCY. Uzoq vaqt
+  ishlatilmagan (to'lib bo'lgan) bucket'lar vaqti-vaqti bilan o'chiriladi.
+- db — `rate_limit_buckets` jadvali, barcha worker'lar uchun umumiy. Har bir
+  tekshiruv bitta atomar UPDATE (kalit yangi bo'lsa INSERT) bilan bajariladi.
+"""
+import os
+import threading
+import time
+
+import anyio.to_thread
+from fastapi import HTTPException, Request
+from sqlalchemy import case, delete, literal, update
+
+import models
+from cache import insert_ignore
+from database import SessionLocal
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")      # "memory" | "db"
+# Render kabi proxy orqasida haqiqiy IP X-Forwarded-For'ning oxirgi elementida. Default o'chiq:
+# proxy'siz deploy'da sarlavhani klient o'zi yozadi va har so'rovda limitni chetlab o'tadi
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+RATE_LIMIT_EVICT_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_EVICT_INTERVAL_SECONDS", "60"))
+
+_DEFAULT_RULES = {
+    "login_ip": "20/60",
+    "login_email": "5/60",
+    "register_ip": "5/600",
+    "click_webhook_ip": "100/1",
+    "product_view_ip": "60/60",
+}
+
+
+class Rule:
+    __slots__ = ("name", "capacity", "rate")
+
+    def __init__(self, name: str, spec: str):
+        count, seconds = spec.split("/")
+        self.name = name
+        self.capacity = float(count)
+        self.rate = float(count) / float(seconds)      # token / soniya
+
+    @property
+    def refill_seconds(self) -> float:
+        return self.capacity / self.rate
+
+
+RULES = {
+    name: Rule(name, os.getenv(f"RATE_LIMIT_{name.upper()}", spec))
+    for name, spec in _DEFAULT_RULES.items()
+}
+
+stats = {name: {"allowed": 0, "limited": 0} for name in RULES}
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._buckets = {}          # kalit -> (tokens, oxirgi yangilanish)
+        self._lock = threading.Lock()
+        self._next_evict = time.monotonic() + RATE_LIMIT_EVICT_INTERVAL_SECONDS
+        # Shundan uzoq ishlatilmagan bucket baribir to'la — saqlash shart emas
+        self._idle_after = max(rule.refill_seconds for rule in RULES.values())
+
+    def hit(self, key: str, rule: Rule) -> float:
+        """Token olinsa 0, aks holda keyingi token uchun kutish vaqti (soniya)."""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_evict:
+                self._evict(now)
+            tokens, last = self._buckets.get(key, (rule.capacity, now))
+            tokens = min(rule.capacity, tokens + (now - last) * rule.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rule.rate
+
+    def _evict(self, now: float) -> None:
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < self._idle_after}
+        self._next_evict = now + RATE_LIMIT_EVICT_INTERVAL_SECONDS
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class DatabaseBackend:
+    def __init__(self):
+        self._next_evict = 0.0
+        self._idle_after = max(rule.refill_seconds for rule in RULES.values())
+
+    def hit(self, key: str, rule: Rule) -> float:
+        now = time.time()
+        table = models.RateLimitBucket
+        refilled = table.tokens + (literal(now) - table.updated_at) * rule.rate
+        refilled = case((refilled > rule.capacity, rule.capacity), else_=refilled)
+        db = SessionLocal()
+        try:
+            # Token yetarli bo'lsagina kamaytiradi — tekshirish va yozish bitta atomar UPDATE
+            taken = db.execute(
+                update(table)
+                .where(table.key == key, refilled >= 1)
+                .values(tokens=refilled - 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not taken:
+                taken = db.execute(
+                    insert_ignore(table.__table__).values(key=key, tokens=rule.capacity - 1, updated_at=now)
+                ).rowcount
+            if now >= self._next_evict:
+                db.execute(delete(table).where(table.updated_at < now - self._idle_after))
+                self._next_evict = now + RATE_LIMIT_EVICT_INTERVAL_SECONDS
+            db.commit()
+            if taken:
+                return 0.0
+            tokens = db.query(table.tokens, table.updated_at).filter(table.key == key).first()
+        finally:
+            db.close()
+        if tokens is None:
+            return 1 / rule.rate
+        available = min(rule.capacity, tokens[0] + (now - tokens[1]) * rule.rate)
+        return max(0.0, (1 - available) / rule.rate)
+
+    def size(self):
+        return None
+
+
+backend = DatabaseBackend() if RATE_LIMIT_BACKEND == "db" else MemoryBackend()
+
+
+def check(rule_name: str, identity: str) -> None:
+    """Limitdan oshsa HTTPException(429) ko'taradi. Sync kod (handler) ichidan chaqiriladi."""
+    if not RATE_LIMIT_ENABLED or not identity:
+        return
+    rule = RULES[rule_name]
+    retry_after = backend.hit(f"{rule_name}:{identity}", rule)
+    if retry_after <= 0:
+        stats[rule_name]["allowed"] += 1
+        return
+    stats[rule_name]["limited"] += 1
+    raise HTTPException(
+        status_code=429,
+        detail="Juda ko'p urinish. Birozdan keyin qayta urinib ko'ring",
+        headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+    )
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return request.client.host if request.client else ""
+
+
+def limit_by_ip(rule_name: str):
+    """Route dependency: IP bo'yicha limit. Handler va boshqa dependency'lardan oldin tekshiriladi."""
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        ip = client_ip(request)
+        if isinstance(backend, MemoryBackend):
+            check(rule_name, ip)                    # xotirada — event loop'da, thread'siz
+        else:
+            await anyio.to_thread.run_sync(check, rule_name, ip)
+    return dependency
+
+
+def get_stats() -> dict:
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "backend": RATE_LIMIT_BACKEND,
+        "tracked_keys": backend.size(),
+        "rules": {
+            name: {"capacity": rule.capacity, "per_seconds": round(rule.refill_seconds, 3), **stats[name]}
+            for name, rule in RULES.items()
+        },
+    }
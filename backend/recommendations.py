@@ -0,0 +1,428 @@
+"""
+"Buni ham sotib olishgan" tavsiyalari — buyurtmalardagi co-occurrence asosida.
+
+Offline job (fon vazifasi yoki `python recommendations.py`):
+1. Oxirgi ishga tushishdan keyin qo'shilgan to'langan buyurtmalar (id > last_order_id)
+   qatorlari (order_items) chunk'lab o'qiladi va har bir foydalanuvchi uchun
+   yangi sotib olingan mahsulotlar yig'iladi. Click buyurtmalari "pending" holatda
+   yaratilib keyinroq to'lanadi: kursordan past qolgan pending buyurtmalar
+   `pending_order_ids` da eslab qolinadi va to'langanda keyingi ishga tushishda
+   qo'shiladi (aks holda ular hech qachon matritsaga kirmas edi).
+2. Foydalanuvchining avvalgi xaridlari bilan har bir yangi mahsulot juftligi
+   siyrak (COO: rows, cols, counts) co-occurrence matritsasiga qo'shiladi;
+   dublikat koordinatalar NumPy bilan birlashtiriladi (unique + bincount).
+3. O'xshashlik — cosine: C[a, b] / sqrt(n[a] * n[b]), n — mahsulotni sotib
+   olgan foydalanuvchilar soni. Faqat yangi xaridlar ta'sir qilgan qatorlar
+   qayta hisoblanadi va har biri uchun top-k `product_recommendations`
+   jadvaliga packed int32/float32 massivlar sifatida yoziladi.
+
+Matritsa `recommendation_state` jadvalida (npz) saqlanadi, shuning uchun job
+inkremental. Fon vazifasi har worker'da ishlaydi, lekin har safar avval
+`next_run_at` ni shartli UPDATE bilan egallaydi — interval ichida job'ni faqat
+bitta worker bajaradi, qolganlari bitta UPDATE bilan qaytadi. Shunga qaramay
+ikki job ustma-ust tushsa (qo'lda ishga tushirish, interval'dan uzun job), holat
+last_order_id va updated_at bo'yicha shartli UPDATE bilan yangilanadi —
+kechikkan job o'z natijasini rollback qiladi. Faqat cron ishlatilsa:
+web'da RECOMMENDATIONS_ENABLED=0 va `python recommendations.py`.
+
+API tomonida NumPy kerak emas: tavsiyalar PK bo'yicha bitta qatordan o'qiladi
+va versiyalangan keshda saqlanadi.
+"""
+import array
+import asyncio
+import io
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+import cache
+import models
+from cache import insert_ignore
+from database import SessionLocal
+
+RECOMMENDATIONS_ENABLED = os.getenv("RECOMMENDATIONS_ENABLED", "1") != "0"
+RECOMMENDATIONS_INTERVAL_SECONDS = int(os.getenv("RECOMMENDATIONS_INTERVAL_SECONDS", "3600"))
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "10"))
+RECOMMENDATIONS_CHUNK_SIZE = int(os.getenv("RECOMMENDATIONS_CHUNK_SIZE", "5000"))
+
+# Tavsiyaga faqat haqiqatan to'langan buyurtmalar kiradi
+PURCHASED_STATUSES = ("completed", "paid")
+# Keyinroq to'lanishi mumkin bo'lgan holat (Click)
+PENDING_STATUS = "pending"
+_STATE_ID = 1
+# Worker'lar navbatdagi ishga tushishni shu oraliqda tekshiradi
+_CLAIM_POLL_SECONDS = 60
+
+logger = logging.getLogger("layzzbe.recommendations")
+
+stats = {
+    "runs": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_orders": 0,
+    "last_updated_products": 0,
+    "pairs": 0,
+    "skipped_claims": 0,
+    "last_error": None,
+}
+
+_task = None
+
+
+def _numpy():
+    # NumPy faqat job uchun kerak — API worker'lari uni import qilmaydi
+    import numpy
+    return numpy
+
+
+# ── Siyrak co-occurrence matritsasi ─────────────────────────────────────────
+
+class CooccurrenceMatrix:
+    """Simmetrik siyrak matritsa (COO) va har bir mahsulot xaridorlari soni."""
+
+    def __init__(self, rows, cols, counts, item_ids, item_counts):
+        self.rows = rows
+        self.cols = cols
+        self.counts = counts
+        self.item_ids = item_ids            # tartiblangan
+        self.item_counts = item_counts
+
+    @classmethod
+    def empty(cls):
+        np = _numpy()
+        ids = np.zeros(0, dtype=np.int64)
+        return cls(ids, ids, ids, ids, ids)
+
+    @classmethod
+    def load(cls, blob: bytes):
+        np = _numpy()
+        data = np.load(io.BytesIO(blob))
+        return cls(data["rows"], data["cols"], data["counts"], data["item_ids"], data["item_counts"])
+
+    def dump(self) -> bytes:
+        np = _numpy()
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, rows=self.rows, cols=self.cols, counts=self.counts,
+            item_ids=self.item_ids, item_counts=self.item_counts,
+        )
+        return buffer.getvalue()
+
+    @property
+    def nnz(self) -> int:
+        return int(self.rows.size)
+
+    def add(self, rows, cols, items) -> None:
+        """Yangi juftliklar (har biri 1) va yangi xaridlarni qo'shadi; koordinatalar birlashtiriladi."""
+        np = _numpy()
+        rows = np.concatenate([self.rows, np.asarray(rows, dtype=np.int64)])
+        cols = np.concatenate([self.cols, np.asarray(cols, dtype=np.int64)])
+        counts = np.concatenate([self.counts, np.ones(len(rows) - self.rows.size, dtype=np.int64)])
+        if rows.size:
+            span = int(max(rows.max(), cols.max())) + 1
+            keys, inverse = np.unique(rows * span + cols, return_inverse=True)
+            self.counts = np.bincount(inverse, weights=counts).astype(np.int64)
+            self.rows, self.cols = keys // span, keys % span
+
+        ids = np.concatenate([self.item_ids, np.asarray(items, dtype=np.int64)])
+        weights = np.concatenate([self.item_counts, np.ones(len(items), dtype=np.int64)])
+        self.item_ids, inverse = np.unique(ids, return_inverse=True)
+        self.item_counts = np.bincount(inverse, weights=weights).astype(np.int64)
+
+    def neighbours(self, items):
+        """items va ular bilan birga sotib olingan mahsulotlar (qayta hisoblanadigan qatorlar)."""
+        np = _numpy()
+        items = np.asarray(list(items), dtype=np.int64)
+        return np.union1d(items, self.rows[np.isin(self.cols, items)])
+
+    def top_k(self, row_ids, k: int) -> dict:
+        """{product_id: (ids, scores)} — har bir qator uchun cosine bo'yicha eng yaxshi k ta."""
+        np = _numpy()
+        mask = np.isin(self.rows, row_ids)
+        rows, cols, counts = self.rows[mask], self.cols[mask], self.counts[mask]
+        if not rows.size:
+            return {}
+        buyers = self.item_counts[np.searchsorted(self.item_ids, rows)]
+        other_buyers = self.item_counts[np.searchsorted(self.item_ids, cols)]
+        scores = counts / np.sqrt(buyers * other_buyers)
+
+        # Qator bo'yicha, qator ichida ball kamayishi (teng bo'lsa id o'sishi) tartibida
+        order = np.lexsort((cols, -scores, rows))
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        sizes = np.diff(np.r_[starts, rows.size])
+        rank = np.arange(rows.size) - np.repeat(starts, sizes)
+        keep = rank < k
+        rows, cols, scores = rows[keep], cols[keep], scores[keep]
+
+        result = {}
+        bounds = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            result[int(rows[start])] = (
+                cols[start:end].astype(np.int32),
+                scores[start:end].astype(np.float32),
+            )
+        return result
+
+
+# ── Job ─────────────────────────────────────────────────────────────────────
+
+def _purchases(db: Session, where):
+    """(order_id, user_id, product_id) — to'langan buyurtmalar qatorlari, order id bo'yicha chunk'lab."""
+    return db.execute(
+        select(models.OrderItem.order_id, models.OrderItem.user_id, models.OrderItem.product_id)
+        .join(models.Order, models.Order.id == models.OrderItem.order_id)
+        .where(models.Order.status.in_(PURCHASED_STATUSES), *where)
+        .order_by(models.OrderItem.order_id)
+        .execution_options(yield_per=RECOMMENDATIONS_CHUNK_SIZE)
+    )
+
+
+def _history(db: Session, user_ids: list, before_id: int, exclude: set = ()) -> dict:
+    """
+    Foydalanuvchilarning before_id gacha bo'lgan (allaqachon matritsadagi) xaridlari:
+    user_id -> {product_id}. exclude — shu ishga tushishda qo'shilayotgan kechikkan buyurtmalar.
+    """
+    history = {}
+    for i in range(0, len(user_ids), RECOMMENDATIONS_CHUNK_SIZE):
+        chunk = user_ids[i:i + RECOMMENDATIONS_CHUNK_SIZE]
+        # ix_order_items_user_product indeksi bo'yicha
+        where = [models.OrderItem.order_id <= before_id, models.OrderItem.user_id.in_(chunk)]
+        if exclude:
+            where.append(models.OrderItem.order_id.notin_(exclude))
+        for _, user_id, product_id in _purchases(db, where):
+            history.setdefault(user_id, set()).add(product_id)
+    return history
+
+
+def _order_ids(db: Session, statuses, ids=None, after_id: int = None) -> set:
+    """Berilgan holatdagi buyurtmalar id'lari: ids ichidan (chunk'lab) yoki after_id dan keyingilari."""
+    if ids is None:
+        return set(db.execute(
+            select(models.Order.id).where(models.Order.status.in_(statuses), models.Order.id > after_id)
+        ).scalars())
+    ids, found = sorted(ids), set()
+    for i in range(0, len(ids), RECOMMENDATIONS_CHUNK_SIZE):
+        found.update(db.execute(
+            select(models.Order.id).where(
+                models.Order.id.in_(ids[i:i + RECOMMENDATIONS_CHUNK_SIZE]), models.Order.status.in_(statuses)
+            )
+        ).scalars())
+    return found
+
+
+def _parse_ids(value) -> set:
+    return {int(part) for part in (value or "").split(",") if part}
+
+
+def _new_pairs(history: dict, new: dict):
+    """Yangi xaridlar hosil qilgan (rows, cols) juftliklari va yangi xaridlar ro'yxati."""
+    rows, cols, items = [], [], []
+    for user_id, products in new.items():
+        old = history.get(user_id, set())
+        added = sorted(products - old)
+        for i, product in enumerate(added):
+            items.append(product)
+            for other in old:
+                rows += (product, other)
+                cols += (other, product)
+            for other in added[i + 1:]:
+                rows += (product, other)
+                cols += (other, product)
+    return rows, cols, items
+
+
+def run_once(full: bool = False) -> dict:
+    """Yangi buyurtmalarni matritsaga qo'shib, ta'sirlangan tavsiyalarni yangilaydi."""
+    db = SessionLocal()
+    try:
+        db.execute(insert_ignore(models.RecommendationState.__table__).values(id=_STATE_ID, last_order_id=0))
+        db.commit()
+        state = db.get(models.RecommendationState, _STATE_ID)
+        started_from, started_at = state.last_order_id, state.updated_at
+        if full or state.matrix is None:
+            since, matrix, tracked = 0, CooccurrenceMatrix.empty(), set()
+        else:
+            since, matrix = state.last_order_id, CooccurrenceMatrix.load(state.matrix)
+            tracked = _parse_ids(state.pending_order_ids)
+
+        # Kursordan past pending buyurtmalar: to'langanlari shu safar qo'shiladi.
+        # Holatlar purchases so'rovidan oldin o'qiladi — oradagi to'lov keyingi safarga qoladi.
+        late = _order_ids(db, PURCHASED_STATUSES, ids=tracked) if tracked else set()
+        pending = (_order_ids(db, (PENDING_STATUS,), ids=tracked) if tracked else set()) \
+            | _order_ids(db, (PENDING_STATUS,), after_id=since)
+
+        new, last_order_id, orders, seen = {}, since, 0, set()
+        where = (or_(models.OrderItem.order_id > since, models.OrderItem.order_id.in_(late)),) if late \
+            else (models.OrderItem.order_id > since,)
+        current = None
+        for order_id, user_id, product_id in _purchases(db, where):
+            new.setdefault(user_id, set()).add(product_id)
+            if order_id != current:
+                current = order_id
+                orders += 1
+                last_order_id = max(last_order_id, order_id)
+                if order_id in pending:
+                    seen.add(order_id)
+        # Yangi kursordan past qolgan (hali to'lanmagan) buyurtmalar eslab qolinadi
+        pending_order_ids = ",".join(str(i) for i in sorted(i for i in pending - seen if i <= last_order_id))
+        if not orders and not full:
+            return {"orders": 0, "updated_products": 0, "pairs": matrix.nnz}
+
+        history = _history(db, sorted(new), since, exclude=late) if since else {}
+        rows, cols, items = _new_pairs(history, new)
+        matrix.add(rows, cols, items)
+
+        affected = matrix.item_ids if full else matrix.neighbours(set(items))
+        top = matrix.top_k(affected, RECOMMENDATIONS_TOP_K)
+
+        table = models.ProductRecommendation
+        if full:
+            db.execute(delete(table))
+        else:
+            for i in range(0, len(affected), RECOMMENDATIONS_CHUNK_SIZE):
+                chunk = [int(pid) for pid in affected[i:i + RECOMMENDATIONS_CHUNK_SIZE]]
+                db.execute(delete(table).where(table.product_id.in_(chunk)))
+        now = datetime.utcnow()
+        if top:
+            db.execute(insert(table), [
+                {"product_id": pid, "product_ids": ids.tobytes(), "scores": scores.tobytes(), "updated_at": now}
+                for pid, (ids, scores) in top.items()
+            ])
+
+        # Boshqa worker bizdan oldin ishlagan bo'lsa — natijamiz eskirgan, bekor qilamiz
+        saved = db.execute(
+            update(models.RecommendationState)
+            .where(models.RecommendationState.id == _STATE_ID,
+                   models.RecommendationState.last_order_id == started_from,
+                   models.RecommendationState.updated_at == started_at)
+            .values(last_order_id=last_order_id, matrix=matrix.dump(),
+                    pending_order_ids=pending_order_ids or None, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not saved:
+            db.rollback()
+            return {"orders": 0, "updated_products": 0, "pairs": matrix.nnz, "skipped": True}
+        cache.bump(db, cache.RECOMMENDATIONS)
+        db.commit()
+        return {"orders": orders, "updated_products": len(top), "pairs": matrix.nnz}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_job(full: bool = False) -> dict:
+    """run_once ni chaqiradi va ko'rsatkichlarni yangilaydi."""
+    started = time.perf_counter()
+    stats["runs"] += 1
+    stats["last_run_at"] = datetime.utcnow().isoformat()
+    try:
+        result = run_once(full)
+        stats["last_orders"] = result["orders"]
+        stats["last_updated_products"] = result["updated_products"]
+        stats["pairs"] = result["pairs"]
+        stats["last_error"] = None
+        return result
+    except Exception as e:
+        stats["last_error"] = str(e)
+        logger.exception("Tavsiyalar job'i xatosi")
+        return {"orders": 0, "updated_products": 0, "pairs": stats["pairs"]}
+    finally:
+        stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def claim_run() -> bool:
+    """Navbatdagi ishga tushishni egallaydi: next_run_at o'tgan bo'lsa uni interval'ga suradi (bitta worker yutadi)."""
+    db = SessionLocal()
+    try:
+        db.execute(insert_ignore(models.RecommendationState.__table__).values(id=_STATE_ID, last_order_id=0))
+        now = datetime.utcnow()
+        state = models.RecommendationState
+        claimed = db.execute(
+            update(state)
+            .where(state.id == _STATE_ID, or_(state.next_run_at.is_(None), state.next_run_at <= now))
+            .values(next_run_at=now + timedelta(seconds=RECOMMENDATIONS_INTERVAL_SECONDS))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return bool(claimed)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def _job_loop():
+    while True:
+        await asyncio.sleep(min(RECOMMENDATIONS_INTERVAL_SECONDS, _CLAIM_POLL_SECONDS))
+        try:
+            claimed = await asyncio.to_thread(claim_run)
+        except Exception as e:
+            stats["last_error"] = str(e)
+            logger.warning("Tavsiyalar job'ini egallab bo'lmadi: %s", e)
+            continue
+        if not claimed:
+            stats["skipped_claims"] += 1
+            continue
+        await asyncio.to_thread(run_job)
+
+
+def start():
+    """Fon vazifasini ishga tushiradi (startup event ichidan chaqiriladi)."""
+    global _task
+    if not RECOMMENDATIONS_ENABLED or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_job_loop())
+
+
+async def stop():
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "enabled": RECOMMENDATIONS_ENABLED,
+        "interval_seconds": RECOMMENDATIONS_INTERVAL_SECONDS,
+        "top_k": RECOMMENDATIONS_TOP_K,
+    }
+
+
+# ── O'qish (API) ────────────────────────────────────────────────────────────
+
+def _load(db: Session, product_id: int):
+    """VersionedCache loader: [(product_id, score), ...]. Tavsiya bo'lmasa bo'sh ro'yxat."""
+    row = db.get(models.ProductRecommendation, product_id)
+    if row is None:
+        return []
+    ids, scores = array.array("i"), array.array("f")
+    ids.frombytes(row.product_ids)
+    scores.frombytes(row.scores)
+    return [(str(pid), round(score, 4)) for pid, score in zip(ids, scores)]
+
+
+recommendations_cache = cache.VersionedCache(cache.RECOMMENDATIONS, _load)
+
+
+if __name__ == "__main__":
+    result = run_job(full="--full" in sys.argv)
+    print(
+        f"Buyurtmalar: {result['orders']}, yangilangan mahsulotlar: {result['updated_products']}, "
+        f"juftliklar: {result['pairs']}"
+    )
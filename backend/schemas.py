@@ -12,7 +12,8 @@ class ProductBase(BaseModel):
     features: List[str] = []
 
 class ProductCreate(ProductBase):
-    pass
+    # Faqat admin ko'radi/yozadi; ommaviy javoblarga (catalog) kirmaydi
+    download_file: Optional[str] = None
 
 class Product(ProductBase):
     id: int
@@ -0,0 +1,76 @@
+"""
+Bo'sh bazaga namunaviy (mock) mahsulotlarni joylashtirish.
+
+Ishlatish:
+    python seed.py
+
+Avval bu ish har bir worker startup'ida bajarilardi (Product.count() + seed);
+endi faqat kerak bo'lganda qo'lda ishga tushiriladi.
+"""
+import models
+from database import SessionLocal
+
+
+def seed_products(db) -> int:
+    """Bazada mahsulot bo'lmasa, namunaviy mahsulotlarni qo'shadi. Qo'shilganlar sonini qaytaradi."""
+    # Bazada biron mahsulot bormi?
+    if db.query(models.Product).first() is not None:
+        return 0
+
+    mock_products = [
+        models.Product(
+            id=1,
+            title="Next.js SaaS Loyiha",
+            description="To'liq tayyor, avtorizatsiya va to'lov tizimiga ega mukammal SaaS platformasi. Loyihani boshlash uchun eng zo'r yechim.",
+            price="$49",
+            image="https://images.unsplash.com/photo-1555066931-4365d14bab8c?q=80&w=1000&auto=format&fit=crop",
+            category="Web Dasturlash",
+            techStack="Next.js,React,Tailwind,Stripe",
+            features="Foydalanuvchilarni autentifikatsiya qilish (Auth.js),Stripe orqali to'lovlar qabul qilish,Ma'lumotlar bazasi integratsiyasi (Prisma & PostgreSQL),To'liq moslashuvchan (Responsive) dizayn,SEO optimizatsiya qilingan"
+        ),
+        models.Product(
+            id=2,
+            title="Fintech Mobil UI Shablon",
+            description="Zamonaviy moliya va bank ilovalari uchun maxsus yaratilgan yuqori sifatli mobil interfeys dizayni va React Native kodlari.",
+            price="$29",
+            image="https://images.unsplash.com/photo-1563986768609-322da13575f3?q=80&w=1000&auto=format&fit=crop",
+            category="Mobil Dasturlash",
+            techStack="Figma,React Native,UI/UX,Expo",
+            features="50 dan ortiq tayyor ekranlar,Qorong'u va yorug' rejim (Dark/Light mode),To'liq Figma komponentlar kutubxonasi,React Native & Expo da oson ishga tushirish,Silliq animatsiyalar"
+        ),
+        models.Product(
+            id=3,
+            title="AI Dashboard Shablon",
+            description="Sun'iy intellekt tahlillari va ma'lumotlar boshqaruvi uchun keng qamrovli, chiroyli va qulay boshqaruv paneli.",
+            price="$39",
+            image="https://images.unsplash.com/photo-1551288049-bebda4e38f71?q=80&w=1000&auto=format&fit=crop",
+            category="Boshqaruv Paneli",
+            techStack="Vue 3,Nuxt,TypeScript,Tailwind",
+            features="Interaktiv grafiklar va chartlar (Chart.js),AI modellarini boshqarish paneli,Kengaytirilgan filtrlash va qidiruv tizimi,Zamonaviy tekis (flat) va neonglass dizayn,Davlat menejmenti (Pinia)"
+        ),
+        models.Product(
+            id=4,
+            title="E-Commerce Backend API",
+            description="Katta yuklamalarga chidamli, tezkor va xavfsiz elektron tijorat tizimlari uchun tayyor RESTful API yadrosi.",
+            price="$59",
+            image="https://images.unsplash.com/photo-1627398225052-24c8c7d81a4b?q=80&w=1000&auto=format&fit=crop",
+            category="Backend",
+            techStack="Node.js,Express,MongoDB,Redis",
+            features="Kesh xotiradan foydalanish (Redis va xotirani optimallashtirish),JWT tabarrik (token) va xavfsizlik (Helmet, Rate Limit),Buyurtmalar tarixi va to'lov holatini kuzatish,Mahsulotlar ko'chirmasi va qidiruv funktsiyalari (Elasticsearch hook),Docker tayyor"
+        )
+    ]
+    db.add_all(mock_products)
+    db.commit()
+    return len(mock_products)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        added = seed_products(db)
+    finally:
+        db.close()
+    if added:
+        print(f"✅ {added} ta namunaviy mahsulot qo'shildi")
+    else:
+        print("ℹ️  Bazada mahsulotlar bor — seed kerak emas")
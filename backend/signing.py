@@ -0,0 +1,47 @@
+"""
+HMAC-SHA256 bilan imzolangan, muddati cheklangan tokenlar (bazasiz tekshiriladi).
+
+Ko'rinishi: base64url(JSON).base64url(imzo); JSON ichida "e" — tugash vaqti
+(unix soniyalarda). Har bir maqsad o'z kalitiga ega bo'lishi kerak (yuklab
+olish havolalari, SSE ticket'lari) — bir maqsad uchun berilgan token boshqasida
+yaroqsiz bo'ladi.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(key: bytes, payload: str) -> str:
+    return _b64encode(hmac.new(key, payload.encode(), hashlib.sha256).digest())
+
+
+def dumps(key: bytes, data: dict, ttl: int):
+    """(token, tugash vaqti unix soniyalarda)."""
+    expires = int(time.time()) + ttl
+    payload = _b64encode(json.dumps({**data, "e": expires}, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(key, payload)}", expires
+
+
+def loads(key: bytes, token: str):
+    """Token ichidagi ma'lumot yoki None (imzo noto'g'ri / muddati o'tgan)."""
+    payload, _, signature = (token or "").partition(".")
+    # bytes solishtiriladi: compare_digest ASCII bo'lmagan str'da TypeError beradi
+    if not payload or not hmac.compare_digest(signature.encode(), _sign(key, payload).encode()):
+        return None
+    try:
+        data = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("e", 0) < time.time():
+        return None
+    return data
@@ -0,0 +1,151 @@
+"""
+SQL profiler: har bir so'rov (request) davomida bajarilgan SQL'larni sanaydi.
+
+- Bir xil "shakl"dagi SQL (IN ro'yxatlari normallashtirilgan) bitta so'rov
+  ichida N_PLUS_ONE_THRESHOLD martadan ko'p bajarilsa — N+1 nomzodi sifatida
+  log'ga yoziladi.
+- SLOW_QUERY_MS dan uzoq davom etgan SQL endpoint nomi bilan log'ga yoziladi.
+- SQL_DEBUG_HEADERS=1 bo'lsa javobga X-DB-Queries va X-DB-Time qo'shiladi.
+- Endpoint'lar `@query_budget(n)` bilan SQL limitini e'lon qiladi. Limitdan
+  oshsa ogohlantirish yoziladi; QUERY_BUDGET_STRICT=1 (test/CI rejimi) bo'lsa
+  javob 500 bilan almashtiriladi — regressiya darhol ko'rinadi.
+
+Hisoblash metrics.py dagi so'rov obyektiga (RequestStats) yoziladi, shuning
+uchun middleware MetricsMiddleware ichida (undan keyin) turishi kerak.
+"""
+import json
+import logging
+import os
+import re
+
+import metrics
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "0") == "1"
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"
+
+logger = logging.getLogger("layzzbe.sql")
+
+_IN_LIST = re.compile(r"\bIN \([^()]*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# Ko'rsatkichlar (/metrics orqali ko'rinadi)
+stats = {
+    "slow_queries": 0,
+    "n_plus_one": 0,
+    "budget_exceeded": 0,
+}
+
+
+def statement_shape(statement: str) -> str:
+    """SQL'ni "shakl"ga keltiradi: IN (?, ?, ?) -> IN (...), bo'sh joylar bitta."""
+    if " IN (" in statement or " in (" in statement:
+        statement = _IN_LIST.sub("IN (...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def query_budget(limit: int):
+    """Endpoint uchun so'rov (request) boshiga SQL limiti. @app.get(...) dan pastda yoziladi."""
+    def decorator(func):
+        func.__query_budget__ = limit
+        return func
+    return decorator
+
+
+# ── SQLAlchemy hook (metrics.statement_hooks) ────────────────────────────────
+
+def _on_statement(request_stats, statement, started, elapsed):
+    shape = None
+    if request_stats is not None:
+        shape = statement_shape(statement)
+        shapes = request_stats.shapes
+        if shapes is None:
+            shapes = request_stats.shapes = {}
+        shapes[shape] = shapes.get(shape, 0) + 1
+
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        stats["slow_queries"] += 1
+        endpoint = request_stats.endpoint if request_stats is not None else "-"
+        logger.warning(
+            "Sekin SQL: %.1f ms [%s] %s",
+            elapsed_ms, endpoint, (shape or statement_shape(statement))[:1000],
+        )
+
+
+metrics.statement_hooks.append(_on_statement)
+
+
+def _report_n_plus_one(request_stats) -> None:
+    for shape, count in (request_stats.shapes or {}).items():
+        if count >= N_PLUS_ONE_THRESHOLD:
+            stats["n_plus_one"] += 1
+            logger.warning(
+                "N+1 nomzodi: [%s] bitta so'rovda %d marta: %s",
+                request_stats.endpoint, count, shape[:1000],
+            )
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+
+class SQLProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        request_stats = metrics.current_request.get()
+        if scope["type"] != "http" or request_stats is None:
+            await self.app(scope, receive, send)
+            return
+
+        replaced = False
+
+        async def send_wrapper(message):
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+                if budget is not None and request_stats.db_queries > budget:
+                    stats["budget_exceeded"] += 1
+                    logger.warning(
+                        "Query budget oshdi: [%s] %d ta SQL (limit %d)",
+                        request_stats.endpoint, request_stats.db_queries, budget,
+                    )
+                    if QUERY_BUDGET_STRICT:
+                        replaced = True
+                        body = json.dumps({
+                            "detail": f"Query budget oshdi: {request_stats.db_queries} ta SQL (limit {budget})",
+                        }).encode()
+                        await send({
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [
+                                (b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                            ],
+                        })
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                if SQL_DEBUG_HEADERS:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(request_stats.db_queries).encode()),
+                        (b"x-db-time", f"{request_stats.db_time * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _report_n_plus_one(request_stats)
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "slow_query_ms": SLOW_QUERY_MS,
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "strict_budgets": QUERY_BUDGET_STRICT,
+    }
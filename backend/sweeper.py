@@ -0,0 +1,136 @@
+"""
+Eskirgan "pending" buyurtmalarni tozalovchi fon vazifasi (sweeper).
+
+generate_payment_link har bir checkout urinishida pending Order yaratadi.
+To'lov qilinmagan buyurtmalar shu yerda "expired" holatiga o'tkaziladi.
+
+Bir nechta worker bir vaqtda ishlatsa ham xavfsiz: UPDATE faqat
+status='pending' qatorlarga tegadi, shuning uchun bir qatorni ikki marta
+"expire" qilish mumkin emas — rowcount aniq natijani beradi.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+import dashboard
+import models
+from database import SessionLocal
+
+# Sozlamalar (.env orqali o'zgartirish mumkin)
+PENDING_ORDER_TTL_MINUTES = int(os.getenv("PENDING_ORDER_TTL_MINUTES", "60"))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("ORDER_SWEEP_INTERVAL_SECONDS", "300"))
+SWEEP_BATCH_SIZE = int(os.getenv("ORDER_SWEEP_BATCH_SIZE", "500"))
+# Bitta ishga tushishda nechta batch'gacha ishlov berish (DB ni band qilmaslik uchun)
+SWEEP_MAX_BATCHES = int(os.getenv("ORDER_SWEEP_MAX_BATCHES", "20"))
+SWEEPER_ENABLED = os.getenv("ORDER_SWEEPER_ENABLED", "1") != "0"
+
+# Ishlash ko'rsatkichlari (admin endpoint orqali ko'rinadi)
+stats = {
+    "runs": 0,
+    "expired_total": 0,
+    "last_expired": 0,
+    "last_run_at": None,
+    "last_duration_ms": None,
+    "last_error": None,
+}
+
+_task = None
+
+
+def sweep_once(batch_size: int = SWEEP_BATCH_SIZE, max_batches: int = SWEEP_MAX_BATCHES) -> int:
+    """Eskirgan pending buyurtmalarni batch'lab "expired" qiladi. Expire qilinganlar sonini qaytaradi."""
+    cutoff = datetime.utcnow() - timedelta(minutes=PENDING_ORDER_TTL_MINUTES)
+    expired = 0
+    db = SessionLocal()
+    try:
+        for _ in range(max_batches):
+            # (status, created_at) indeksi bo'yicha eng eski pending buyurtmalar
+            rows = db.execute(
+                select(models.Order.id, models.Order.user_id)
+                .where(models.Order.status == "pending", models.Order.created_at < cutoff)
+                .order_by(models.Order.created_at)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            ids = [order_id for order_id, _ in rows]
+
+            result = db.execute(
+                update(models.Order)
+                .where(models.Order.id.in_(ids), models.Order.status == "pending")
+                .values(status="expired")
+                .execution_options(synchronize_session=False)
+            )
+            # Buyurtma holati o'zgargan foydalanuvchilarning dashboard keshi
+            dashboard.bump_many(db, {user_id for _, user_id in rows})
+            db.commit()
+            expired += result.rowcount or 0
+
+            if len(ids) < batch_size:
+                break
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return expired
+
+
+def run_sweep() -> int:
+    """sweep_once ni chaqiradi va ko'rsatkichlarni yangilaydi."""
+    started = time.perf_counter()
+    stats["runs"] += 1
+    stats["last_run_at"] = datetime.utcnow().isoformat()
+    try:
+        expired = sweep_once()
+        stats["last_expired"] = expired
+        stats["expired_total"] += expired
+        stats["last_error"] = None
+        return expired
+    except Exception as e:
+        stats["last_error"] = str(e)
+        return 0
+    finally:
+        stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+async def _sweeper_loop():
+    while True:
+        # Birinchi tozalash startup'dan keyin emas, bir interval o'tib bajariladi (cold start tez bo'lsin)
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
+        # DB ishi event loop'ni bloklamasligi uchun alohida thread'da bajariladi
+        await asyncio.to_thread(run_sweep)
+
+
+def start():
+    """Fon vazifasini ishga tushiradi (startup event ichidan chaqiriladi)."""
+    global _task
+    if not SWEEPER_ENABLED or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_sweeper_loop())
+
+
+async def stop():
+    """Fon vazifasini to'xtatadi (shutdown event)."""
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "enabled": SWEEPER_ENABLED,
+        "ttl_minutes": PENDING_ORDER_TTL_MINUTES,
+        "interval_seconds": SWEEP_INTERVAL_SECONDS,
+        "batch_size": SWEEP_BATCH_SIZE,
+    }
@@ -0,0 +1,79 @@
+"""
+Test muhiti: vaqtinchalik SQLite baza, QUERY_BUDGET_STRICT=1 (limitdan oshgan
+so'rov 500 qaytaradi), fon vazifalari va rate limit o'chirilgan.
+
+Modullar sozlamalarni import paytida o'qiydi, shuning uchun muhit
+o'zgaruvchilari har qanday backend importidan oldin o'rnatiladi.
+
+Ishga tushirish (backend/ dan, pytest va httpx o'rnatilgan bo'lishi kerak):
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="layzzbe-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["QUERY_BUDGET_STRICT"] = "1"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["SHED_ENABLED"] = "0"
+os.environ["ORDER_SWEEPER_ENABLED"] = "0"
+os.environ["RECOMMENDATIONS_ENABLED"] = "0"
+os.environ["POPULARITY_ENABLED"] = "0"
+os.environ["WARMUP_DELAY_SECONDS"] = "3600"      # keshlar so'rovlar ichida sovuq holatdan to'ladi
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import itertools
+
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import migrations
+import models
+import seed
+from database import SessionLocal
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    migrations.run_migrations()
+    db = SessionLocal()
+    try:
+        seed.seed_products(db)
+        db.add(models.User(
+            email="admin@test", hashed_password=auth.get_password_hash("pw"),
+            is_admin=True, role="admin", balance=0.0,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def login(client, email: str, password: str = "pw") -> dict:
+    response = client.post("/api/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(client) -> dict:
+    return login(client, "admin@test")
+
+
+@pytest.fixture
+def new_user(client):
+    """Har chaqiruvda yangi foydalanuvchi (sovuq keshlar) — auth sarlavhalari."""
+    def create() -> dict:
+        email = f"user{next(_emails)}@test"
+        response = client.post("/api/auth/register", json={"email": email, "password": "pw"})
+        assert response.status_code == 200, response.text
+        return login(client, email)
+    return create
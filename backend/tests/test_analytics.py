@@ -0,0 +1,91 @@
+"""Sotuvlar rollup'lari: record_sales, report va backfill bir xil bucket'larni beradi."""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import analytics
+import models
+from database import SessionLocal
+
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    session.query(models.SalesRollup).delete()
+    session.commit()
+    yield session
+    session.rollback()
+    session.query(models.SalesRollup).delete()
+    session.commit()
+    session.close()
+
+
+def _rollups(db) -> dict:
+    return {
+        (row.period, row.bucket, row.product_id): (row.units, round(row.revenue_usd, 4), row.category)
+        for row in db.query(models.SalesRollup).all()
+    }
+
+
+def test_record_sales_buckets_by_the_given_time(db):
+    when = datetime(2024, 3, 14, 23, 30)          # payshanba
+    analytics.record_sales(db, [(1, "ui", 2, 5.0), (1, "ui", 1, 2.5), (None, None, 1, 1.0)], when)
+    analytics.record_sales(db, [(1, "ui", 1, 2.5)], when + timedelta(hours=1))
+    db.commit()
+
+    rollups = _rollups(db)
+    assert rollups[("day", date(2024, 3, 14), 1)] == (3, 7.5, "ui")
+    assert rollups[("day", date(2024, 3, 15), 1)] == (1, 2.5, "ui")
+    assert rollups[("week", date(2024, 3, 11), 1)] == (4, 10.0, "ui")
+    assert rollups[("month", date(2024, 3, 1), 1)] == (4, 10.0, "ui")
+    assert rollups[("day", date(2024, 3, 14), analytics.UNKNOWN_PRODUCT_ID)] == (1, 1.0, "")
+
+
+def test_report_groups_recent_buckets(db):
+    today = datetime.utcnow()
+    analytics.record_sales(db, [(1, "ui", 1, 10.0), (2, "icons", 3, 3.0)], today)
+    analytics.record_sales(db, [(1, "ui", 1, 10.0)], today - timedelta(days=1))
+    analytics.record_sales(db, [(2, "icons", 5, 50.0)], today - timedelta(days=10))  # oynadan tashqarida
+    analytics.record_sales(db, [(None, None, 1, 99.0)], today)
+    db.commit()
+
+    report = analytics.report(db, analytics.DAY, 2, {"1": {"title": "UI kit"}, "2": {"title": "Icons"}})
+    assert report["units"] == 6
+    assert report["revenue_usd"] == 122.0
+    assert [point["units"] for point in report["series"]] == [1, 5]
+    assert [item["product_id"] for item in report["top_sellers"]] == [1, 2]
+    assert report["top_sellers"][0] == {
+        "product_id": 1, "title": "UI kit", "category": "ui", "revenue_usd": 20.0, "units": 2,
+    }
+    assert {item["category"]: item["units"] for item in report["categories"]} == {"ui": 2, "icons": 3, "": 1}
+
+
+def test_backfill_matches_record_sales_for_late_paid_orders(db):
+    user = db.query(models.User).filter(models.User.email == "admin@test").one()
+    product = db.query(models.Product).order_by(models.Product.id).first()
+    created_at = datetime(2023, 1, 31, 22, 0)     # yaratilgan kun ≠ to'langan kun
+    order = models.Order(
+        user_id=user.id, product_title=product.title, amount_usd=4.0, status="paid", created_at=created_at,
+        items=[models.OrderItem(
+            product_id=product.id, user_id=user.id, product_title=product.title,
+            quantity=2, unit_price_usd=2.0, amount_usd=4.0, created_at=created_at,
+        )],
+    )
+    db.add(order)
+    analytics.record_sales(db, [(product.id, product.category, 2, 4.0)], order.created_at)
+    db.commit()
+    recorded = {key: value for key, value in _rollups(db).items() if key[2] == product.id}
+
+    try:
+        analytics.backfill()
+        db.expire_all()
+        backfilled = {key: value for key, value in _rollups(db).items() if key[2] == product.id}
+        assert recorded[("day", date(2023, 1, 31), product.id)] == (2, 4.0, product.category)
+        assert recorded[("month", date(2023, 1, 1), product.id)] == (2, 4.0, product.category)
+        # Boshqa testlarning buyurtmalari ham backfill'ga kiradi — shu buyurtma bucket'larini solishtiramiz
+        for key, value in recorded.items():
+            if key[1] <= date(2023, 1, 31):
+                assert backfilled[key] == value
+    finally:
+        db.delete(order)
+        db.commit()
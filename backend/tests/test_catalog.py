@@ -0,0 +1,82 @@
+"""Katalog snapshot'i: related ro'yxatlarini incremental qurish."""
+import random
+import time
+
+import pytest
+
+import catalog
+
+
+def _products(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    tech = [f"t{i}" for i in range(15)]
+    return [
+        {"id": str(i), "title": f"p{i}", "description": "", "price": "$1", "image": "",
+         "category": f"c{rnd.randrange(7)}", "techStack": rnd.sample(tech, 3), "features": []}
+        for i in range(1, n + 1)
+    ]
+
+
+def _build(products, base=None):
+    snapshot = catalog.CatalogSnapshot(products)
+    snapshot.build_related(base)
+    return snapshot
+
+
+@pytest.fixture(autouse=True)
+def small_limits(monkeypatch):
+    # Kam/keng teglar ikkalasi ham uchrashi uchun
+    monkeypatch.setattr(catalog, "RELATED_MAX_POSTING", 30)
+
+
+def test_field_edit_recomputes_nothing():
+    products = _products(400)
+    base = _build(products)
+    edited = [dict(p) for p in products]
+    edited[10] = {**edited[10], "title": "Yangi nom", "price": "$99"}
+    snapshot = _build(edited, base)
+    assert snapshot.recomputed == 0
+    assert snapshot.related == base.related
+    assert snapshot.detail(edited[10]["id"])["title"] == "Yangi nom"
+
+
+def test_incremental_matches_full_rebuild():
+    rnd = random.Random(7)
+    products = _products(400)
+    snapshot = _build(products)
+    next_id = len(products) + 1
+    for _ in range(60):
+        products = [dict(p) for p in products]
+        action = rnd.random()
+        if action < 0.3:
+            products.pop(rnd.randrange(len(products)))
+        elif action < 0.6:
+            products.append({**_products(1, seed=next_id)[0], "id": str(next_id)})
+            next_id += 1
+        else:
+            product = products[rnd.randrange(len(products))]
+            product["techStack"] = rnd.sample([f"t{i}" for i in range(15)] + ["rare"], rnd.randint(0, 3))
+            product["category"] = f"c{rnd.randrange(8)}"
+        snapshot = _build(products, snapshot)
+        assert snapshot.recomputed < len(products) / 2
+        assert snapshot.related == _build(products).related
+
+
+def test_large_catalog_builds_in_background(monkeypatch):
+    products = _products(300)
+    ready = _build(products)
+    monkeypatch.setattr(catalog, "_ready", ready)
+    products = [dict(p) for p in products[1:]]          # 1-mahsulot o'chirildi
+    snapshot = catalog.CatalogSnapshot(products)
+    # Fon thread'i tugaguncha oxirgi tayyor snapshot'ning related'i (o'chirilgansiz) beriladi
+    assert not snapshot.related_ready
+    assert "1" not in snapshot.related_ids("2")
+    assert snapshot.related_ids("2") == [pid for pid in ready.related["2"] if pid != "1"]
+    assert "1" not in [item["id"] for item in snapshot.detail("2")["related"]]
+
+    catalog._schedule(snapshot)
+    deadline = time.monotonic() + 10
+    while catalog._ready is not snapshot and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert snapshot.related_ready and catalog._ready is snapshot
+    assert snapshot.related == _build(products).related
@@ -0,0 +1,40 @@
+"""POST /api/admin/products/import — qatorlarni tekshirish."""
+import json
+
+CSV_HEADER = "id,title,description,price,image,category,techStack,features\n"
+
+
+def _import(client, admin, name: str, content: str) -> dict:
+    response = client.post(
+        "/api/admin/products/import",
+        files={"file": (name, content.encode(), "text/plain")},
+        headers=admin,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_csv_rows_without_title_or_price_are_rejected(client, admin):
+    result = _import(client, admin, "products.csv", CSV_HEADER + (
+        ",,bad,,,,,\n"
+        ",No price,desc,,img,cat,,\n"
+        ",   ,desc,$10,img,cat,,\n"
+        ",Valid,desc,$10,img,cat,\"React, Vite\",\n"
+    ))
+    assert result["inserted"] == 1
+    assert result["error_count"] == 3
+    errors = {error["line"]: error["error"] for error in result["errors"]}
+    assert set(errors) == {2, 3, 4}
+    assert "title" in errors[2] and "price" in errors[2]
+    assert "price" in errors[3] and "title" not in errors[3]
+    assert "title" in errors[4]
+
+
+def test_jsonl_rows_without_title_or_price_are_rejected(client, admin):
+    rows = [
+        {"title": "", "description": "d", "price": "$5", "image": "i", "category": "c"},
+        {"title": "Valid JSONL", "description": "d", "price": "$5", "image": "i", "category": "c"},
+    ]
+    result = _import(client, admin, "products.jsonl", "".join(json.dumps(row) + "\n" for row in rows))
+    assert result["inserted"] == 1
+    assert [error["line"] for error in result["errors"]] == [1]
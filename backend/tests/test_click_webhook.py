@@ -0,0 +1,89 @@
+"""Click Complete: faqat pending → paid o'tishi sanaladi (takroriy/eskirgan callback'lar emas)."""
+from datetime import datetime
+
+import analytics
+import models
+from database import SessionLocal
+
+
+def _order(status: str = "pending") -> tuple:
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == "admin@test").one()
+        product = db.query(models.Product).order_by(models.Product.id).first()
+        order = models.Order(
+            user_id=user.id, product_title=product.title, amount_usd=2.5, status=status,
+            created_at=datetime.utcnow(),
+        )
+        order.items = [models.OrderItem(
+            product_id=product.id, user_id=user.id, product_title=product.title,
+            quantity=1, unit_price_usd=2.5, amount_usd=2.5,
+        )]
+        db.add(order)
+        db.commit()
+        return order.id, product.id
+    finally:
+        db.close()
+
+
+def _complete(client, order_id: int, error: int = 0) -> dict:
+    response = client.post("/api/payments/click/webhook", data={
+        "click_trans_id": 1, "service_id": 1, "click_paydoc_id": 1,
+        "merchant_trans_id": str(order_id), "amount": 32000, "action": 1,
+        "error": error, "error_note": "-", "sign_time": "-", "sign_string": "-",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _units(product_id: int) -> int:
+    db = SessionLocal()
+    try:
+        row = db.query(models.SalesRollup).filter(
+            models.SalesRollup.period == analytics.DAY,
+            models.SalesRollup.product_id == product_id,
+        ).first()
+        return row.units if row else 0
+    finally:
+        db.close()
+
+
+def _status(order_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.get(models.Order, order_id).status
+    finally:
+        db.close()
+
+
+def test_repeated_complete_counts_the_sale_once(client):
+    order_id, product_id = _order()
+    before = _units(product_id)
+
+    assert _complete(client, order_id)["error"] == 0
+    assert _complete(client, order_id)["error"] == -4
+    assert _status(order_id) == "paid"
+    assert _units(product_id) == before + 1
+
+
+def test_complete_does_not_pay_expired_or_cancelled_orders(client):
+    for status in ("expired", "cancelled"):
+        order_id, product_id = _order(status)
+        before = _units(product_id)
+
+        assert _complete(client, order_id)["error"] == -9
+        assert _status(order_id) == status
+        assert _units(product_id) == before
+
+
+def test_click_error_cancels_only_pending_orders(client):
+    order_id, _ = _order()
+    assert _complete(client, order_id, error=-5017)["error"] == 0
+    assert _status(order_id) == "cancelled"
+
+    paid_id, product_id = _order()
+    assert _complete(client, paid_id)["error"] == 0
+    before = _units(product_id)
+    assert _complete(client, paid_id, error=-5017)["error"] == -4
+    assert _status(paid_id) == "paid"
+    assert _units(product_id) == before
@@ -0,0 +1,95 @@
+"""Yuklab olish havolalari: kalitsiz o'chirilgan; egalik, imzo, muddat, Range va katalogdan chiqish."""
+import pytest
+
+import downloads
+import models
+from database import SessionLocal
+
+CONTENT = bytes(range(256)) * 4
+
+
+def test_downloads_are_disabled_without_a_signing_key(client, new_user):
+    assert not downloads.ENABLED
+    assert client.post("/api/downloads/1/link", headers=new_user()).status_code == 503
+    assert client.get(downloads.FILE_PATH, params={"token": "x.y"}).status_code == 503
+    with pytest.raises(RuntimeError):
+        downloads.make_token(1, 1, "kits/ui.zip")
+
+
+@pytest.fixture
+def archive(client, monkeypatch, tmp_path):
+    """Yoqilgan yuklab olish: vaqtinchalik DOWNLOADS_DIR va fayli bor mahsulot. (product_id, fayl)"""
+    monkeypatch.setattr(downloads, "_SIGNING_KEY", b"d" * downloads.MIN_SIGNING_KEY_LENGTH)
+    monkeypatch.setattr(downloads, "ENABLED", True)
+    monkeypatch.setattr(downloads, "DOWNLOADS_DIR", str(tmp_path / "downloads"))
+    (tmp_path / "downloads" / "kits").mkdir(parents=True)
+    (tmp_path / "downloads" / "kits" / "ui.zip").write_bytes(CONTENT)
+    (tmp_path / "secret.txt").write_text("secret")
+
+    db = SessionLocal()
+    try:
+        product = db.query(models.Product).order_by(models.Product.id).first()
+        previous, product.download_file = product.download_file, "kits/ui.zip"
+        db.commit()
+        yield product.id, "kits/ui.zip"
+        product.download_file = previous
+        db.commit()
+    finally:
+        db.close()
+
+
+def _buy(client, headers: dict, product_id: int) -> None:
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    db = SessionLocal()
+    try:
+        db.add(models.Order(
+            user_id=user_id, product_title="kit", amount_usd=1.0, status="paid",
+            items=[models.OrderItem(product_id=product_id, user_id=user_id, quantity=1, amount_usd=1.0)],
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_link_requires_a_purchase_and_serves_ranges(client, new_user, archive):
+    product_id, _ = archive
+    user = new_user()
+    assert client.post(f"/api/downloads/{product_id}/link", headers=user).status_code == 403
+
+    _buy(client, user, product_id)
+    response = client.post(f"/api/downloads/{product_id}/link", headers=user)
+    assert response.status_code == 200, response.text
+    link = response.json()
+    assert link["filename"] == "ui.zip" and link["url"].startswith(downloads.FILE_PATH)
+
+    full = client.get(link["url"])
+    assert full.status_code == 200 and full.content == CONTENT
+
+    partial = client.get(link["url"], headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert partial.content == CONTENT[10:20]
+
+
+def test_tampered_and_expired_tokens_are_rejected(client, archive):
+    product_id, file = archive
+    token, _ = downloads.make_token(1, product_id, file)
+    payload, signature = token.split(".")
+    forged, _ = downloads.make_token(1, product_id, "kits/other.zip")
+
+    flipped = ("B" if signature[0] == "A" else "A") + signature[1:]
+    for bad in (f"{payload}.{flipped}", f"{forged.split('.')[0]}.{signature}", "é.é", ""):
+        assert client.get(downloads.FILE_PATH, params={"token": bad}).status_code == 403
+    expired, _ = downloads.make_token(1, product_id, file, ttl=-1)
+    assert client.get(downloads.FILE_PATH, params={"token": expired}).status_code == 403
+    assert client.get(downloads.FILE_PATH, params={"token": token}).status_code == 200
+
+
+def test_paths_outside_the_downloads_dir_are_rejected(client, archive, tmp_path):
+    (tmp_path / "downloads" / "escape.txt").symlink_to(tmp_path / "secret.txt")
+    assert downloads.resolve("kits/ui.zip") is not None
+    for path in ("../secret.txt", "kits/../../secret.txt", str(tmp_path / "secret.txt"), "escape.txt",
+                 "kits", "missing.zip"):
+        assert downloads.resolve(path) is None, path
+        token, _ = downloads.make_token(1, archive[0], path)
+        assert client.get(downloads.FILE_PATH, params={"token": token}).status_code == 404
@@ -0,0 +1,26 @@
+"""SSE ticket'lari: JWT URL'da qabul qilinmaydi, ticket bitta oqimga bog'langan."""
+import main
+from events import verify_ticket
+
+
+def test_stream_ticket_is_scoped_and_replaces_the_jwt_in_the_url(client, admin, new_user):
+    user = new_user()
+    jwt_token = user["Authorization"].removeprefix("Bearer ")
+    assert client.get("/api/events/me", params={"token": jwt_token}).status_code == 401
+
+    assert client.post("/api/events/ticket", params={"scope": "admin"}, headers=user).status_code == 403
+    assert client.post("/api/events/ticket", params={"scope": "other"}, headers=user).status_code == 400
+    response = client.post("/api/events/ticket", params={"scope": "me"}, headers=user)
+    assert response.status_code == 200, response.text
+    ticket = response.json()["ticket"]
+
+    email = verify_ticket(ticket, "me")
+    assert email and email.endswith("@test")
+    assert verify_ticket(ticket, "admin") is None
+    assert verify_ticket(ticket[:-2] + "xx", "me") is None
+    assert main._stream_principal("", ticket, "me")["email"] == email
+    # Ticket API uchun token sifatida yaroqsiz
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+
+    admin_ticket = client.post("/api/events/ticket", params={"scope": "admin"}, headers=admin).json()["ticket"]
+    assert main._stream_principal("", admin_ticket, "admin")["is_admin"]
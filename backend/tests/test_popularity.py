@@ -0,0 +1,98 @@
+"""Ko'rishlar (write-behind): flush xatosida sonlar qaytadi, o'chirilgan id'lar yozilmaydi, sort=popular."""
+import pytest
+
+import cache
+import models
+import popularity
+from database import SessionLocal
+
+
+@pytest.fixture
+def stats_table(client):
+    """Bo'sh product_stats va hisoblagich; test oxirida ham tozalanadi."""
+    def reset():
+        popularity.views.drain()
+        db = SessionLocal()
+        try:
+            db.query(models.ProductStats).delete()
+            cache.bump(db, cache.POPULARITY)
+            db.commit()
+        finally:
+            db.close()
+
+    reset()
+    yield
+    reset()
+
+
+def _views() -> dict:
+    db = SessionLocal()
+    try:
+        return {row.product_id: row.views for row in db.query(models.ProductStats).all()}
+    finally:
+        db.close()
+
+
+def _product_ids(count: int) -> list:
+    db = SessionLocal()
+    try:
+        return [row.id for row in db.query(models.Product.id).order_by(models.Product.id).limit(count)]
+    finally:
+        db.close()
+
+
+def test_sharded_counter_drains_and_merges():
+    counter = popularity.ShardedCounter(4)
+    for key in (1, 2, 2, 3, 3, 3):
+        counter.add(key)
+    assert counter.pending() == 6
+    assert counter.drain() == {1: 1, 2: 2, 3: 3}
+    assert counter.pending() == 0 and counter.drain() == {}
+    counter.merge({1: 4})
+    counter.add(1)
+    assert counter.drain() == {1: 5}
+
+
+def test_failed_flush_puts_the_counts_back(stats_table, monkeypatch):
+    first, second = _product_ids(2)
+    for product_id in (first, second, second):
+        popularity.record_view(product_id)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(cache, "upsert_add", fail)
+    with pytest.raises(RuntimeError):
+        popularity.flush()
+    assert popularity.stats["last_error"] == "db down"
+    popularity.record_view(first)          # xatodan keyingi ko'rish ham yo'qolmaydi
+    assert popularity.views.pending() == 4
+    assert _views() == {}
+
+    monkeypatch.undo()
+    assert popularity.flush() == 4
+    assert _views() == {first: 2, second: 2}
+    assert popularity.views.pending() == 0 and popularity.stats["last_error"] is None
+
+
+def test_deleted_product_ids_are_not_written(stats_table):
+    (product_id,) = _product_ids(1)
+    popularity.record_view(product_id)
+    popularity.record_view(10 ** 9)
+    assert popularity.flush() == 1
+    assert _views() == {product_id: 1}
+    assert popularity.views.pending() == 0    # qayta urinilmaydi
+
+
+def test_popular_sort_follows_flushed_views(client, stats_table):
+    first, second, third = _product_ids(3)
+    for product_id, count in ((first, 1), (second, 3), (third, 2)):
+        for _ in range(count):
+            assert client.post(f"/api/products/{product_id}/view").status_code == 204
+    assert client.post(f"/api/products/{10 ** 9}/view").status_code == 404
+
+    before = client.get("/api/products", params={"sort": "popular"})
+    popularity.flush()
+    response = client.get("/api/products", params={"sort": "popular"}, headers={"If-None-Match": before.headers["etag"]})
+    assert response.status_code == 200
+    assert [product["id"] for product in response.json()[:3]] == [str(second), str(third), str(first)]
@@ -0,0 +1,58 @@
+"""X-Profile sampler: faqat profil so'ragan so'rov thread'i, dekoratorsiz endpoint stekidan."""
+import contextlib
+import threading
+import time
+
+import profiler
+
+
+class _decorator(contextlib.ContextDecorator):
+    """serialized_writes kabi: hamma endpoint'lar uchun umumiy `inner` kodi."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _busy(stop: threading.Event, label: str) -> None:
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+@_decorator()
+def endpoint(stop: threading.Event, label: str) -> str:
+    _busy(stop, label)
+    return label
+
+
+def test_sampler_follows_only_the_profiled_request(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_SAMPLE_INTERVAL_MS", 1.0)
+    wrapped = profiler._instrument(endpoint)
+    session = profiler.ProfileSession({})
+    stop = threading.Event()
+
+    def request(profiled: bool) -> None:
+        token = profiler._active.set(session if profiled else None)
+        try:
+            wrapped(stop, "profiled" if profiled else "other")
+        finally:
+            profiler._active.reset(token)
+
+    other = threading.Thread(target=request, args=(False,))
+    other.start()
+    session.start(wrapped)
+    profiled = threading.Thread(target=request, args=(True,))
+    profiled.start()
+    time.sleep(0.2)
+    stop.set()
+    other.join()
+    profiled.join()
+    session.stop()
+
+    assert session.sample_count > 0
+    for stack in session.samples:
+        assert stack.startswith("endpoint (test_profiler.py:"), stack
+        assert "inner" not in stack and "_busy" in stack
+    assert session._thread_id is None
@@ -0,0 +1,116 @@
+"""
+Har bir `@query_budget` endpoint'i QUERY_BUDGET_STRICT=1 rejimida: sovuq
+(yangi foydalanuvchi, bo'sh keshlar) va iliq holatda limitdan oshmasligi kerak.
+Strict rejimda oshgan so'rov 500 qaytaradi, shuning uchun status tekshiruvi yetarli.
+"""
+import pytest
+
+import main
+
+PRODUCT_ID = 1
+
+
+def _ok(response, *statuses):
+    assert response.status_code in (statuses or (200,)), response.text
+
+
+def products_list(client, admin, new_user):
+    for _ in range(2):
+        response = client.get("/api/products")
+        _ok(response)
+        _ok(client.get("/api/products", headers={"If-None-Match": response.headers["etag"]}), 304)
+        _ok(client.get("/api/products?sort=popular"))
+
+
+def product_detail(client, admin, new_user):
+    for _ in range(2):
+        _ok(client.get(f"/api/products/{PRODUCT_ID}"))
+
+
+def product_view(client, admin, new_user):
+    for _ in range(2):
+        _ok(client.post(f"/api/products/{PRODUCT_ID}/view"), 204)
+    _ok(client.post("/api/products/999999/view"), 404)
+
+
+def product_recommendations(client, admin, new_user):
+    for _ in range(2):
+        _ok(client.get(f"/api/products/{PRODUCT_ID}/recommendations"))
+
+
+def cart(client, admin, new_user):
+    user = new_user()
+    _ok(client.get("/api/cart", headers=user))
+    for product_id in (1, 2, 3):
+        _ok(client.post("/api/cart", json={"product_id": product_id}, headers=user))
+    _ok(client.get("/api/cart", headers=user))
+
+
+def wishlist(client, admin, new_user):
+    user = new_user()
+    _ok(client.get("/api/wishlist", headers=user))
+    for product_id in (1, 2, 3):
+        _ok(client.post(f"/api/wishlist/{product_id}", headers=user))
+    _ok(client.get("/api/wishlist", headers=user))
+
+
+def users(client, admin, new_user):
+    new_user()
+    for _ in range(2):
+        _ok(client.get("/api/users", headers=admin))
+
+
+def dashboard(client, admin, new_user):
+    user = new_user()
+    for _ in range(2):
+        _ok(client.get("/api/dashboard", headers=user))
+    _ok(client.post("/api/cart", json={"product_id": 1}, headers=user))
+    _ok(client.get("/api/dashboard", headers=user))
+
+
+def wallet_checkout(client, admin, new_user):
+    user = new_user()
+    _ok(client.post("/api/balance/topup", json={"amount_uzs": 10_000_000}, headers=user))
+    cart_items = [{"product_id": 1, "quantity": 1}, {"product_id": 2, "quantity": 2}]
+    for _ in range(2):      # birinchi xarid (sovuq) va keyingisi
+        _ok(client.post("/api/orders/process-wallet-payment", json={"cart_items": cart_items}, headers=user))
+
+
+def admin_settings(client, admin, new_user):
+    _ok(client.post("/api/admin/settings", json={"site_name": "Layzzbe", "new_key": "1"}, headers=admin))
+    _ok(client.post("/api/admin/settings", json={"site_name": "Layzzbe Market"}, headers=admin))
+
+
+def public_settings(client, admin, new_user):
+    for _ in range(2):
+        _ok(client.get("/api/settings/public"))
+
+
+SCENARIOS = {
+    ("GET", "/api/products"): products_list,
+    ("GET", "/api/products/{product_id}"): product_detail,
+    ("POST", "/api/products/{product_id}/view"): product_view,
+    ("GET", "/api/products/{product_id}/recommendations"): product_recommendations,
+    ("GET", "/api/cart"): cart,
+    ("GET", "/api/wishlist"): wishlist,
+    ("GET", "/api/users"): users,
+    ("GET", "/api/dashboard"): dashboard,
+    ("POST", "/api/orders/process-wallet-payment"): wallet_checkout,
+    ("POST", "/api/admin/settings"): admin_settings,
+    ("GET", "/api/settings/public"): public_settings,
+}
+
+
+def test_every_budgeted_route_has_a_scenario():
+    budgeted = {
+        (method, route.path)
+        for route in main.app.routes
+        if hasattr(getattr(route, "endpoint", None), "__query_budget__")
+        for method in route.methods
+    }
+    assert budgeted == set(SCENARIOS)
+
+
+@pytest.mark.parametrize("route", sorted(SCENARIOS), ids=lambda route: f"{route[0]} {route[1]}")
+def test_query_budget(route, client, admin, new_user):
+    SCENARIOS[route](client, admin, new_user)
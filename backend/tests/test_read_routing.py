@@ -0,0 +1,48 @@
+"""Read-your-writes: pin read_pins orqali boshqa worker'larga ham ko'rinadi."""
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+import database
+import models
+from database import ReadSessionLocal, SessionLocal
+
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    replica_engine = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(database, "read_engine", replica_engine)
+    monkeypatch.setattr(database, "_pinned_until", {})
+    yield replica_engine
+    replica_engine.dispose()
+
+
+def _read_bind(user_id):
+    db = ReadSessionLocal()
+    db.info["request"] = SimpleNamespace(state=SimpleNamespace(user_id=user_id))
+    try:
+        return db.get_bind()
+    finally:
+        db.close()
+
+
+def test_write_pins_reads_to_primary_on_every_worker(replica):
+    user_id = 424242
+    assert _read_bind(user_id) is replica
+
+    db = SessionLocal()
+    try:
+        db.info["user_id"] = user_id
+        db.add(models.CacheVersion(name=f"test-pin:{user_id}", version=0))
+        db.commit()
+        assert db.get(models.ReadPin, user_id).pinned_until > 0
+    finally:
+        db.close()
+    assert _read_bind(user_id) is database.engine
+
+    # Boshqa worker: xotiradagi pin yo'q — read_pins'dan o'qiladi
+    database._pinned_until.clear()
+    assert _read_bind(user_id) is database.engine
+    assert _read_bind(user_id + 1) is replica
+    assert _read_bind(None) is replica
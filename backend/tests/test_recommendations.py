@@ -0,0 +1,67 @@
+"""Tavsiyalar job'i: kechikib to'langan (Click) buyurtmalar ham matritsaga kiradi."""
+from sqlalchemy import select
+
+import models
+import recommendations
+from database import SessionLocal
+
+
+def _order(db, user_id: int, status: str, product_ids) -> int:
+    order = models.Order(user_id=user_id, product_title="t", amount_usd=1.0, status=status)
+    db.add(order)
+    db.flush()
+    for product_id in product_ids:
+        db.add(models.OrderItem(
+            order_id=order.id, product_id=product_id, user_id=user_id,
+            product_title="t", quantity=1, unit_price_usd=1.0, amount_usd=1.0,
+        ))
+    return order.id
+
+
+def _snapshot(db) -> dict:
+    rows = db.execute(select(models.ProductRecommendation)).scalars().all()
+    return {row.product_id: (row.product_ids, row.scores) for row in rows}
+
+
+def test_late_paid_order_is_not_skipped(client):
+    db = SessionLocal()
+    try:
+        users = [models.User(email=f"rec{i}@test", hashed_password="x") for i in range(2)]
+        db.add_all(users)
+        db.commit()
+        recommendations.run_once(full=True)
+
+        pending_id = _order(db, users[0].id, "pending", [1, 3])
+        _order(db, users[1].id, "completed", [1, 2])
+        db.commit()
+        assert recommendations.run_once()["orders"] == 1
+        state = db.get(models.RecommendationState, 1)
+        db.refresh(state)
+        assert str(pending_id) in state.pending_order_ids.split(",")
+
+        db.get(models.Order, pending_id).status = "paid"
+        db.commit()
+        assert recommendations.run_once()["orders"] == 1
+        assert recommendations.run_once()["orders"] == 0
+        db.refresh(state)
+        assert state.pending_order_ids is None
+        incremental = _snapshot(db)
+
+        recommendations.run_once(full=True)
+        db.expire_all()
+        assert _snapshot(db) == incremental
+        assert "3" in dict(recommendations._load(db, 1))
+    finally:
+        db.close()
+
+
+def test_only_one_worker_claims_each_run(client):
+    db = SessionLocal()
+    try:
+        recommendations.run_once()
+        state = db.get(models.RecommendationState, 1)
+        state.next_run_at = None
+        db.commit()
+    finally:
+        db.close()
+    assert [recommendations.claim_run() for _ in range(3)] == [True, False, False]
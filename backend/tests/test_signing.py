@@ -0,0 +1,36 @@
+"""Imzolangan tokenlar: buzilgan, eskirgan va axlat kirish None qaytaradi (500 emas)."""
+import pytest
+
+import signing
+
+KEY = b"k" * 32
+
+
+def test_round_trip():
+    token, expires = signing.dumps(KEY, {"sub": 1}, 60)
+    data = signing.loads(KEY, token)
+    assert data["sub"] == 1 and data["e"] == expires
+
+
+@pytest.mark.parametrize("token", [
+    None, "", ".", "abc", "abc.", ".abc", "abc.é", "é.é", "abc.def.ghi", "!!!.???", "a" * 5000,
+])
+def test_garbage_is_rejected(token):
+    assert signing.loads(KEY, token) is None
+
+
+def test_tampered_expired_and_foreign_tokens_are_rejected():
+    token, _ = signing.dumps(KEY, {"sub": 1}, 60)
+    payload, signature = token.split(".")
+    forged, _ = signing.dumps(KEY, {"sub": 2}, 60)
+
+    assert signing.loads(KEY, f"{forged.split('.')[0]}.{signature}") is None
+    flipped = ("B" if signature[0] == "A" else "A") + signature[1:]
+    assert signing.loads(KEY, f"{payload}.{flipped}") is None
+    assert signing.loads(KEY, f"{payload}.{signature}é") is None
+    assert signing.loads(b"x" * 32, token) is None
+    assert signing.loads(KEY, signing.dumps(KEY, {"sub": 1}, -1)[0]) is None
+
+
+def test_non_ascii_ticket_is_unauthorized(client):
+    assert client.get("/api/events/me", params={"ticket": "abc.é"}).status_code == 401
@@ -0,0 +1,274 @@
+"""
+Yengil tracing: so'rov, har bir SQL va tashqi HTTP chaqiruvlar uchun span'lar.
+
+- Har bir so'rovga X-Request-ID biriktiriladi (kelgan bo'lsa o'shani, aks holda
+  yangi) va javobda qaytariladi; tashqi chaqiruvlarga ham uzatiladi.
+- So'rovlarning TRACE_SAMPLE_RATE ulushi trace qilinadi. Trace qilinmagan
+  so'rovda `span()` hech narsa yozmaydi.
+- Span'lar navbatga qo'yiladi va fon thread'i ularni batch'lab eksport qiladi:
+  TRACE_EXPORTER=file — JSONL fayl (TRACE_EXPORT_FILE), TRACE_EXPORTER=http —
+  OTLP collector o'rnidagi endpoint (TRACE_EXPORT_URL) ga JSON POST.
+
+Span formati (JSONL qatori):
+    {"trace_id", "span_id", "parent_span_id", "name", "start_time_unix_nano",
+     "end_time_unix_nano", "duration_ms", "status", "request_id", "attributes"}
+"""
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import metrics
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "file")          # "file" | "http"
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "traces.jsonl")
+TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL", "http://localhost:4318/v1/traces")
+TRACE_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "2"))
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+TRACE_BATCH_SIZE = 512
+
+REQUEST_ID_HEADER = b"x-request-id"
+_MAX_REQUEST_ID_LENGTH = 128
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def current_request_id():
+    return request_id_var.get()
+
+
+def outbound_headers() -> dict:
+    """Tashqi HTTP chaqiruvlar uchun sarlavhalar (request id'ni uzatish)."""
+    request_id = request_id_var.get()
+    return {"X-Request-ID": request_id} if request_id else {}
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "request_id",
+                 "start", "end", "attributes", "status")
+
+    def __init__(self, name, trace_id, parent_id, request_id, attributes, start=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.request_id = request_id
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def child(self, name, attributes, start=None):
+        return Span(name, self.trace_id, self.span_id, self.request_id, attributes, start)
+
+    def set_attribute(self, key, value) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, exc) -> None:
+        # Faqat xato turi: xabarda maxfiy ma'lumot bo'lishi mumkin (masalan, bot token'li URL)
+        self.status = "error"
+        self.attributes["error"] = type(exc).__name__
+
+    def finish(self, end=None) -> None:
+        self.end = time.perf_counter() if end is None else end
+        _enqueue(self)
+
+    def to_dict(self) -> dict:
+        # perf_counter -> unix vaqt (ns)
+        offset = time.time() - time.perf_counter()
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": int((self.start + offset) * 1e9),
+            "end_time_unix_nano": int((self.end + offset) * 1e9),
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "status": self.status,
+            "request_id": self.request_id,
+            "attributes": self.attributes,
+        }
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Joriy trace ichida bosqich span'i. So'rov trace qilinmayotgan bo'lsa None beradi."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = parent.child(name, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.set_error(exc)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+# ── SQL span'lari (metrics.statement_hooks) ──────────────────────────────────
+
+def _on_statement(request_stats, statement, started, elapsed):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    parent.child("db.query", {"db.statement": statement[:1000]}, start=started).finish(started + elapsed)
+
+
+metrics.statement_hooks.append(_on_statement)
+
+
+# ── Eksport ──────────────────────────────────────────────────────────────────
+
+_queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+_exporter_thread = None
+_stop = threading.Event()
+
+stats = {
+    "spans_exported": 0,
+    "spans_dropped": 0,
+    "export_errors": 0,
+    "last_error": None,
+}
+
+
+def _enqueue(finished: Span) -> None:
+    try:
+        _queue.put_nowait(finished)
+    except queue.Full:
+        stats["spans_dropped"] += 1
+
+
+def _export(batch: list) -> None:
+    records = [s.to_dict() for s in batch]
+    if TRACE_EXPORTER == "http":
+        # requests og'ir kutubxona — faqat eksport kerak bo'lganda yuklanadi
+        import requests as http_requests
+        resp = http_requests.post(TRACE_EXPORT_URL, json={"spans": records}, timeout=5)
+        resp.raise_for_status()
+    else:
+        with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def flush() -> None:
+    """Navbatdagi barcha span'larni hozir eksport qiladi."""
+    while True:
+        batch = []
+        try:
+            while len(batch) < TRACE_BATCH_SIZE:
+                batch.append(_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
+        try:
+            _export(batch)
+            stats["spans_exported"] += len(batch)
+        except Exception as e:
+            stats["export_errors"] += 1
+            stats["spans_dropped"] += len(batch)
+            stats["last_error"] = str(e)
+
+
+def _exporter_loop() -> None:
+    while not _stop.wait(TRACE_EXPORT_INTERVAL_SECONDS):
+        flush()
+    flush()
+
+
+def start() -> None:
+    """Eksport thread'ini ishga tushiradi (startup event). Sampling o'chiq bo'lsa hech narsa qilmaydi."""
+    global _exporter_thread
+    if TRACE_SAMPLE_RATE <= 0 or _exporter_thread is not None:
+        return
+    _stop.clear()
+    _exporter_thread = threading.Thread(target=_exporter_loop, name="trace-exporter", daemon=True)
+    _exporter_thread.start()
+
+
+def stop() -> None:
+    """Qolgan span'larni eksport qilib thread'ni to'xtatadi (shutdown event)."""
+    global _exporter_thread
+    if _exporter_thread is None:
+        return
+    _stop.set()
+    _exporter_thread.join(timeout=10)
+    _exporter_thread = None
+
+
+def get_stats() -> dict:
+    return {
+        **stats,
+        "sample_rate": TRACE_SAMPLE_RATE,
+        "exporter": TRACE_EXPORTER,
+        "queued": _queue.qsize(),
+    }
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+
+def _incoming_request_id(scope):
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            value = value.decode("latin-1").strip()
+            if 0 < len(value) <= _MAX_REQUEST_ID_LENGTH and value.isprintable():
+                return value
+            return None
+    return None
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _incoming_request_id(scope) or uuid.uuid4().hex
+        id_token = request_id_var.set(request_id)
+        root = None
+        span_token = None
+        if TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE:
+            root = Span("http.request", uuid.uuid4().hex, None, request_id, {
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+            })
+            span_token = _current_span.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER, request_id.encode("latin-1")),
+                ]
+                if root is not None:
+                    root.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            if root is not None:
+                root.set_error(exc)
+            raise
+        finally:
+            if root is not None:
+                route = scope.get("route")
+                root.set_attribute("http.route", getattr(route, "path", None) or metrics.UNMATCHED_ROUTE)
+                _current_span.reset(span_token)
+                root.finish()
+            request_id_var.reset(id_token)
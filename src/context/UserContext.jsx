@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useCallback, useEffect } from 'react';
-import { API_URL } from '../utils/api';
+import { API_URL, openEventStream } from '../utils/api';
 
 const UserContext = createContext(null);
 
@@ -39,6 +39,16 @@ export const UserProvider = ({ children }) => {
     // Auto-fetch on mount — resolves loading once done
     useEffect(() => { fetchUser(); }, [fetchUser]);
 
+    // Jonli balans: topup/xarid hodisalari SSE orqali keladi (qayta so'rov shart emas)
+    const userId = user?.id;
+    useEffect(() => {
+        if (!userId) return undefined;
+        const onBalance = ({ balance }) => {
+            setUser(prev => (prev ? { ...prev, balance } : prev));
+        };
+        return openEventStream('me', { topup: onBalance, purchase: onBalance });
+    }, [userId]);
+
     return (
         <UserContext.Provider value={{ user, setUser, fetchUser, logout, updateBalance, loading }}>
             {children}
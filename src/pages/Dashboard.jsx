@@ -32,7 +32,7 @@ const STATUS_PAID = ['completed', 'paid'];
 
 const Dashboard = () => {
     const navigate = useNavigate();
-    const { user, fetchUser, logout } = useUser();
+    const { user, setUser, logout } = useUser();
     const [orders, setOrders] = useState([]);
     const [isLoading, setIsLoading] = useState(true);
     const [toast, setToast] = useState(null);
@@ -48,14 +48,14 @@ const Dashboard = () => {
             if (!token) { navigate('/login'); return; }
 
             try {
-                // fetchUser updates the global context (balance sync)
-                const userData = await fetchUser();
-                if (!userData) { navigate('/login'); return; }
-
-                const ordersRes = await fetch(`${API_URL}/api/orders/my`, {
+                // Profil, buyurtmalar, tranzaksiyalar, savatcha va wishlist — bitta so'rovda
+                const res = await fetch(`${API_URL}/api/dashboard`, {
                     headers: { Authorization: `Bearer ${token}` }
                 });
-                if (ordersRes.ok) setOrders(await ordersRes.json());
+                if (!res.ok) { navigate('/login'); return; }
+                const data = await res.json();
+                setUser(data.user); // global context (balans sinxroni)
+                setOrders(data.orders);
             } catch {
                 navigate('/login');
             } finally {
@@ -63,15 +63,32 @@ const Dashboard = () => {
             }
         };
         fetchAll();
-    }, [navigate, fetchUser]);
+    }, [navigate, setUser]);
 
     const handleLogout = () => {
         logout();
         navigate('/');
     };
 
-    const handleDownload = (orderTitle) => {
-        showToast(`"${orderTitle}" — Mahsulot fayllari tayyorlanmoqda...`, 'info');
+    // Imzolangan, muddati cheklangan havola olinadi va brauzer faylni o'zi yuklaydi
+    const handleDownload = async (order) => {
+        if (!order.product_id) {
+            showToast(`"${order.product_title}" — yuklab olinadigan fayl topilmadi`, 'error');
+            return;
+        }
+        showToast(`"${order.product_title}" — Mahsulot fayllari tayyorlanmoqda...`, 'info');
+        try {
+            const token = localStorage.getItem('token');
+            const res = await fetch(`${API_URL}/api/downloads/${order.product_id}/link`, {
+                method: 'POST',
+                headers: { Authorization: `Bearer ${token}` }
+            });
+            const data = await res.json();
+            if (!res.ok) { showToast(data.detail || "Yuklab olishda xatolik", 'error'); return; }
+            window.location.href = `${API_URL}${data.url}`;
+        } catch {
+            showToast("Tarmoq xatosi — qayta urinib ko'ring", 'error');
+        }
     };
 
     const containerVariants = {
@@ -91,7 +108,12 @@ const Dashboard = () => {
         );
     }
 
-    const paidOrders = orders.filter(o => STATUS_PAID.includes(o.status));
+    // Har bir buyurtma qatori (mahsulot) alohida kartochka; eski buyurtmalarda qatorlar yo'q
+    const paidOrders = orders
+        .filter(o => STATUS_PAID.includes(o.status))
+        .flatMap(o => o.items?.length
+            ? o.items.map(item => ({ ...o, ...item, key: `${o.id}-${item.product_id}` }))
+            : [{ ...o, key: `${o.id}` }]);
 
     return (
         <motion.div
@@ -198,7 +220,7 @@ const Dashboard = () => {
                             >
                                 {paidOrders.map(order => (
                                     <motion.div
-                                        key={order.id} variants={itemVariants}
+                                        key={order.key} variants={itemVariants}
                                         className="group rounded-2xl bg-slate-900 border border-slate-800 overflow-hidden hover:border-neon-blue/40 transition-colors duration-300 flex flex-col"
                                     >
                                         {/* Image / placeholder */}
@@ -238,7 +260,7 @@ const Dashboard = () => {
 
                                             <div className="mt-auto pt-4 border-t border-slate-800">
                                                 <button
-                                                    onClick={() => handleDownload(order.product_title)}
+                                                    onClick={() => handleDownload(order)}
                                                     className="w-full flex items-center justify-center gap-2 py-3 rounded-xl bg-slate-800 hover:bg-green-500/20 text-slate-300 hover:text-green-400 border border-slate-700 hover:border-green-500/50 hover:shadow-[0_0_15px_rgba(74,222,128,0.2)] transition-all duration-300 font-bold text-sm group/btn"
                                                 >
                                                     <Download className="w-4 h-4 group-hover/btn:-translate-y-0.5 transition-transform" />
@@ -1,23 +1,48 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { ArrowLeft, CheckCircle2, ShieldCheck, Zap, DownloadCloud, AlertCircle } from 'lucide-react';
+import { ArrowLeft, CheckCircle2, ShieldCheck, Zap, DownloadCloud, AlertCircle, Activity } from 'lucide-react';
 import { useCart } from '../context/CartContext';
-import { useProducts } from '../context/ProductContext';
+import ProductCard from '../components/ProductCard';
 import { useWishlist } from '../context/WishlistContext';
 import { useCurrency } from '../context/CurrencyContext';
+import { API_URL } from '../utils/api';
 
 const ProductDetails = () => {
     const { id } = useParams();
     const { addToCart } = useCart();
-    const { products } = useProducts();
     const { addToWishlist, removeFromWishlist, isInWishlist } = useWishlist();
     const { formatPrice } = useCurrency();
-    const product = products.find((p) => p.id === id);
+    // undefined — yuklanmoqda, null — topilmadi
+    const [product, setProduct] = useState(undefined);
 
     // Scroll to top on mount
     useEffect(() => {
         window.scrollTo(0, 0);
-    }, []);
+    }, [id]);
+
+    // Bitta mahsulot va "o'xshash mahsulotlar" (related) — butun katalog yuklanmaydi
+    useEffect(() => {
+        let cancelled = false;
+        setProduct(undefined);
+        fetch(`${API_URL}/api/products/${id}`)
+            .then(res => (res.ok ? res.json() : null))
+            .catch(() => null)
+            .then(data => { if (!cancelled) setProduct(data); });
+        return () => { cancelled = true; };
+    }, [id]);
+
+    // Ko'rishni qayd etamiz ("ommabop" tartib uchun) — javob kutilmaydi
+    useEffect(() => {
+        fetch(`${API_URL}/api/products/${id}/view`, { method: 'POST', keepalive: true }).catch(() => {});
+    }, [id]);
+
+    if (product === undefined) {
+        return (
+            <div className="min-h-[80vh] flex items-center justify-center">
+                <Activity className="w-10 h-10 text-neon-blue animate-spin" />
+            </div>
+        );
+    }
 
     if (!product) {
         return (
@@ -112,6 +137,17 @@ const ProductDetails = () => {
                         </div>
                     </div>
                 </div>
+
+                {product.related?.length > 0 && (
+                    <div className="mt-24">
+                        <h2 className="text-3xl font-black text-white mb-8 tracking-tight">O'xshash mahsulotlar</h2>
+                        <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-4 gap-6">
+                            {product.related.map(item => (
+                                <ProductCard key={item.id} {...item} tags={[]} />
+                            ))}
+                        </div>
+                    </div>
+                )}
             </div>
         </div>
     );
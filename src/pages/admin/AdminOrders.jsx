@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import { ShoppingBag, Search, RefreshCw, User, Package, Calendar, DollarSign } from 'lucide-react';
 import { useOutletContext } from 'react-router-dom';
-import { API_URL } from '../../utils/api';
+import { API_URL, openEventStream } from '../../utils/api';
 
 const USD_TO_UZS = 12800;
 
@@ -31,6 +31,20 @@ const AdminOrders = () => {
 
     useEffect(() => { fetchOrders(); }, []);
 
+    // Jonli yangilanish: yangi buyurtma ro'yxat boshiga qo'shiladi, holat o'zgarishi joyida yangilanadi
+    useEffect(() => {
+        const onStatus = (order) => {
+            setOrders(prev => prev.map(o => (o.id === order.id ? { ...o, status: order.status } : o)));
+        };
+        return openEventStream('admin', {
+            'order.created': (order) => {
+                setOrders(prev => (prev.some(o => o.id === order.id) ? prev : [order, ...prev]));
+            },
+            'order.paid': onStatus,
+            'order.cancelled': onStatus,
+        });
+    }, []);
+
     const filtered = orders.filter(o =>
         o.buyer_email?.toLowerCase().includes(search.toLowerCase()) ||
         o.product_title?.toLowerCase().includes(search.toLowerCase())
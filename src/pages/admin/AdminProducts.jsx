@@ -1,7 +1,7 @@
 import React, { useState } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { useOutletContext } from 'react-router-dom';
-import { Plus, Edit2, Trash2, Search, Filter, X, Save, AlertCircle } from 'lucide-react';
+import { Plus, Edit2, Trash2, Search, Filter, X, Save, AlertCircle, Upload, Download } from 'lucide-react';
 import { useProducts } from '../../context/ProductContext';
 import { useCurrency } from '../../context/CurrencyContext';
 import { API_URL } from '../../utils/api';
@@ -20,6 +20,7 @@ const AdminProducts = () => {
     const [isEditing, setIsEditing] = useState(false);
     const [isSaving, setIsSaving] = useState(false);
     const [formError, setFormError] = useState("");
+    const [isImporting, setIsImporting] = useState(false);
 
     // Obyekt strukturasi form uchun
     const [formData, setFormData] = useState({
@@ -159,6 +160,60 @@ const AdminProducts = () => {
         }
     };
 
+    // Ommaviy import (CSV / JSONL) — xato qatorlar javobda qaytadi
+    const handleImport = async (e) => {
+        const file = e.target.files?.[0];
+        e.target.value = '';
+        if (!file) return;
+        setIsImporting(true);
+        try {
+            const token = localStorage.getItem('token');
+            const body = new FormData();
+            body.append('file', file);
+            const response = await fetch(`${API_URL}/api/admin/products/import`, {
+                method: 'POST',
+                headers: { 'Authorization': `Bearer ${token}` },
+                body
+            });
+            const result = await response.json();
+            if (!response.ok) {
+                alert(result.detail || "Importda xatolik yuz berdi.");
+                return;
+            }
+            const firstErrors = result.errors.slice(0, 5).map(err => `${err.line}-qator: ${err.error}`).join('\n');
+            alert(
+                `Qo'shildi: ${result.inserted}, yangilandi: ${result.updated}, xato: ${result.error_count}` +
+                (firstErrors ? `\n\n${firstErrors}` : '')
+            );
+            const productsRes = await fetch(`${API_URL}/api/products`);
+            if (productsRes.ok) setProducts(await productsRes.json());
+        } catch (error) {
+            console.error("Import xatosi:", error);
+            alert("Importda tarmoq xatosi yuz berdi.");
+        } finally {
+            setIsImporting(false);
+        }
+    };
+
+    const handleExport = async (format) => {
+        try {
+            const token = localStorage.getItem('token');
+            const response = await fetch(`${API_URL}/api/admin/products/export?format=${format}`, {
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) throw new Error("Eksport xatosi");
+            const url = URL.createObjectURL(await response.blob());
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = `products.${format}`;
+            link.click();
+            URL.revokeObjectURL(url);
+        } catch (error) {
+            console.error("Eksport xatosi:", error);
+            alert("Eksportda xatolik yuz berdi.");
+        }
+    };
+
     // Qidiruv va Saralash tizimi
     const filteredProducts = (products || [])
         .filter(product => {
@@ -194,14 +249,30 @@ const AdminProducts = () => {
                     <p className="text-slate-400 text-lg">Platformadagi barcha kurslar va raqamli tovarlar ro'yxati</p>
                 </div>
 
-                {/* Yaratish tugmasi */}
-                <button
-                    onClick={openCreateModal}
-                    className="flex items-center gap-2 bg-neon-blue px-6 py-3 rounded-xl font-bold text-slate-950 hover:bg-neon-blue/90 hover:scale-105 transition-all shadow-[0_0_20px_rgba(0,240,255,0.4)] text-glow whitespace-nowrap"
-                >
-                    <Plus className="w-5 h-5" />
-                    Yangi maxsulot qo'shish
-                </button>
+                <div className="flex flex-wrap items-center gap-3">
+                    {/* Ommaviy import / eksport */}
+                    <label className={`flex items-center gap-2 px-4 py-3 rounded-xl border border-slate-800 text-slate-400 hover:text-white hover:bg-slate-800 transition-colors bg-slate-950 font-bold text-sm cursor-pointer ${isImporting ? 'opacity-50 pointer-events-none' : ''}`}>
+                        <Upload className="w-4 h-4" />
+                        {isImporting ? 'Import qilinmoqda...' : 'Import (CSV/JSONL)'}
+                        <input type="file" accept=".csv,.jsonl,.ndjson" onChange={handleImport} className="hidden" />
+                    </label>
+                    <button
+                        onClick={() => handleExport('csv')}
+                        className="flex items-center gap-2 px-4 py-3 rounded-xl border border-slate-800 text-slate-400 hover:text-white hover:bg-slate-800 transition-colors bg-slate-950 font-bold text-sm"
+                    >
+                        <Download className="w-4 h-4" />
+                        Eksport
+                    </button>
+
+                    {/* Yaratish tugmasi */}
+                    <button
+                        onClick={openCreateModal}
+                        className="flex items-center gap-2 bg-neon-blue px-6 py-3 rounded-xl font-bold text-slate-950 hover:bg-neon-blue/90 hover:scale-105 transition-all shadow-[0_0_20px_rgba(0,240,255,0.4)] text-glow whitespace-nowrap"
+                    >
+                        <Plus className="w-5 h-5" />
+                        Yangi maxsulot qo'shish
+                    </button>
+                </div>
             </motion.div>
 
             {/* Qidiruv paneli va Table Wrapper */}
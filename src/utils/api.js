@@ -1 +1,53 @@
 export const API_URL = import.meta.env.VITE_API_URL || '';
+
+// Jonli hodisalar (SSE). EventSource sarlavha yubora olmaydi, JWT esa URL'da access
+// log'larga tushadi — shuning uchun avval qisqa muddatli ticket olinadi. Ulanish yopilsa
+// (masalan, ticket eskirgan) yangi ticket bilan qayta ochiladi. Qaytaradi: yopish funksiyasi.
+export const openEventStream = (scope, handlers) => {
+    let source = null;
+    let timer = null;
+    let closed = false;
+    let lastEventId = '';
+
+    const reconnect = () => {
+        if (!closed) timer = setTimeout(connect, 5000);
+    };
+
+    async function connect() {
+        const token = localStorage.getItem('token');
+        if (closed || !token) return;
+        try {
+            const res = await fetch(`${API_URL}/api/events/ticket?scope=${scope}`, {
+                method: 'POST',
+                headers: { Authorization: `Bearer ${token}` }
+            });
+            if (res.status === 401 || res.status === 403) return;
+            if (!res.ok) throw new Error(`ticket: ${res.status}`);
+            const { ticket } = await res.json();
+            if (closed) return;
+            const params = new URLSearchParams({ ticket });
+            if (lastEventId) params.set('last_event_id', lastEventId);
+            source = new EventSource(`${API_URL}/api/events/${scope}?${params}`);
+            Object.entries(handlers).forEach(([type, handler]) => {
+                source.addEventListener(type, (e) => {
+                    lastEventId = e.lastEventId || lastEventId;
+                    handler(JSON.parse(e.data));
+                });
+            });
+            // Uzilishda brauzer o'zi qayta ulanadi; rad etilsa ulanish yopiladi
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) reconnect();
+            };
+        } catch (e) {
+            console.error(e);
+            reconnect();
+        }
+    }
+
+    connect();
+    return () => {
+        closed = true;
+        clearTimeout(timer);
+        if (source) source.close();
+    };
+};